@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database.bulk import TABLES, import_table
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.reservations import ReservationService, SeatUnavailable
+from engine.seat_map import SeatMap
+from generate_data import (
+    FIRST_NAMES, LAST_NAMES, add_spec_arguments, customer_rows, generate, spec_from_args,
+)
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "runs": repeat,
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+
+def search_scenarios(repository, spec, repeat, rng):
+    customers = spec.customers
+    conn = repository.pool.connection()
+    max_booking = conn.execute("SELECT MAX(bookings_id) FROM bookings").fetchone()[0] or 1
+    dates = conn.execute("SELECT MIN(booking_date), MAX(booking_date) FROM bookings").fetchone()
+    scenarios = {
+        "customer_search_first_name": lambda: repository.search_customers(
+            first_name=rng.choice(FIRST_NAMES)[:3], limit=200),
+        "customer_search_last_name": lambda: repository.search_customers(
+            last_name=f"{rng.choice(LAST_NAMES)}{rng.randint(1, 99)}", limit=200),
+        "customer_search_phone_suffix": lambda: repository.search_customers(
+            phone=f"{rng.randint(0, 9999):04d}", limit=200),
+        "customer_lookup_id": lambda: repository.search_customers(
+            customer_id=str(rng.randint(1, customers))),
+        "booking_lookup_id": lambda: repository.search_bookings(
+            booking_id=str(rng.randint(1, max_booking))),
+        "booking_lookup_name": lambda: repository.search_bookings(
+            first_name=rng.choice(FIRST_NAMES), limit=200),
+        "booking_lookup_date": lambda: repository.search_bookings(
+            date_from=(dates[0] or "")[:10], date_to=(dates[1] or "")[:10], limit=200),
+        "seat_map_load": lambda: SeatMap(0, repository.show_seats(rng.randint(1, spec.shows))),
+    }
+    return {name: timed(function, repeat) for name, function in scenarios.items()}
+
+
+def reservation_scenario(repository, spec, threads, attempts):
+    service = ReservationService(repository)
+    show_id = spec.shows
+    seat_ids = [
+        row[0] for row in repository.execute(
+            "SELECT seats_id FROM seats WHERE show_id = ? AND status = 'Available'", (show_id,)
+        )
+    ]
+    counts = {"booked": 0, "conflicts": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(attempts):
+            try:
+                service.reserve(show_id, rng.sample(seat_ids, min(2, len(seat_ids))), 1)
+                outcome = "booked"
+            except SeatUnavailable:
+                outcome = "conflicts"
+            except sqlite3.Error:
+                outcome = "errors"
+            with lock:
+                counts[outcome] += 1
+        repository.pool.release()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    return dict(counts, threads=threads, seconds=round(elapsed, 3),
+                per_second=round(total / elapsed, 1))
+
+
+def import_scenario(spec, rows, workdir):
+    path = os.path.join(workdir, "customers.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(TABLES["customers"]) + "\n")
+        for i, row in enumerate(customer_rows(spec)):
+            if i >= rows:
+                break
+            f.write(",".join(str(value) for value in row) + "\n")
+    pool = ConnectionPool(os.path.join(workdir, "import.db"))
+    Repository(pool)
+    started = time.perf_counter()
+    loaded = import_table(pool, "customers", path)
+    elapsed = time.perf_counter() - started
+    pool.close_all()
+    return {"rows": loaded, "seconds": round(elapsed, 3), "rows_per_second": round(loaded / elapsed)}
+
+
+def copy_database(source, target):
+    # The reservation scenario writes; it must never book seats in a real database
+    src = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking database benchmarks")
+    parser.add_argument("--database",
+                        help="Benchmark a copy of this database instead of generating one")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--reservations", type=int, default=100, help="Attempts per thread")
+    parser.add_argument("--import-rows", type=int, default=100000)
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    spec = spec_from_args(args)
+    if args.database and not os.path.exists(args.database):
+        parser.error(f"{args.database} does not exist")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "bench.db")
+        if args.database:
+            copy_database(args.database, path)
+        pool = ConnectionPool(path, max_connections=args.threads + 2)
+        results = {
+            "version": git_version(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "spec": spec.as_dict(),
+            "scenarios": {},
+        }
+        if not args.database:
+            started = time.perf_counter()
+            results["generated"] = generate(pool, spec)
+            results["scenarios"]["generate_seconds"] = round(time.perf_counter() - started, 3)
+        repository = Repository(pool)
+        rng = random.Random(spec.seed)
+        results["scenarios"].update(search_scenarios(repository, spec, args.repeat, rng))
+        results["scenarios"]["concurrent_reservations"] = reservation_scenario(
+            repository, spec, args.threads, args.reservations
+        )
+        results["scenarios"]["bulk_import_customers"] = import_scenario(spec, args.import_rows, workdir)
+        pool.close_all()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,129 @@
+import argparse
+import hashlib
+import io
 import os
-import subprocess
+import py_compile
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
 
 ui_design_dir = os.path.join(os.getcwd(), "ui_design_files")
 ui_files_dir = os.path.join(os.getcwd(), "ui_files")
+# First line of every generated file: the hash of the .ui it came from, so a
+# fresh checkout can tell which files are current without any other state
+SOURCE_MARKER = "# ui-source-sha256: "
+# Read from package metadata so a no-op build never imports Qt
+PYQT_VERSION = metadata.version("PyQt5")
 
-if not os.path.exists(ui_design_dir):
-    print(f"Error: ui_design_files directory not found at {ui_design_dir}")
-    exit(1)
 
-# Create ui_files directory if it doesn't exist
-if not os.path.exists(ui_files_dir):
+def file_hash(path):
+    with open(path, "rb") as f:
+        # A different code generator produces different output from the same .ui
+        return hashlib.sha256(PYQT_VERSION.encode() + b"\0" + f.read()).hexdigest()
+
+
+def output_path_for(filename):
+    return os.path.join(ui_files_dir, filename.replace(".ui", "_ui.py"))
+
+
+def recorded_hash(output_filepath):
     try:
-        os.makedirs(ui_files_dir)
-        print(f"Created directory: {ui_files_dir}")
-    except OSError as e:
-        print(f"Error creating ui_files directory: {e}")
-        exit(1)
-
-for filename in os.listdir(ui_design_dir):
-    if filename.endswith(".ui"):
-        ui_filepath = os.path.join(ui_design_dir, filename)
-        output_filename = filename.replace(".ui", "_ui.py")
-        output_filepath = os.path.join(ui_files_dir, output_filename)
-
-        print(f"Converting {ui_filepath} to {output_filepath}")
+        with open(output_filepath, encoding="utf-8") as f:
+            first_line = f.readline()
+    except OSError:
+        return None
+    if not first_line.startswith(SOURCE_MARKER):
+        return None
+    return first_line[len(SOURCE_MARKER):].strip()
+
+
+def convert(ui_filepath, output_filepath, digest, byte_compile=False):
+    # In-process pyuic: no interpreter start-up per file
+    from PyQt5 import uic
+
+    source = io.StringIO()
+    uic.compileUi(ui_filepath, source)
+    temp_path = f"{output_filepath}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(f"{SOURCE_MARKER}{digest}\n")
+        f.write(source.getvalue())
+    os.replace(temp_path, output_filepath)
+    if byte_compile:
+        py_compile.compile(output_filepath, doraise=True)
+    return output_filepath
+
+
+def stale_files(force=False):
+    stale = []
+    for filename in sorted(os.listdir(ui_design_dir)):
+        if not filename.endswith(".ui"):
+            continue
+        digest = file_hash(os.path.join(ui_design_dir, filename))
+        if force or recorded_hash(output_path_for(filename)) != digest:
+            stale.append((filename, digest))
+    return stale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert changed .ui files in ui_design_files to ui_files")
+    parser.add_argument("--force", action="store_true", help="Convert every file, changed or not")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Parallel conversions (default: one per CPU)")
+    parser.add_argument("--compile", action="store_true", help="Also write .pyc files for the output")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(ui_design_dir):
+        print(f"Error: ui_design_files directory not found at {ui_design_dir}")
+        return 1
+
+    # Create ui_files directory if it doesn't exist
+    if not os.path.exists(ui_files_dir):
         try:
-            subprocess.run(
-                ["pyuic5", ui_filepath, "-o", output_filepath],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-        except subprocess.CalledProcessError as e:
+            os.makedirs(ui_files_dir)
+            print(f"Created directory: {ui_files_dir}")
+        except OSError as e:
+            print(f"Error creating ui_files directory: {e}")
+            return 1
+
+    started = time.perf_counter()
+    stale = stale_files(args.force)
+    if not stale:
+        print("UI files up to date.")
+        return 0
+
+    jobs = [
+        (os.path.join(ui_design_dir, filename), output_path_for(filename), digest)
+        for filename, digest in stale
+    ]
+    failed = False
+    if len(jobs) == 1 or args.jobs <= 1:
+        # A process pool costs more to start than one file takes to convert
+        results = []
+        for ui_filepath, output_filepath, digest in jobs:
+            try:
+                results.append(convert(ui_filepath, output_filepath, digest, args.compile))
+            except Exception as e:
+                results.append(e)
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as pool:
+            futures = [
+                pool.submit(convert, ui_filepath, output_filepath, digest, args.compile)
+                for ui_filepath, output_filepath, digest in jobs
+            ]
+            results = [future.exception() or future.result() for future in futures]
+    for (ui_filepath, output_filepath, _), result in zip(jobs, results):
+        if isinstance(result, Exception):
             print(f"Error converting {ui_filepath}:")
-            print(e.stderr)
-            exit(1)
+            print(result)
+            failed = True
+            continue
+        print(f"Converted {ui_filepath} to {output_filepath}")
+    if failed:
+        return 1
+    print(f"Conversion complete: {len(jobs)} file(s) in {time.perf_counter() - started:.2f}s.")
+    return 0
+
 
-print("Conversion complete.")
+if __name__ == "__main__":
+    sys.exit(main())
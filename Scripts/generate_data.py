@@ -0,0 +1,152 @@
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.bulk import load_rows
+from database.connection import ConnectionPool
+from database.migrations import migrate
+
+FIRST_NAMES = ["John", "Mary", "Anna", "Peter", "Kaarel", "Liis", "Mark", "Eva", "Tom", "Sara",
+               "Mati", "Kati", "James", "Emma", "Oliver", "Sofia", "Jaan", "Mari", "Leo", "Mia"]
+LAST_NAMES = ["Smith", "Tamm", "Saar", "Jones", "Brown", "Kask", "Mets", "Lepp", "Rebane", "Ilves",
+              "Taylor", "Wilson", "Koppel", "Kuusk", "Green", "Walker", "Pärn", "Oja", "Hill", "King"]
+TITLES = ["Hamlet", "Swan Lake", "The Nutcracker", "Cats", "Les Misérables", "Macbeth",
+          "La Bohème", "Chicago", "Carmen", "Matilda"]
+ROW_LABELS = [chr(c) for c in range(ord("A"), ord("Z") + 1)]
+
+
+class DataSpec:
+    def __init__(self, children=2000, adults=10000, seniors=3000, vips=500, shows=50,
+                 venues=5, rows=20, seats_per_row=30, occupancy=0.6, seed=42):
+        self.customer_counts = {"Child": children, "Adult": adults, "Senior": seniors, "VIP": vips}
+        self.shows = shows
+        self.venues = venues
+        self.rows = rows
+        self.seats_per_row = seats_per_row
+        self.occupancy = occupancy
+        self.seed = seed
+        self.start = datetime(2025, 1, 1)
+
+    @property
+    def customers(self):
+        return sum(self.customer_counts.values())
+
+    def as_dict(self):
+        return {
+            "customers": self.customer_counts, "shows": self.shows, "venues": self.venues,
+            "rows": self.rows, "seats_per_row": self.seats_per_row,
+            "occupancy": self.occupancy, "seed": self.seed,
+        }
+
+
+def customer_rows(spec):
+    rng = random.Random(spec.seed)
+    types = [t for t, count in spec.customer_counts.items() for _ in range(count)]
+    rng.shuffle(types)
+    for customer_id, customer_type in enumerate(types, 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}{rng.randint(1, 999)}"
+        phone = f"5{rng.randint(0, 9999999):07d}"
+        yield customer_id, name, phone, customer_type
+
+
+def show_rows(spec):
+    rng = random.Random(spec.seed + 1)
+    for show_id in range(1, spec.shows + 1):
+        date = spec.start + timedelta(days=rng.randint(0, 365), hours=rng.choice([14, 19]))
+        venue = f"Venue {(show_id - 1) % spec.venues + 1}"
+        yield show_id, f"{rng.choice(TITLES)} #{show_id}", date.isoformat(sep=" "), venue
+
+
+def _show_layout(spec, show_id, show_date, first_booking_id, first_seat_id):
+    # Deterministic per show, so bookings and seats can be streamed in separate passes
+    rng = random.Random(spec.seed * 100003 + show_id)
+    bookings, seats = [], []
+    booking_id = first_booking_id
+    seat_id = first_seat_id
+    for row_index in range(spec.rows):
+        label = ROW_LABELS[row_index % 26] * (row_index // 26 + 1)
+        price = round(60 - row_index * (40 / max(spec.rows, 1)), 2)
+        number = 1
+        while number <= spec.seats_per_row:
+            party = min(rng.randint(1, 6), spec.seats_per_row - number + 1)
+            if rng.random() < spec.occupancy:
+                booked_on = show_date - timedelta(days=rng.randint(1, 90), minutes=rng.randint(0, 1440))
+                bookings.append((booking_id, rng.randint(1, spec.customers), show_id,
+                                 booked_on.isoformat(sep=" ", timespec="seconds"),
+                                 round(price * party, 2)))
+                for _ in range(party):
+                    seats.append((seat_id, booking_id, show_id, f"{label}{number}", price, "Booked"))
+                    seat_id += 1
+                    number += 1
+                booking_id += 1
+            else:
+                for _ in range(party):
+                    status = "Blocked" if rng.random() < 0.01 else "Available"
+                    seats.append((seat_id, None, show_id, f"{label}{number}", price, status))
+                    seat_id += 1
+                    number += 1
+    return bookings, seats
+
+
+def _layouts(spec):
+    booking_id = seat_id = 1
+    for show_id, _, date, _ in show_rows(spec):
+        bookings, seats = _show_layout(spec, show_id, datetime.fromisoformat(date), booking_id, seat_id)
+        booking_id += len(bookings)
+        seat_id += len(seats)
+        yield bookings, seats
+
+
+def booking_rows(spec):
+    for bookings, _ in _layouts(spec):
+        yield from bookings
+
+
+def seat_rows(spec):
+    for _, seats in _layouts(spec):
+        yield from seats
+
+
+def generate(pool, spec, log=None):
+    migrate(pool.connection())
+    counts = {}
+    for table, rows in (("customers", customer_rows(spec)), ("shows", show_rows(spec)),
+                        ("bookings", booking_rows(spec)), ("seats", seat_rows(spec))):
+        counts[table] = load_rows(pool, table, rows, log=log)
+    return counts
+
+
+def add_spec_arguments(parser):
+    defaults = DataSpec()
+    parser.add_argument("--children", type=int, default=defaults.customer_counts["Child"])
+    parser.add_argument("--adults", type=int, default=defaults.customer_counts["Adult"])
+    parser.add_argument("--seniors", type=int, default=defaults.customer_counts["Senior"])
+    parser.add_argument("--vips", type=int, default=defaults.customer_counts["VIP"])
+    parser.add_argument("--shows", type=int, default=defaults.shows)
+    parser.add_argument("--venues", type=int, default=defaults.venues)
+    parser.add_argument("--rows", type=int, default=defaults.rows)
+    parser.add_argument("--seats-per-row", type=int, default=defaults.seats_per_row)
+    parser.add_argument("--occupancy", type=float, default=defaults.occupancy)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_args(args):
+    return DataSpec(args.children, args.adults, args.seniors, args.vips, args.shows, args.venues,
+                    args.rows, args.seats_per_row, args.occupancy, args.seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill a database with seeded synthetic data")
+    parser.add_argument("database", help="Database file to create or extend")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    if os.path.exists(args.database):
+        print(f"Error: {args.database} already exists")
+        exit(1)
+    pool = ConnectionPool(args.database)
+    print(generate(pool, spec_from_args(args), log=print))
+    pool.close_all()
@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.allocator import SeatAllocator
+from engine.reservations import HoldExpired, ReservationService, SeatUnavailable, UnknownSeats
+from engine.cache import ShowListCache
+from engine.pricing import PricingEngine
+from engine.commit_queue import CommitQueue
+from engine.seat_map import SeatMapStore
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+MAX_BODY = 1024 * 1024
+MAX_PAGE = 500
+# Terminals write to the same database, so cached seat maps only live briefly
+SEAT_MAP_TTL = 2
+
+REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 410: "Gone", 413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be an integer")
+
+
+def _date(value, name):
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPError(400, f"{name} must be a date (YYYY-MM-DD)")
+
+
+class ServiceAPI:
+    # Transport independent request handling shared by the asyncio server
+    # and the ASGI adapter. Database work runs on a thread pool, each thread
+    # holding its own pooled connection, and identical GET requests that
+    # arrive while one is in flight share its result instead of re-querying.
+
+    def __init__(self, repository, workers=READ_WORKERS, seat_maps=None):
+        self.repository = repository
+        self.seat_maps = seat_maps or SeatMapStore(repository, ttl=SEAT_MAP_TTL)
+        self.shows = ShowListCache(repository)
+        self.pricing = PricingEngine(repository, self.seat_maps)
+        # Every client's booking writes funnel into one group-committing writer
+        self.commit_queue = CommitQueue(repository.pool)
+        self.reservations = ReservationService(
+            repository, self.seat_maps, pricing=self.pricing, commit_queue=self.commit_queue
+        )
+        self.allocator = SeatAllocator(self.seat_maps)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-db")
+        self._in_flight = {}
+        self.coalesced = 0
+
+    async def _run(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    async def _read(self, key, function, *args):
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(self._run(function, *args))
+        self._in_flight[key] = future
+        try:
+            return await future
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def handle(self, method, target, body=b""):
+        # Returns (status, payload)
+        try:
+            url = urlsplit(target)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            parts = [part for part in url.path.split("/") if part]
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise HTTPError(400, "Request body must be a JSON object")
+            return await self._route(method, parts, query, data, target)
+        except HTTPError as e:
+            return e.status, {"error": e.message}
+        except json.JSONDecodeError:
+            return 400, {"error": "Invalid JSON"}
+        except UnknownSeats as e:
+            return 404, {"error": str(e), "seat_ids": sorted(e.seat_ids)}
+        except SeatUnavailable as e:
+            return 409, {"error": str(e), "seat_ids": sorted(e.seat_ids)}
+        except HoldExpired as e:
+            return 410, {"error": str(e)}
+        except sqlite3.IntegrityError:
+            # A customer or show the request names is gone, e.g. deleted meanwhile
+            return 400, {"error": "The request refers to a customer or show that does not exist"}
+        except Exception:
+            # Every transport gets an answer; the details stay in the server log
+            traceback.print_exc()
+            return 500, {"error": "Internal server error"}
+
+    async def _route(self, method, parts, query, data, target):
+        if parts == ["customers"] and method == "GET":
+            return 200, await self._read(target, self.search_customers, query)
+        if parts == ["bookings"] and method == "GET":
+            return 200, await self._read(target, self.search_bookings, query)
+        if parts == ["shows"] and method == "GET":
+            return 200, await self._read(target, self.list_shows)
+        if len(parts) == 3 and parts[0] == "shows" and parts[2] == "seats" and method == "GET":
+            return 200, await self._read(target, self.seat_map, _int(parts[1], "show id"))
+        if len(parts) == 3 and parts[0] == "shows" and parts[2] == "best" and method == "GET":
+            party_size = _int(query.get("party_size", 1), "party_size")
+            return 200, await self._read(target, self.best_available, _int(parts[1], "show id"), party_size)
+        if parts == ["stats"] and method == "GET":
+            return 200, {"cache": self.cache_stats(), "coalesced": self.coalesced,
+                         "commits": self.commit_queue.stats()}
+        if parts == ["holds"] and method == "POST":
+            return 201, await self._run(self.hold, data)
+        if len(parts) == 3 and parts[0] == "holds" and parts[2] == "confirm" and method == "POST":
+            return 201, await self._run(self.confirm, parts[1], data)
+        if len(parts) == 2 and parts[0] == "holds" and method == "DELETE":
+            return 200, await self._run(self.release, parts[1])
+        if parts == ["reservations"] and method == "POST":
+            return 201, await self._run(self.reserve, data)
+        if parts and parts[0] in ("customers", "bookings", "shows", "holds", "reservations"):
+            raise HTTPError(405, f"{method} not allowed on /{'/'.join(parts)}")
+        raise HTTPError(404, "Not found")
+
+    def _page_args(self, query):
+        after_id = query.get("after_id")
+        return dict(
+            after_id=None if after_id is None else _int(after_id, "after_id"),
+            limit=min(_int(query.get("limit", 100), "limit"), MAX_PAGE),
+        )
+
+    def _booking_cursor(self, query):
+        # Bookings page newest first on (booking_date, booking_id); undated
+        # bookings come last and are paged with after_date=null
+        if "after_id" not in query:
+            return None
+        if "after_date" not in query:
+            raise HTTPError(400, "after_id needs after_date for bookings")
+        after_date = None if query["after_date"] == "null" else query["after_date"]
+        return after_date, _int(query["after_id"], "after_id")
+
+    def search_customers(self, query):
+        rows = self.repository.search_customers(
+            first_name=query.get("first_name", ""),
+            last_name=query.get("last_name", ""),
+            customer_id=query.get("customer_id", ""),
+            phone=query.get("phone", ""),
+            **self._page_args(query),
+        )
+        return {"customers": [
+            {"customer_id": r[0], "name": r[1], "phone": r[2], "type": r[3]} for r in rows
+        ]}
+
+    def search_bookings(self, query):
+        rows = self.repository.search_bookings(
+            first_name=query.get("first_name", ""),
+            last_name=query.get("last_name", ""),
+            booking_id=query.get("booking_id", ""),
+            show_id=_int(query["show_id"], "show_id") if "show_id" in query else None,
+            date_from=_date(query.get("date_from"), "date_from"),
+            date_to=_date(query.get("date_to"), "date_to"),
+            after=self._booking_cursor(query),
+            limit=self._page_args(query)["limit"],
+        )
+        return {"bookings": [
+            {"booking_id": r[0], "customer": r[1], "show": r[2], "booking_date": r[3],
+             "total_price": r[4]}
+            for r in rows
+        ]}
+
+    def list_shows(self):
+        return {"shows": [
+            {"show_id": r[0], "title": r[1], "date": r[2], "venue": r[3]}
+            for r in self.shows.get()
+        ]}
+
+    def seat_map(self, show_id):
+        seat_map = self.seat_maps.get(show_id)
+        return {
+            "show_id": show_id,
+            "counts": seat_map.counts(),
+            "seats": [
+                {"seat_id": seat_id, "seat_number": number, "status": status, "price": price}
+                for seat_id, number, status, price in seat_map.snapshot()
+            ],
+        }
+
+    def best_available(self, show_id, party_size):
+        allocation = self.allocator.best_available(show_id, party_size)
+        return {"allocation": None if allocation is None else asdict(allocation)}
+
+    def _seat_request(self, data):
+        seat_ids = data.get("seat_ids")
+        if not isinstance(seat_ids, list) or not seat_ids:
+            raise HTTPError(400, "seat_ids must be a non-empty list")
+        return _int(data.get("show_id"), "show_id"), [_int(s, "seat_ids") for s in seat_ids]
+
+    def hold(self, data):
+        show_id, seat_ids = self._seat_request(data)
+        return {"hold_token": self.reservations.hold(show_id, seat_ids)}
+
+    def _customer(self, data):
+        customer_id = _int(data.get("customer_id"), "customer_id")
+        if not self.repository.customer_exists(customer_id):
+            raise HTTPError(404, f"Customer {customer_id} not found")
+        return customer_id
+
+    def confirm(self, token, data):
+        customer_id = self._customer(data)
+        return {"booking_id": self.reservations.confirm(token, customer_id)}
+
+    def release(self, token):
+        return {"released": self.reservations.release(token)}
+
+    def reserve(self, data):
+        show_id, seat_ids = self._seat_request(data)
+        customer_id = self._customer(data)
+        return {"booking_id": self.reservations.reserve(show_id, seat_ids, customer_id)}
+
+    def cache_stats(self):
+        return {"seat_maps": self.seat_maps.stats(), "shows": self.shows.cache.stats()}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.commit_queue.close()
+
+    async def asgi(self, scope, receive, send):
+        # ASGI entry point, e.g. for uvicorn when it is installed
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        target = scope["path"]
+        if scope.get("query_string"):
+            target += "?" + scope["query_string"].decode()
+        status, payload = await self.handle(scope["method"], target, body)
+        content = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(content)).encode())],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+
+async def _serve_connection(api, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            if length > MAX_BODY:
+                status, payload = 413, {"error": "Request body too large"}
+                keep_alive = False
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await api.handle(method, target, body)
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+            content = json.dumps(payload).encode()
+            writer.write(
+                f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(content)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                + content
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(api, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = await asyncio.start_server(
+        lambda reader, writer: _serve_connection(api, reader, writer), host, port
+    )
+    print(f"Serving on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Run the booking HTTP API")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--database", help="Path to the database (default: system.db)")
+    parser.add_argument("--workers", type=int, default=READ_WORKERS)
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.database) if args.database else ConnectionPool()
+    # Every worker thread keeps its own connection, plus the main thread and the writer
+    pool.max_connections = max(pool.max_connections, args.workers + 2)
+    api = ServiceAPI(Repository(pool), workers=args.workers)
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+        pool.close_all()
+    return 0
@@ -0,0 +1,206 @@
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from database.connection import ConnectionPool
+from database.migrations import migrate
+
+ARCHIVE_ALIAS = "archive"
+# A show is archived once it started this long ago
+FINISHED_AFTER = timedelta(days=1)
+# Bookings moved per transaction; the write lock is released between batches
+BATCH_SIZE = 200
+BATCH_PAUSE = 0.02
+# Large pages suit an archive that is written once and then only scanned
+ARCHIVE_PAGE_SIZE = 65536
+
+BOOKING_COLUMNS = "bookings_id, customer_id, show_id, booking_date, total_price, updated_at"
+SEAT_COLUMNS = "seats_id, booking_id, seat_number, price, status, show_id"
+
+ARCHIVE_SCHEMA = [
+    f"PRAGMA {ARCHIVE_ALIAS}.page_size = {ARCHIVE_PAGE_SIZE}",
+    f"PRAGMA {ARCHIVE_ALIAS}.journal_mode = WAL",
+    f"""CREATE TABLE IF NOT EXISTS {ARCHIVE_ALIAS}.bookings (
+        bookings_id INTEGER PRIMARY KEY,
+        customer_id INTEGER,
+        show_id INTEGER,
+        booking_date DATETIME,
+        total_price DECIMAL(10,2),
+        updated_at REAL
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS {ARCHIVE_ALIAS}.seats (
+        seats_id INTEGER PRIMARY KEY,
+        booking_id INTEGER,
+        seat_number TEXT,
+        price DECIMAL(10,2),
+        status TEXT,
+        show_id INTEGER
+    )""",
+    # The same search indexes as the hot tables, so the views below can seek both halves
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_archive_bookings_customer "
+    f"ON bookings(customer_id, booking_date)",
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_archive_bookings_show "
+    f"ON bookings(show_id, booking_date)",
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_archive_bookings_date ON bookings(booking_date)",
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_archive_seats_booking ON seats(booking_id)",
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_archive_seats_show ON seats(show_id, seat_number)",
+]
+
+# Per-connection views over hot and archived rows. UNION ALL lets SQLite push
+# the WHERE clause into each half and use that half's indexes.
+ARCHIVE_VIEWS = [
+    f"CREATE TEMP VIEW IF NOT EXISTS all_bookings AS "
+    f"SELECT {BOOKING_COLUMNS} FROM main.bookings "
+    f"UNION ALL SELECT {BOOKING_COLUMNS} FROM {ARCHIVE_ALIAS}.bookings",
+    f"CREATE TEMP VIEW IF NOT EXISTS all_seats AS "
+    f"SELECT {SEAT_COLUMNS} FROM main.seats "
+    f"UNION ALL SELECT {SEAT_COLUMNS} FROM {ARCHIVE_ALIAS}.seats",
+]
+
+
+def archive_path_for(db_path):
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def _placeholders(values):
+    return ", ".join("?" * len(values))
+
+
+class Archiver:
+    # Moves finished shows' bookings and seats out of the hot database.
+    #
+    # Each batch copies rows into the archive and deletes them from main in
+    # one transaction. In WAL mode a commit is atomic per database file, not
+    # across both, so the copy uses INSERT OR REPLACE: if a crash lands
+    # between the two files, the next run simply copies the batch again.
+
+    def __init__(self, pool, archive_path=None, batch_size=BATCH_SIZE,
+                 finished_after=FINISHED_AFTER, pause=BATCH_PAUSE):
+        self.pool = pool
+        self.archive_path = archive_path or archive_path_for(pool.path)
+        self.batch_size = batch_size
+        self.finished_after = finished_after
+        self.pause = pause
+
+    def open(self):
+        self.pool.attach(ARCHIVE_ALIAS, self.archive_path, ARCHIVE_VIEWS)
+        conn = self.pool.connection()
+        for statement in ARCHIVE_SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    def finished_shows(self, now=None):
+        cutoff = ((now or datetime.now()) - self.finished_after).isoformat(sep=" ", timespec="seconds")
+        return [row[0] for row in self.pool.connection().execute(
+            "SELECT shows_id FROM shows WHERE archived_at IS NULL AND date < ? ORDER BY date",
+            (cutoff,),
+        )]
+
+    def _snapshot_sales(self, conn, show_id):
+        # The summary triggers count the deletes below as cancellations;
+        # archived sales still happened, so their totals are put back
+        return (
+            conn.execute("SELECT * FROM show_sales WHERE show_id = ?", (show_id,)).fetchall(),
+            conn.execute("SELECT * FROM daily_sales WHERE show_id = ?", (show_id,)).fetchall(),
+        )
+
+    def _restore_sales(self, conn, snapshot):
+        show_rows, daily_rows = snapshot
+        conn.executemany("INSERT OR REPLACE INTO show_sales VALUES (?, ?, ?, ?, ?, ?)", show_rows)
+        conn.executemany("INSERT OR REPLACE INTO daily_sales VALUES (?, ?, ?, ?)", daily_rows)
+
+    def _move_batch(self, show_id):
+        with self.pool.transaction("IMMEDIATE") as conn:
+            booking_ids = [row[0] for row in conn.execute(
+                "SELECT bookings_id FROM bookings WHERE show_id = ? LIMIT ?",
+                (show_id, self.batch_size),
+            )]
+            if booking_ids:
+                seat_where = f"booking_id IN ({_placeholders(booking_ids)})"
+                seat_params = booking_ids
+            else:
+                # Seats nobody booked go last
+                seat_where = "seats_id IN (SELECT seats_id FROM seats WHERE show_id = ? LIMIT ?)"
+                seat_params = [show_id, self.batch_size * 4]
+            snapshot = self._snapshot_sales(conn, show_id)
+            moved = conn.execute(
+                f"INSERT OR REPLACE INTO {ARCHIVE_ALIAS}.seats ({SEAT_COLUMNS}) "
+                f"SELECT {SEAT_COLUMNS} FROM main.seats WHERE {seat_where}",
+                seat_params,
+            ).rowcount
+            conn.execute(f"DELETE FROM main.seats WHERE {seat_where}", seat_params)
+            if booking_ids:
+                in_ids = f"bookings_id IN ({_placeholders(booking_ids)})"
+                moved += conn.execute(
+                    f"INSERT OR REPLACE INTO {ARCHIVE_ALIAS}.bookings ({BOOKING_COLUMNS}) "
+                    f"SELECT {BOOKING_COLUMNS} FROM main.bookings WHERE {in_ids}",
+                    booking_ids,
+                ).rowcount
+                conn.execute(f"DELETE FROM main.bookings WHERE {in_ids}", booking_ids)
+            self._restore_sales(conn, snapshot)
+            if not moved:
+                conn.execute("UPDATE shows SET archived_at = ? WHERE shows_id = ?",
+                             (time.time(), show_id))
+        return moved
+
+    def archive_show(self, show_id):
+        moved = 0
+        while True:
+            count = self._move_batch(show_id)
+            if not count:
+                return moved
+            moved += count
+            # Let box office writers in between batches
+            time.sleep(self.pause)
+
+    def run(self, max_shows=None, now=None, log=None):
+        self.open()
+        shows = self.finished_shows(now)[:max_shows]
+        total = 0
+        for show_id in shows:
+            moved = self.archive_show(show_id)
+            total += moved
+            if log:
+                log(f"Show {show_id}: archived {moved} rows")
+        return len(shows), total
+
+    def compact(self, log=None):
+        # Rewrite the archive defragmented and fully packed. Only run this
+        # while no terminal has the archive open.
+        conn = self.open()
+        target = f"{self.archive_path}.compact"
+        if os.path.exists(target):
+            os.remove(target)
+        conn.execute(f"VACUUM {ARCHIVE_ALIAS} INTO ?", (target,))
+        before = os.path.getsize(self.archive_path)
+        conn.execute(f"DETACH DATABASE {ARCHIVE_ALIAS}")
+        os.replace(target, self.archive_path)
+        if log:
+            log(f"Archive compacted: {before} -> {os.path.getsize(self.archive_path)} bytes")
+
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(prog="main.py archive",
+                                     description="Move finished shows to the archive database")
+    parser.add_argument("--database", help="Path to the database (default: system.db)")
+    parser.add_argument("--archive", help="Path to the archive (default: <database>_archive.db)")
+    parser.add_argument("--max-shows", type=int)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--finished-days", type=float, default=FINISHED_AFTER.days)
+    parser.add_argument("--compact", action="store_true",
+                        help="VACUUM INTO a packed copy of the archive afterwards")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.database) if args.database else ConnectionPool()
+    migrate(pool.connection())
+    archiver = Archiver(pool, args.archive, args.batch_size, timedelta(days=args.finished_days))
+    try:
+        shows, rows = archiver.run(args.max_shows, log=print)
+        print(f"Archived {shows} shows ({rows} rows) to {archiver.archive_path}")
+        if args.compact:
+            archiver.compact(log=print)
+    finally:
+        pool.close_all()
+    return 0
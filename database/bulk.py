@@ -0,0 +1,277 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from itertools import islice
+
+from database.connection import ConnectionPool
+from database.migrations import SALES_SUMMARY_REFRESH, migrate, run_pending_rebuilds
+
+CHUNK_SIZE = 10000
+COMMIT_EVERY = 500000
+
+TABLES = {
+    "customers": ["customers_id", "name", "phone", "type"],
+    "shows": ["shows_id", "title", "date", "venue"],
+    "bookings": ["bookings_id", "customer_id", "show_id", "booking_date", "total_price"],
+    "seats": ["seats_id", "booking_id", "show_id", "seat_number", "price", "status"],
+}
+
+# CHECK constraints, validated before anything is written
+ALLOWED_VALUES = {
+    ("customers", "type"): {"Child", "Adult", "Senior", "VIP"},
+    ("seats", "status"): {"Booked", "Available", "Blocked"},
+}
+
+# Triggers are dropped for the load and their derived data rebuilt once at the end
+REBUILD_AFTER_LOAD = {
+    "customers": [
+        "INSERT INTO customers_fts(customers_fts) VALUES ('rebuild')",
+        "UPDATE customer_type_counts SET count = ("
+        "SELECT COUNT(*) FROM customers c WHERE c.type = customer_type_counts.type)",
+    ],
+    "bookings": [
+        "UPDATE bookings SET updated_at = (julianday('now') - 2440587.5) * 86400.0 "
+        "WHERE updated_at IS NULL",
+        *SALES_SUMMARY_REFRESH,
+    ],
+    "seats": [
+        "UPDATE seats SET base_price = price WHERE base_price IS NULL",
+        *SALES_SUMMARY_REFRESH,
+    ],
+}
+
+
+# Loaded rows never reach the change log, so terminal replicas are made to
+# see a gap in it and take a fresh copy instead of pulling deltas
+FORCE_REPLICA_RESYNC = [
+    "DELETE FROM change_log",
+    "INSERT INTO sqlite_sequence (name, seq) SELECT 'change_log', 0 "
+    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'change_log')",
+    "UPDATE sqlite_sequence SET seq = seq + 1 WHERE name = 'change_log'",
+]
+
+
+class BulkError(Exception):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".json", ".ndjson")) else "csv"
+
+
+def read_rows(path, columns, fmt=None):
+    # Yields (line_number, tuple) in table column order
+    fmt = detect_format(path, fmt)
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            unknown = set(reader.fieldnames or ()) - set(columns)
+            if unknown:
+                raise BulkError(f"Unknown columns in {path}: {sorted(unknown)}")
+            for record in reader:
+                yield reader.line_num, tuple(record.get(c) or None for c in columns)
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                unknown = set(record) - set(columns)
+                if unknown:
+                    raise BulkError(f"Unknown columns on line {line_number}: {sorted(unknown)}")
+                yield line_number, tuple(
+                    None if record.get(c) == "" else record.get(c) for c in columns
+                )
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def validate(table, path, fmt=None):
+    columns = TABLES[table]
+    checks = [
+        (columns.index(column), allowed)
+        for (check_table, column), allowed in ALLOWED_VALUES.items()
+        if check_table == table
+    ]
+    count = 0
+    for line_number, row in read_rows(path, columns, fmt):
+        for position, allowed in checks:
+            if row[position] is not None and row[position] not in allowed:
+                raise BulkError(
+                    f"Line {line_number}: {columns[position]} {row[position]!r} "
+                    f"is not one of {sorted(allowed)}"
+                )
+        count += 1
+    return count
+
+
+def _schema_objects(conn, table, kind):
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = ? AND tbl_name = ? AND sql IS NOT NULL",
+        (kind, table),
+    ).fetchall()
+
+
+def _bad_row(conn, table, sql, chunk, offset, committed, error):
+    # executemany does not say which row failed; replay the chunk to find it
+    for position, row in enumerate(chunk, offset + 1):
+        try:
+            conn.execute(sql, row)
+        except sqlite3.IntegrityError as e:
+            error = f"row {position} {dict(zip(TABLES[table], row))}: {e}"
+            break
+    note = f" ({committed} earlier rows were already committed)" if committed else ""
+    return BulkError(f"{table} {error}{note}")
+
+
+def import_table(pool, table, path, fmt=None, chunk_size=CHUNK_SIZE,
+                 commit_every=COMMIT_EVERY, skip_validation=False, log=None):
+    if table not in TABLES:
+        raise BulkError(f"Unknown table {table!r}")
+    if not skip_validation:
+        validate(table, path, fmt)
+    rows = (row for _, row in read_rows(path, TABLES[table], fmt))
+    return load_rows(pool, table, rows, chunk_size, commit_every, log)
+
+
+def load_rows(pool, table, rows, chunk_size=CHUNK_SIZE, commit_every=COMMIT_EVERY, log=None):
+    # rows: iterable of tuples in TABLES[table] column order
+    columns = TABLES[table]
+    conn = pool.connection()
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+    # Finish a load of this table that died before dropping anything again
+    run_pending_rebuilds(conn, table, log)
+    conn.execute("PRAGMA cache_size = -262144")
+    with pool.transaction("IMMEDIATE"):
+        indexes = _schema_objects(conn, table, "index")
+        triggers = _schema_objects(conn, table, "trigger")
+        # Indexes are recreated in one sorted pass each, then the triggers and
+        # derived data. Recorded with the drops, so a crash cannot lose them.
+        rebuild = [
+            *(index_sql for _, index_sql in indexes),
+            *(trigger_sql for _, trigger_sql in triggers),
+            *REBUILD_AFTER_LOAD.get(table, ()),
+            *FORCE_REPLICA_RESYNC,
+        ]
+        conn.executemany(
+            "INSERT INTO pending_rebuild (table_name, sql) VALUES (?, ?)",
+            [(table, rebuild_sql) for rebuild_sql in rebuild],
+        )
+        for name, _ in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+        for name, _ in indexes:
+            conn.execute(f"DROP INDEX {name}")
+    loaded = 0
+    started = time.perf_counter()
+    try:
+        pending = 0
+        conn.execute("BEGIN IMMEDIATE")
+        for chunk in chunked(rows, chunk_size):
+            conn.execute("SAVEPOINT chunk")
+            try:
+                conn.executemany(sql, chunk)
+            except sqlite3.IntegrityError as e:
+                conn.execute("ROLLBACK TO chunk")
+                raise _bad_row(conn, table, sql, chunk, loaded, loaded - pending, e) from e
+            conn.execute("RELEASE chunk")
+            loaded += len(chunk)
+            pending += len(chunk)
+            if pending >= commit_every:
+                conn.execute("COMMIT")
+                conn.execute("BEGIN IMMEDIATE")
+                pending = 0
+                if log:
+                    log(f"{table}: {loaded} rows")
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        run_pending_rebuilds(conn, table)
+        conn.execute(f"ANALYZE {table}")
+    if log:
+        log(f"{table}: imported {loaded} rows in {time.perf_counter() - started:.1f}s")
+    return loaded
+
+
+def export_rows(pool, table):
+    columns = TABLES[table]
+    cursor = pool.connection().execute(
+        f"SELECT {', '.join(columns)} FROM {table} ORDER BY {columns[0]}"
+    )
+    cursor.arraysize = CHUNK_SIZE
+    while True:
+        rows = cursor.fetchmany()
+        if not rows:
+            return
+        yield from rows
+
+
+def export_table(pool, table, path, fmt=None):
+    if table not in TABLES:
+        raise BulkError(f"Unknown table {table!r}")
+    columns = TABLES[table]
+    fmt = detect_format(path, fmt)
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in export_rows(pool, table):
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in export_rows(pool, table):
+                f.write(json.dumps(dict(zip(columns, row)), default=str))
+                f.write("\n")
+                count += 1
+    return count
+
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(prog="main.py", description="Bulk import and export")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--database", help="Path to the database (default: system.db)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--skip-validation", action="store_true")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.database) if args.database else ConnectionPool()
+    migrate(pool.connection())
+    try:
+        if args.command == "import":
+            if not os.path.exists(args.path):
+                parser.error(f"{args.path} does not exist")
+            import_table(pool, args.table, args.path, args.format, args.chunk_size,
+                         skip_validation=args.skip_validation, log=print)
+        else:
+            count = export_table(pool, args.table, args.path, args.format)
+            print(f"{args.table}: exported {count} rows to {args.path}")
+    except BulkError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except sqlite3.DatabaseError as e:
+        print(f"Error: {args.table}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        pool.close_all()
+    return 0
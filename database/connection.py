@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "system.db")
+
+# Big enough to keep every statement the dialogs and engines issue prepared
+STATEMENT_CACHE_SIZE = 256
+MAX_CONNECTIONS = 8
+BUSY_TIMEOUT_MS = 5000
+
+
+class ConnectionPool:
+    # Hands out one connection per thread. sqlite3 connections are thread
+    # confined, so a thread always gets its own connection back and keeps
+    # its prepared statement cache warm for as long as the thread lives.
+
+    def __init__(self, path=DB_PATH, max_connections=MAX_CONNECTIONS,
+                 cached_statements=STATEMENT_CACHE_SIZE):
+        self.path = path
+        self.max_connections = max_connections
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = {}
+        self._lock = threading.Condition()
+        self._attachments = {}
+        self._attachments_version = 0
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+    def _prune_dead_threads(self):
+        alive = {thread.ident for thread in threading.enumerate()}
+        for ident in list(self._connections):
+            if ident not in alive:
+                # The owning thread is gone so nobody else can be using it
+                conn = self._connections.pop(ident)
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass
+
+    def attach(self, alias, path, setup=()):
+        # Attach another database file to every connection, current and future.
+        # setup: statements run on each connection after attaching, e.g. TEMP views.
+        with self._lock:
+            self._attachments[alias] = (path, tuple(setup))
+            self._attachments_version += 1
+
+    def _apply_attachments(self, conn):
+        # ATTACH is not allowed inside a transaction; try again on the next call
+        if conn.in_transaction:
+            return
+        with self._lock:
+            attachments = dict(self._attachments)
+            version = self._attachments_version
+        attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+        for alias, (path, setup) in attachments.items():
+            if alias in attached:
+                continue
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+            for statement in setup:
+                conn.execute(statement)
+        self._local.attachments_version = version
+
+    def connection(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is not None:
+            if getattr(self._local, "attachments_version", 0) != self._attachments_version:
+                self._apply_attachments(conn)
+            return conn
+        with self._lock:
+            if len(self._connections) >= self.max_connections:
+                self._prune_dead_threads()
+            while len(self._connections) >= self.max_connections:
+                self._lock.wait(timeout=0.1)
+                self._prune_dead_threads()
+            conn = self._open()
+            self._connections[threading.get_ident()] = conn
+        self._local.connection = conn
+        if self._attachments:
+            self._apply_attachments(conn)
+        return conn
+
+    def release(self):
+        # Called by worker threads that are about to finish
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            return
+        self._local.connection = None
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+            self._lock.notify()
+        conn.close()
+
+    @contextmanager
+    def transaction(self, mode="DEFERRED"):
+        conn = self.connection()
+        if conn.in_transaction:
+            # Nested use joins the outer transaction
+            yield conn
+            return
+        conn.execute(f"BEGIN {mode}")
+        self._local.on_commit = []
+        try:
+            yield conn
+        except BaseException:
+            self._local.on_commit = None
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+            callbacks, self._local.on_commit = self._local.on_commit, None
+            for callback in callbacks:
+                callback()
+
+    @contextmanager
+    def savepoint(self, name="item"):
+        # Undo just this block on error, inside a larger transaction. on_commit
+        # callbacks registered in the block are dropped along with its writes.
+        conn = self.connection()
+        callbacks = getattr(self._local, "on_commit", None)
+        mark = len(callbacks) if callbacks is not None else 0
+        conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            if callbacks is not None:
+                del callbacks[mark:]
+            raise
+        else:
+            conn.execute(f"RELEASE {name}")
+
+    def on_commit(self, callback):
+        # Run callback once the current transaction commits; dropped on rollback.
+        # Outside a transaction it runs straight away.
+        callbacks = getattr(self._local, "on_commit", None)
+        if callbacks is None:
+            callback()
+        else:
+            callbacks.append(callback)
+
+    def close_all(self):
+        with self._lock:
+            self._local = threading.local()
+            connections, self._connections = self._connections, {}
+            self._lock.notify_all()
+        for conn in connections.values():
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Owned by another thread, it goes away with that thread
+                pass
@@ -0,0 +1,511 @@
+# Versioned schema migrations. The applied version is stored in
+# PRAGMA user_version, so each step runs exactly once per database.
+# Append new steps to the end of MIGRATIONS, never edit an applied one.
+
+import sqlite3
+
+
+def _add_booking(row):
+    return f"""    INSERT INTO show_sales (show_id, bookings, revenue)
+    SELECT {row}.show_id, 1, COALESCE({row}.total_price, 0) WHERE {row}.show_id IS NOT NULL
+    ON CONFLICT (show_id) DO UPDATE SET
+        bookings = bookings + 1, revenue = revenue + excluded.revenue;
+    INSERT INTO daily_sales (day, show_id, bookings, revenue)
+    SELECT date({row}.booking_date), {row}.show_id, 1, COALESCE({row}.total_price, 0)
+    WHERE {row}.show_id IS NOT NULL AND date({row}.booking_date) IS NOT NULL
+    ON CONFLICT (day, show_id) DO UPDATE SET
+        bookings = bookings + 1, revenue = revenue + excluded.revenue;"""
+
+
+def _remove_booking(row):
+    return f"""    UPDATE show_sales SET bookings = bookings - 1, revenue = revenue - COALESCE({row}.total_price, 0)
+    WHERE show_id = {row}.show_id;
+    UPDATE daily_sales SET bookings = bookings - 1, revenue = revenue - COALESCE({row}.total_price, 0)
+    WHERE day = date({row}.booking_date) AND show_id = {row}.show_id;"""
+
+
+def _add_seat(row):
+    return f"""    INSERT INTO show_sales (show_id, booked_seats, available_seats, blocked_seats)
+    SELECT {row}.show_id, {row}.status = 'Booked', {row}.status = 'Available', {row}.status = 'Blocked'
+    WHERE {row}.show_id IS NOT NULL
+    ON CONFLICT (show_id) DO UPDATE SET
+        booked_seats = booked_seats + excluded.booked_seats,
+        available_seats = available_seats + excluded.available_seats,
+        blocked_seats = blocked_seats + excluded.blocked_seats;"""
+
+
+def _remove_seat(row):
+    return f"""    UPDATE show_sales SET
+        booked_seats = booked_seats - ({row}.status = 'Booked'),
+        available_seats = available_seats - ({row}.status = 'Available'),
+        blocked_seats = blocked_seats - ({row}.status = 'Blocked')
+    WHERE show_id = {row}.show_id;"""
+
+
+# Recomputes the sales summaries from scratch (as of migration 8)
+SALES_SUMMARY_REBUILD = [
+    "DELETE FROM show_sales",
+    "INSERT INTO show_sales (show_id, bookings, revenue) "
+    "SELECT show_id, COUNT(*), TOTAL(total_price) FROM bookings "
+    "WHERE show_id IS NOT NULL GROUP BY show_id",
+    "INSERT INTO show_sales (show_id, booked_seats, available_seats, blocked_seats) "
+    "SELECT show_id, SUM(status = 'Booked'), SUM(status = 'Available'), SUM(status = 'Blocked') "
+    "FROM seats WHERE show_id IS NOT NULL GROUP BY show_id "
+    "ON CONFLICT (show_id) DO UPDATE SET booked_seats = excluded.booked_seats, "
+    "available_seats = excluded.available_seats, blocked_seats = excluded.blocked_seats",
+    "DELETE FROM daily_sales",
+    "INSERT INTO daily_sales (day, show_id, bookings, revenue) "
+    "SELECT date(booking_date), show_id, COUNT(*), TOTAL(total_price) FROM bookings "
+    "WHERE show_id IS NOT NULL AND date(booking_date) IS NOT NULL GROUP BY 1, 2",
+]
+
+def _script(statements):
+    return "".join(f"{statement};\n" for statement in statements)
+
+
+# Recomputes the sales summaries after bulk loads that bypass the triggers.
+# Archived shows have no rows left here, so their totals are kept as they are.
+SALES_SUMMARY_REFRESH = [
+    "DELETE FROM show_sales WHERE show_id NOT IN "
+    "(SELECT shows_id FROM shows WHERE archived_at IS NOT NULL)",
+    "DELETE FROM daily_sales WHERE show_id NOT IN "
+    "(SELECT shows_id FROM shows WHERE archived_at IS NOT NULL)",
+    *(statement for statement in SALES_SUMMARY_REBUILD if not statement.startswith("DELETE")),
+]
+
+MIGRATIONS = [
+    (1, "Base ticketing schema", """
+CREATE TABLE IF NOT EXISTS customers (
+    customers_id INTEGER PRIMARY KEY,
+    name TEXT,
+    phone TEXT,
+    type TEXT CHECK(type IN ('Child', 'Adult', 'Senior', 'VIP'))
+);
+
+CREATE TABLE IF NOT EXISTS shows (
+    shows_id INTEGER PRIMARY KEY,
+    title TEXT,
+    date DATETIME,
+    venue TEXT
+);
+
+CREATE TABLE IF NOT EXISTS bookings (
+    bookings_id INTEGER PRIMARY KEY,
+    customer_id INTEGER,
+    show_id INTEGER,
+    booking_date DATETIME,
+    total_price DECIMAL(10,2),
+    FOREIGN KEY (customer_id) REFERENCES customers(customers_id),
+    FOREIGN KEY (show_id) REFERENCES shows(shows_id)
+);
+
+CREATE TABLE IF NOT EXISTS seats (
+    seats_id INTEGER PRIMARY KEY,
+    booking_id INTEGER,
+    seat_number TEXT,
+    price DECIMAL(10,2),
+    status TEXT CHECK(status IN ('Booked', 'Available', 'Blocked')),
+    FOREIGN KEY (booking_id) REFERENCES bookings(bookings_id)
+);
+"""),
+    (2, "Seat show reference and search indexes", """
+-- Available seats have no booking, so seats need their own link to the show
+ALTER TABLE seats ADD COLUMN show_id INTEGER REFERENCES shows(shows_id);
+UPDATE seats SET show_id = (
+    SELECT b.show_id FROM bookings b WHERE b.bookings_id = seats.booking_id
+) WHERE booking_id IS NOT NULL;
+
+-- Customer search: NOCASE so LIKE 'abc%' can seek, extra columns make them covering
+CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(name COLLATE NOCASE, phone, type);
+CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers(phone COLLATE NOCASE, name, type);
+CREATE INDEX IF NOT EXISTS idx_customers_type ON customers(type, name COLLATE NOCASE, phone);
+
+-- Booking search by customer, show and date
+CREATE INDEX IF NOT EXISTS idx_bookings_customer ON bookings(customer_id, booking_date);
+CREATE INDEX IF NOT EXISTS idx_bookings_show ON bookings(show_id, booking_date);
+CREATE INDEX IF NOT EXISTS idx_bookings_date ON bookings(booking_date);
+
+-- Seat map loads and booking lookups
+CREATE INDEX IF NOT EXISTS idx_seats_booking ON seats(booking_id);
+CREATE INDEX IF NOT EXISTS idx_seats_show ON seats(show_id, seat_number, status, price, booking_id);
+CREATE INDEX IF NOT EXISTS idx_seats_available ON seats(show_id, seat_number) WHERE status = 'Available';
+"""),
+    (3, "Trigram full-text index over customer name and phone", """
+-- External content table: the index stores only trigrams, the text stays in customers
+CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+    name, phone,
+    content='customers', content_rowid='customers_id',
+    tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN
+    INSERT INTO customers_fts(rowid, name, phone) VALUES (new.customers_id, new.name, new.phone);
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN
+    INSERT INTO customers_fts(customers_fts, rowid, name, phone)
+    VALUES ('delete', old.customers_id, old.name, old.phone);
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE OF name, phone ON customers BEGIN
+    INSERT INTO customers_fts(customers_fts, rowid, name, phone)
+    VALUES ('delete', old.customers_id, old.name, old.phone);
+    INSERT INTO customers_fts(rowid, name, phone) VALUES (new.customers_id, new.name, new.phone);
+END;
+
+INSERT INTO customers_fts(customers_fts) VALUES ('rebuild');
+"""),
+    (4, "Seat holds", """
+-- A held seat stays 'Available' but belongs to hold_token until hold_expires (unix time)
+ALTER TABLE seats ADD COLUMN hold_token TEXT;
+ALTER TABLE seats ADD COLUMN hold_expires REAL;
+CREATE INDEX IF NOT EXISTS idx_seats_hold_token ON seats(hold_token) WHERE hold_token IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_seats_hold_expires ON seats(hold_expires) WHERE hold_token IS NOT NULL;
+"""),
+    (5, "Booking last-modified stamp", """
+-- updated_at (unix time) changes whenever the booking or one of its seats does.
+-- It always moves forward by at least 1ms so two quick edits never share a stamp.
+ALTER TABLE bookings ADD COLUMN updated_at REAL;
+UPDATE bookings SET updated_at = (julianday('now') - 2440587.5) * 86400.0;
+
+CREATE TRIGGER IF NOT EXISTS bookings_stamp_insert AFTER INSERT ON bookings
+WHEN new.updated_at IS NULL BEGIN
+    UPDATE bookings SET updated_at = MAX(
+        (julianday('now') - 2440587.5) * 86400.0, COALESCE(updated_at, 0) + 0.001
+    )
+    WHERE bookings_id = new.bookings_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_stamp_update AFTER UPDATE ON bookings
+WHEN new.updated_at IS old.updated_at BEGIN
+    UPDATE bookings SET updated_at = MAX(
+        (julianday('now') - 2440587.5) * 86400.0, COALESCE(updated_at, 0) + 0.001
+    )
+    WHERE bookings_id = new.bookings_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS seats_stamp_booking_insert AFTER INSERT ON seats
+WHEN new.booking_id IS NOT NULL BEGIN
+    UPDATE bookings SET updated_at = MAX(
+        (julianday('now') - 2440587.5) * 86400.0, COALESCE(updated_at, 0) + 0.001
+    )
+    WHERE bookings_id = new.booking_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS seats_stamp_booking_update AFTER UPDATE ON seats
+WHEN old.booking_id IS NOT NULL OR new.booking_id IS NOT NULL BEGIN
+    UPDATE bookings SET updated_at = MAX(
+        (julianday('now') - 2440587.5) * 86400.0, COALESCE(updated_at, 0) + 0.001
+    )
+    WHERE bookings_id IN (old.booking_id, new.booking_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS seats_stamp_booking_delete AFTER DELETE ON seats
+WHEN old.booking_id IS NOT NULL BEGIN
+    UPDATE bookings SET updated_at = MAX(
+        (julianday('now') - 2440587.5) * 86400.0, COALESCE(updated_at, 0) + 0.001
+    )
+    WHERE bookings_id = old.booking_id;
+END;
+"""),
+    (6, "Change log for cross-terminal updates", """
+-- Every seat and booking change gets a monotonically increasing seq.
+-- Open screens read the rows after the last seq they saw.
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    op TEXT NOT NULL CHECK(op IN ('insert', 'update', 'delete')),
+    show_id INTEGER,
+    booking_id INTEGER,
+    status TEXT,
+    changed_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+);
+CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log(changed_at);
+
+CREATE TRIGGER IF NOT EXISTS seats_log_insert AFTER INSERT ON seats BEGIN
+    INSERT INTO change_log (table_name, row_id, op, show_id, booking_id, status)
+    VALUES ('seats', new.seats_id, 'insert', new.show_id, new.booking_id, new.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS seats_log_update AFTER UPDATE OF status, booking_id, show_id, price, hold_token ON seats BEGIN
+    INSERT INTO change_log (table_name, row_id, op, show_id, booking_id, status)
+    VALUES ('seats', new.seats_id, 'update', new.show_id, new.booking_id,
+            CASE WHEN new.hold_token IS NOT NULL THEN 'Held' ELSE new.status END);
+END;
+
+CREATE TRIGGER IF NOT EXISTS seats_log_delete AFTER DELETE ON seats BEGIN
+    INSERT INTO change_log (table_name, row_id, op, show_id, booking_id, status)
+    VALUES ('seats', old.seats_id, 'delete', old.show_id, old.booking_id, NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_log_insert AFTER INSERT ON bookings BEGIN
+    INSERT INTO change_log (table_name, row_id, op, show_id, booking_id)
+    VALUES ('bookings', new.bookings_id, 'insert', new.show_id, new.bookings_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_log_update AFTER UPDATE OF customer_id, show_id, booking_date, total_price ON bookings BEGIN
+    INSERT INTO change_log (table_name, row_id, op, show_id, booking_id)
+    VALUES ('bookings', new.bookings_id, 'update', new.show_id, new.bookings_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_log_delete AFTER DELETE ON bookings BEGIN
+    INSERT INTO change_log (table_name, row_id, op, show_id, booking_id)
+    VALUES ('bookings', old.bookings_id, 'delete', old.show_id, old.bookings_id);
+END;
+"""),
+    (7, "Customer type counts for the search facets", """
+-- One row per type, kept exact by triggers so facet counts never scan customers
+CREATE TABLE IF NOT EXISTS customer_type_counts (
+    type TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO customer_type_counts (type) VALUES ('Child'), ('Adult'), ('Senior'), ('VIP');
+UPDATE customer_type_counts SET count = (
+    SELECT COUNT(*) FROM customers c WHERE c.type = customer_type_counts.type
+);
+
+CREATE TRIGGER IF NOT EXISTS customers_type_count_insert AFTER INSERT ON customers
+WHEN new.type IS NOT NULL BEGIN
+    UPDATE customer_type_counts SET count = count + 1 WHERE type = new.type;
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_type_count_delete AFTER DELETE ON customers
+WHEN old.type IS NOT NULL BEGIN
+    UPDATE customer_type_counts SET count = count - 1 WHERE type = old.type;
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_type_count_update AFTER UPDATE OF type ON customers
+WHEN old.type IS NOT new.type BEGIN
+    UPDATE customer_type_counts SET count = count - 1 WHERE type = old.type;
+    UPDATE customer_type_counts SET count = count + 1 WHERE type = new.type;
+END;
+
+-- (type, rowid) order: a facet branch seeks straight to the next page of ids
+CREATE INDEX IF NOT EXISTS idx_customers_type_id ON customers(type);
+"""),
+    (8, "Materialized sales and occupancy per show and per day", f"""
+-- Running totals kept by triggers inside the writing transaction, so the
+-- summaries are read by primary key instead of aggregating bookings and seats
+CREATE TABLE IF NOT EXISTS show_sales (
+    show_id INTEGER PRIMARY KEY,
+    bookings INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0,
+    booked_seats INTEGER NOT NULL DEFAULT 0,
+    available_seats INTEGER NOT NULL DEFAULT 0,
+    blocked_seats INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_sales (
+    day TEXT NOT NULL,
+    show_id INTEGER NOT NULL,
+    bookings INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, show_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS bookings_sales_insert AFTER INSERT ON bookings
+WHEN new.show_id IS NOT NULL BEGIN
+{_add_booking("new")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_sales_delete AFTER DELETE ON bookings
+WHEN old.show_id IS NOT NULL BEGIN
+{_remove_booking("old")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_sales_update AFTER UPDATE OF show_id, booking_date, total_price ON bookings BEGIN
+{_remove_booking("old")}
+{_add_booking("new")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS seats_sales_insert AFTER INSERT ON seats
+WHEN new.show_id IS NOT NULL BEGIN
+{_add_seat("new")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS seats_sales_delete AFTER DELETE ON seats
+WHEN old.show_id IS NOT NULL BEGIN
+{_remove_seat("old")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS seats_sales_update AFTER UPDATE OF status, show_id ON seats
+WHEN old.status IS NOT new.status OR old.show_id IS NOT new.show_id BEGIN
+{_remove_seat("old")}
+{_add_seat("new")}
+END;
+
+{_script(SALES_SUMMARY_REBUILD)}
+"""),
+    (9, "Archived show marker", """
+-- Set once a finished show's bookings and seats have moved to the archive database
+ALTER TABLE shows ADD COLUMN archived_at REAL;
+"""),
+    (10, "Pricing rules", """
+-- price is what a seat sells for now; base_price is what pricing starts from
+ALTER TABLE seats ADD COLUMN base_price REAL;
+UPDATE seats SET base_price = price;
+
+-- Base price per seat row. show_id 0 applies to every show without its own tier.
+CREATE TABLE IF NOT EXISTS price_tiers (
+    show_id INTEGER NOT NULL DEFAULT 0,
+    seat_row TEXT NOT NULL,
+    base_price REAL NOT NULL CHECK(base_price >= 0),
+    PRIMARY KEY (show_id, seat_row)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS customer_discounts (
+    type TEXT PRIMARY KEY,
+    discount REAL NOT NULL CHECK(discount >= 0 AND discount < 1)
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO customer_discounts VALUES
+    ('Child', 0.4), ('Adult', 0.0), ('Senior', 0.25), ('VIP', 0.1);
+
+-- Multiplier applied once a show's occupancy reaches min_occupancy
+CREATE TABLE IF NOT EXISTS demand_surge (
+    min_occupancy REAL PRIMARY KEY CHECK(min_occupancy >= 0 AND min_occupancy <= 1),
+    multiplier REAL NOT NULL CHECK(multiplier > 0)
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO demand_surge VALUES (0.0, 1.0), (0.6, 1.1), (0.8, 1.25), (0.95, 1.5);
+"""),
+    (11, "Terminal replica sync", """
+-- Set on bookings sold offline by a terminal replica: '<terminal>:<outbox id>'.
+-- Unique, so a sale pushed twice after a crash is only applied once.
+ALTER TABLE bookings ADD COLUMN origin TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_origin ON bookings(origin) WHERE origin IS NOT NULL;
+
+-- Replicas pull customers and shows through the change log too
+CREATE TRIGGER IF NOT EXISTS customers_log_insert AFTER INSERT ON customers BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('customers', new.customers_id, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_log_update AFTER UPDATE ON customers BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('customers', new.customers_id, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_log_delete AFTER DELETE ON customers BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('customers', old.customers_id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS shows_log_insert AFTER INSERT ON shows BEGIN
+    INSERT INTO change_log (table_name, row_id, op, show_id) VALUES ('shows', new.shows_id, 'insert', new.shows_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS shows_log_update AFTER UPDATE ON shows BEGIN
+    INSERT INTO change_log (table_name, row_id, op, show_id) VALUES ('shows', new.shows_id, 'update', new.shows_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS shows_log_delete AFTER DELETE ON shows BEGIN
+    INSERT INTO change_log (table_name, row_id, op, show_id) VALUES ('shows', old.shows_id, 'delete', old.shows_id);
+END;
+
+-- Seats an offline sale claimed but lost to an earlier sale, or took from a later one
+CREATE TABLE IF NOT EXISTS sync_conflicts (
+    id INTEGER PRIMARY KEY,
+    seat_id INTEGER NOT NULL,
+    show_id INTEGER,
+    winner_booking_id INTEGER,
+    loser_booking_id INTEGER,
+    loser_origin TEXT,
+    resolved_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+);
+"""),
+    (12, "Customer merge audit", """
+-- One row per merged-away customer: its old row and the bookings moved off it,
+-- enough to see what a merge did and to undo it
+CREATE TABLE IF NOT EXISTS customer_merges (
+    duplicate_id INTEGER PRIMARY KEY,
+    keep_id INTEGER NOT NULL,
+    name TEXT,
+    phone TEXT,
+    type TEXT,
+    booking_ids TEXT NOT NULL,
+    archived_booking_ids TEXT NOT NULL DEFAULT '[]',
+    merged_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+);
+CREATE INDEX IF NOT EXISTS idx_customer_merges_keep ON customer_merges(keep_id);
+"""),
+    (13, "Pending rebuilds after bulk loads", """
+-- Indexes and triggers a bulk load dropped, and the statements that rebuild
+-- their derived data, in the order they are to be run. Written in the same
+-- transaction as the drops, so a load that dies leaves them here.
+CREATE TABLE IF NOT EXISTS pending_rebuild (
+    id INTEGER PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    sql TEXT NOT NULL
+);
+"""),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _statements(script):
+    # executescript() commits any open transaction first, so steps are run
+    # statement by statement inside one BEGIN IMMEDIATE instead
+    statement = ""
+    for piece in script.split(";"):
+        statement += piece + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \n;"):
+                yield statement
+            statement = ""
+
+
+def run_pending_rebuilds(conn, table=None, log=None):
+    # Restore what an unfinished bulk load dropped; a no-op once done
+    if not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pending_rebuild'"
+    ).fetchone():
+        return 0
+    where, params = ("WHERE table_name = ?", (table,)) if table else ("", ())
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        pending = conn.execute(
+            f"SELECT table_name, sql FROM pending_rebuild {where} ORDER BY id", params
+        ).fetchall()
+        for _, sql in pending:
+            conn.execute(sql)
+        conn.execute(f"DELETE FROM pending_rebuild {where}", params)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    if pending and log:
+        tables = sorted({table_name for table_name, _ in pending})
+        log(f"Restored indexes and triggers dropped by a bulk load: {', '.join(tables)}")
+    return len(pending)
+
+
+def migrate(conn, target=LATEST_VERSION, log=None):
+    applied = []
+    for step_version, description, script in MIGRATIONS:
+        if step_version > target or step_version <= current_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Terminals starting together race here; whoever got the lock
+            # second sees the step already applied
+            if current_version(conn) >= step_version:
+                conn.execute("ROLLBACK")
+                continue
+            if log:
+                log(f"Applying migration {step_version}: {description}")
+            for statement in _statements(script):
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {step_version}")
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        applied.append(step_version)
+    run_pending_rebuilds(conn, log=log)
+    if applied:
+        conn.execute("ANALYZE")
+    return applied
@@ -0,0 +1,303 @@
+import os
+import time
+from datetime import date, timedelta
+from database.archive import ARCHIVE_ALIAS, ARCHIVE_VIEWS, archive_path_for
+from database.connection import ConnectionPool
+from database.migrations import migrate
+from engine.instrumentation import metrics
+
+CUSTOMER_COLUMNS = ["Customer ID", "Name", "Phone", "Type"]
+BOOKING_COLUMNS = ["Booking ID", "Customer", "Show", "Booking Date", "Total Price"]
+SEAT_COLUMNS = ["Seat ID", "Booking ID", "Seat", "Price", "Status"]
+
+CUSTOMER_TYPES = ("Child", "Adult", "Senior", "VIP")
+
+CUSTOMER_SELECT = "SELECT customers_id, name, phone, type FROM customers WHERE 1=1"
+BOOKING_SELECT = (
+    "SELECT b.bookings_id, c.name, s.title, b.booking_date, b.total_price "
+    "FROM bookings b "
+    "LEFT JOIN customers c ON c.customers_id = b.customer_id "
+    "LEFT JOIN shows s ON s.shows_id = b.show_id WHERE 1=1"
+)
+# Same columns over hot and archived bookings (see database/archive.py)
+ALL_BOOKINGS_SELECT = BOOKING_SELECT.replace("FROM bookings b", "FROM all_bookings b")
+SEAT_SELECT = (
+    "SELECT st.seats_id, st.booking_id, st.seat_number, st.price, st.status "
+    "FROM seats st "
+    "LEFT JOIN bookings b ON b.bookings_id = st.booking_id "
+    "LEFT JOIN customers c ON c.customers_id = b.customer_id WHERE 1=1"
+)
+# The trigram tokenizer cannot match anything shorter than this
+MIN_FTS_TERM = 3
+
+
+def fts_phrase(column, term):
+    return f'{column} : "{term.replace(chr(34), chr(34) * 2)}"'
+
+
+def customer_matches(row, filters):
+    # In-memory twin of the search_customers WHERE clause
+    customer_id, name, phone = str(row[0]), (row[1] or "").lower(), row[2] or ""
+    if filters.get("customer_id") and customer_id != filters["customer_id"]:
+        return False
+    if filters.get("first_name") and not name.startswith(filters["first_name"].lower()):
+        return False
+    if filters.get("last_name") and f" {filters['last_name'].lower()}" not in name:
+        return False
+    if filters.get("phone") and filters["phone"] not in phone:
+        return False
+    if filters.get("types") and row[3] not in filters["types"]:
+        return False
+    return True
+
+
+class Repository:
+    # All dialogs share one Repository so they share the pool behind it
+
+    def __init__(self, pool=None, auto_migrate=True):
+        self.pool = pool or ConnectionPool()
+        self.archive_attached = False
+        if auto_migrate:
+            migrate(self.pool.connection())
+
+    def attach_archive(self, path=None):
+        # Make archived shows searchable, if anything has been archived yet
+        path = path or archive_path_for(self.pool.path)
+        if os.path.exists(path):
+            self.pool.attach(ARCHIVE_ALIAS, path, ARCHIVE_VIEWS)
+            self.archive_attached = True
+        return self.archive_attached
+
+    def _bookings_source(self):
+        return "all_bookings" if self.archive_attached else "bookings"
+
+    def _seats_source(self):
+        return "all_seats" if self.archive_attached else "seats"
+
+    def execute(self, sql, params=()):
+        return self.pool.connection().execute(sql, params)
+
+    def fetchall(self, sql, params=()):
+        started = time.perf_counter()
+        rows = self.pool.connection().execute(sql, params).fetchall()
+        metrics.record_query(sql, params, len(rows), time.perf_counter() - started)
+        return rows
+
+    def fetchone(self, sql, params=()):
+        started = time.perf_counter()
+        row = self.pool.connection().execute(sql, params).fetchone()
+        metrics.record_query(sql, params, row is not None, time.perf_counter() - started)
+        return row
+
+    def search_customers(self, first_name="", last_name="", customer_id="", phone="",
+                         types=(), after_id=None, limit=500):
+        sql = CUSTOMER_SELECT
+        params = []
+        # Substring terms go through the trigram index to find candidates,
+        # the LIKE checks below then apply the exact field semantics
+        fts_terms = [
+            fts_phrase(column, term)
+            for column, term in (("name", first_name), ("name", last_name), ("phone", phone))
+            if len(term) >= MIN_FTS_TERM
+        ]
+        if fts_terms:
+            sql += " AND customers_id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)"
+            params.append(" AND ".join(fts_terms))
+        if customer_id:
+            sql += " AND customers_id = ?"
+            params.append(customer_id)
+        if first_name:
+            sql += " AND name LIKE ?"
+            params.append(f"{first_name}%")
+        if last_name:
+            sql += " AND name LIKE ?"
+            params.append(f"% {last_name}%")
+        if phone:
+            sql += " AND phone LIKE ?"
+            params.append(f"%{phone}%")
+        if after_id is not None:
+            # Keyset pagination: seek past the last row of the previous page
+            sql += " AND customers_id > ?"
+            params.append(after_id)
+        if types and not fts_terms:
+            # One branch per type, each walking idx_customers_type_id in id
+            # order, so only limit rows per type are read before the merge
+            branches = []
+            branch_params = []
+            for customer_type in types:
+                branches.append(
+                    f"SELECT * FROM ({sql} AND type = ? ORDER BY customers_id LIMIT ?)"
+                )
+                branch_params += [*params, customer_type, limit]
+            sql = f"SELECT * FROM ({' UNION ALL '.join(branches)})"
+            params = branch_params
+        elif types:
+            # The trigram match already narrowed the candidates
+            sql += f" AND type IN ({', '.join('?' * len(types))})"
+            params += list(types)
+        sql += " ORDER BY customers_id LIMIT ?"
+        params.append(limit)
+        return self.fetchall(sql, params)
+
+    def customer_type_counts(self):
+        return dict(self.fetchall("SELECT type, count FROM customer_type_counts"))
+
+    def search_bookings(self, first_name="", last_name="", booking_id="", show_id=None,
+                        date_from=None, date_to=None, after=None, limit=500,
+                        include_archive=False):
+        # Newest first. after is the (booking_date, bookings_id) of the last row
+        # of the previous page; the show, customer and date indexes all end in
+        # (booking_date, rowid), so each page is a single backwards index seek.
+        # Undated bookings sort last and a row-value comparison with NULL is
+        # never true, so a page that runs past the dated ones is topped up
+        # from them with a second seek.
+        sql = ALL_BOOKINGS_SELECT if include_archive and self.archive_attached else BOOKING_SELECT
+        params = []
+        if booking_id:
+            sql += " AND b.bookings_id = ?"
+            params.append(booking_id)
+        if show_id is not None:
+            sql += " AND b.show_id = ?"
+            params.append(show_id)
+        if date_from:
+            sql += " AND b.booking_date >= ?"
+            params.append(str(date_from))
+        if date_to:
+            # booking_date carries a time, so compare against the start of the next day
+            sql += " AND b.booking_date < ?"
+            params.append((date.fromisoformat(str(date_to)) + timedelta(days=1)).isoformat())
+        if first_name:
+            sql += " AND c.name LIKE ?"
+            params.append(f"{first_name}%")
+        if last_name:
+            sql += " AND c.name LIKE ?"
+            params.append(f"% {last_name}%")
+        order = " ORDER BY b.booking_date DESC, b.bookings_id DESC LIMIT ?"
+        if after is None:
+            return self.fetchall(sql + order, [*params, limit])
+        after_date, after_id = after
+        rows = []
+        if after_date is not None:
+            rows = self.fetchall(
+                sql + " AND (b.booking_date, b.bookings_id) < (?, ?)" + order,
+                [*params, after_date, after_id, limit],
+            )
+            after_id = None
+        if len(rows) < limit:
+            undated = sql + " AND b.booking_date IS NULL"
+            undated_params = list(params)
+            if after_id is not None:
+                undated += " AND b.bookings_id < ?"
+                undated_params.append(after_id)
+            rows += self.fetchall(undated + order, [*undated_params, limit - len(rows)])
+        return rows
+
+    def search_seats(self, first_name="", last_name="", booking_id="", show_id=None,
+                     after_id=None, limit=500):
+        sql = SEAT_SELECT
+        params = []
+        if show_id is not None:
+            sql += " AND st.show_id = ?"
+            params.append(show_id)
+        if booking_id:
+            sql += " AND st.booking_id = ?"
+            params.append(booking_id)
+        if first_name:
+            sql += " AND c.name LIKE ?"
+            params.append(f"{first_name}%")
+        if last_name:
+            sql += " AND c.name LIKE ?"
+            params.append(f"% {last_name}%")
+        if after_id is not None:
+            sql += " AND st.seats_id > ?"
+            params.append(after_id)
+        sql += " ORDER BY st.seats_id LIMIT ?"
+        params.append(limit)
+        return self.fetchall(sql, params)
+
+    def bookings_by_ids(self, booking_ids):
+        booking_ids = list(booking_ids)
+        return self.fetchall(
+            f"{BOOKING_SELECT} AND b.bookings_id IN ({', '.join('?' * len(booking_ids))})",
+            booking_ids,
+        )
+
+    def seats_by_ids(self, seat_ids):
+        seat_ids = list(seat_ids)
+        return self.fetchall(
+            f"{SEAT_SELECT} AND st.seats_id IN ({', '.join('?' * len(seat_ids))})",
+            seat_ids,
+        )
+
+    def show_seats(self, show_id):
+        # Seats under a live hold are reported as 'Held'
+        return self.fetchall(
+            "SELECT seats_id, seat_number, "
+            "CASE WHEN hold_token IS NOT NULL AND hold_expires >= ? THEN 'Held' ELSE status END, "
+            "price FROM seats WHERE show_id = ?",
+            (time.time(), show_id),
+        )
+
+    def booking_ids(self):
+        return [row[0] for row in self.fetchall(f"SELECT bookings_id FROM {self._bookings_source()}")]
+
+    def booking_stamp(self, booking_id):
+        # Changes whenever the booking's report would: the booking's own stamp,
+        # plus the customer and show fields it prints, which carry no stamp
+        return self.fetchone(
+            "SELECT b.updated_at, c.name, c.phone, c.type, s.title, s.date, s.venue "
+            f"FROM {self._bookings_source()} b "
+            "LEFT JOIN customers c ON c.customers_id = b.customer_id "
+            "LEFT JOIN shows s ON s.shows_id = b.show_id "
+            "WHERE b.bookings_id = ?",
+            (booking_id,),
+        )
+
+    def booking_report_data(self, booking_id):
+        booking = self.fetchone(
+            "SELECT b.bookings_id, b.booking_date, b.total_price, b.updated_at, "
+            "c.customers_id, c.name, c.phone, c.type, s.shows_id, s.title, s.date, s.venue "
+            f"FROM {self._bookings_source()} b "
+            "LEFT JOIN customers c ON c.customers_id = b.customer_id "
+            "LEFT JOIN shows s ON s.shows_id = b.show_id "
+            "WHERE b.bookings_id = ?",
+            (booking_id,),
+        )
+        if booking is None:
+            return None
+        seats = self.fetchall(
+            f"SELECT seat_number, price, status FROM {self._seats_source()} "
+            "WHERE booking_id = ? ORDER BY seat_number",
+            (booking_id,),
+        )
+        return booking, seats
+
+    def customer_exists(self, customer_id):
+        return self.fetchone("SELECT 1 FROM customers WHERE customers_id = ?", (customer_id,)) is not None
+
+    def list_shows(self):
+        return self.fetchall("SELECT shows_id, title, date, venue FROM shows ORDER BY date")
+
+    def show_sales(self, show_id):
+        # (bookings, revenue, booked, available, blocked) from the maintained summary
+        row = self.fetchone(
+            "SELECT bookings, revenue, booked_seats, available_seats, blocked_seats "
+            "FROM show_sales WHERE show_id = ?",
+            (show_id,),
+        )
+        return row or (0, 0.0, 0, 0, 0)
+
+    def sales_totals(self):
+        # One summary row per show, so this stays cheap however many sales there are
+        return self.fetchone(
+            "SELECT COUNT(*), TOTAL(bookings), TOTAL(revenue), TOTAL(booked_seats), "
+            "TOTAL(available_seats), TOTAL(blocked_seats) FROM show_sales"
+        )
+
+    def daily_sales(self, day, show_id=None):
+        sql = "SELECT TOTAL(bookings), TOTAL(revenue) FROM daily_sales WHERE day = ?"
+        params = [day]
+        if show_id is not None:
+            sql += " AND show_id = ?"
+            params.append(show_id)
+        return self.fetchone(sql, params)
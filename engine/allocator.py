@@ -0,0 +1,128 @@
+import weakref
+from dataclasses import dataclass
+from typing import List
+
+from engine.seat_map import row_order, run_starts
+
+ROW_WEIGHT = 4.0
+CENTRE_WEIGHT = 1.0
+# Per price tier above the show's cheapest (tiers are its distinct seat
+# prices). Smaller than ROW_WEIGHT, so it breaks near-ties between rows in
+# favour of the cheaper tier rather than overriding the preferred row.
+PRICE_WEIGHT = 1.0
+
+
+@dataclass
+class Allocation:
+    seat_ids: List[int]
+    seat_numbers: List[str]
+    row: str
+    score: float
+    total_price: float
+
+
+class _RowIndex:
+    # Static per-row geometry of a seat map, computed once per map:
+    # row mask, bit range, centre position, per-price masks and price tiers
+    def __init__(self, seat_map):
+        self.rows = []
+        for row, mask in sorted(seat_map.row_masks.items(), key=lambda item: row_order(item[0])):
+            first = (mask & -mask).bit_length() - 1
+            last = mask.bit_length() - 1
+            self.rows.append((row, mask, first, last, (first + last) / 2))
+        self.price_masks = {}
+        for position, price in enumerate(seat_map.prices):
+            self.price_masks[price] = self.price_masks.get(price, 0) | (1 << position)
+        self.tier_of_price = {price: tier for tier, price in enumerate(sorted(self.price_masks))}
+
+    def affordable_mask(self, max_price):
+        mask = 0
+        for price, price_mask in self.price_masks.items():
+            if price <= max_price:
+                mask |= price_mask
+        return mask
+
+
+def _nearest_bit(mask, target):
+    # Set bit of mask closest to position target, or None
+    below = mask & ((1 << (target + 1)) - 1)
+    above = mask >> (target + 1)
+    candidates = []
+    if below:
+        candidates.append(below.bit_length() - 1)
+    if above:
+        candidates.append((above & -above).bit_length() + target)
+    if not candidates:
+        return None
+    return min(candidates, key=lambda position: abs(position - target))
+
+
+class SeatAllocator:
+    # Best-available allocation over a SeatMap.
+    #
+    # Candidate blocks come straight from the free bit plane, so no seat-by-
+    # seat search is needed: per row we take the free block nearest the row
+    # centre and score it by distance from the preferred row, distance from
+    # the centre and the price tier of its dearest seat.
+
+    def __init__(self, seat_maps, row_weight=ROW_WEIGHT, centre_weight=CENTRE_WEIGHT,
+                 price_weight=PRICE_WEIGHT):
+        self.seat_maps = seat_maps
+        self.row_weight = row_weight
+        self.centre_weight = centre_weight
+        self.price_weight = price_weight
+        self._indexes = weakref.WeakKeyDictionary()
+
+    def _index(self, seat_map):
+        index = self._indexes.get(seat_map)
+        if index is None:
+            index = self._indexes[seat_map] = _RowIndex(seat_map)
+        return index
+
+    def best_available(self, show_id, party_size, preferred_row=None, max_price=None):
+        seat_map = self.seat_maps.get(show_id)
+        if party_size < 1 or party_size > len(seat_map):
+            return None
+        index = self._index(seat_map)
+        starts = seat_map.adjacent_free_starts(party_size)
+        if max_price is not None:
+            # Every seat in the block must be affordable
+            starts &= run_starts(index.affordable_mask(max_price), party_size)
+        if not starts:
+            return None
+        rows = [row[0] for row in index.rows]
+        if preferred_row is None:
+            # Default to a third of the way back, the usual sweet spot
+            preferred_row = len(rows) // 3
+        elif not isinstance(preferred_row, int):
+            preferred_row = rows.index(preferred_row) if preferred_row in rows else 0
+        order = sorted(range(len(index.rows)), key=lambda i: abs(i - preferred_row))
+        half = (party_size - 1) / 2
+        best = None
+        for i in order:
+            row_cost = self.row_weight * abs(i - preferred_row)
+            if best is not None and row_cost >= best[0] and self.price_weight >= 0:
+                # Rows are visited by distance, nothing further away can win
+                break
+            row, mask, first, last, centre = index.rows[i]
+            row_starts = starts & mask
+            if not row_starts:
+                continue
+            start = _nearest_bit(row_starts, max(first, round(centre - half)))
+            score = row_cost + self.centre_weight * abs(start + half - centre)
+            if self.price_weight:
+                tier = max(index.tier_of_price[price] for price in seat_map.prices[start:start + party_size])
+                score += self.price_weight * tier
+            if best is None or score < best[0]:
+                best = (score, row, start)
+        if best is None:
+            return None
+        score, row, start = best
+        positions = range(start, start + party_size)
+        return Allocation(
+            seat_ids=[seat_map.seat_ids[p] for p in positions],
+            seat_numbers=[seat_map.seat_numbers[p] for p in positions],
+            row=row,
+            score=score,
+            total_price=round(sum(seat_map.prices[p] for p in positions), 2),
+        )
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    # Thread-safe LRU cache with an optional time-to-live per entry
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # key -> one [stale] flag per load in flight, set by invalidate/clear
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        # Look without touching recency or counters
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            # Loaded outside the lock. If the key is invalidated meanwhile the
+            # loader may have read data from before that change: the caller
+            # still gets the value, but it is not cached.
+            ticket = [False]
+            with self._lock:
+                self._loading.setdefault(key, []).append(ticket)
+            try:
+                value = loader()
+            finally:
+                with self._lock:
+                    tickets = self._loading[key]
+                    tickets.remove(ticket)
+                    if not tickets:
+                        del self._loading[key]
+                    if not ticket[0] and value is not _MISSING:
+                        self._store(key, value)
+        return value
+
+    def _mark_stale(self, tickets):
+        for ticket in tickets:
+            ticket[0] = True
+
+    def invalidate(self, key):
+        with self._lock:
+            self._mark_stale(self._loading.get(key, ()))
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for tickets in self._loading.values():
+                self._mark_stale(tickets)
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class ShowListCache:
+    # The show listing changes rarely; cache it and let writers invalidate it
+
+    def __init__(self, repository, ttl=60):
+        self.repository = repository
+        self.cache = LRUCache(maxsize=1, ttl=ttl)
+
+    def get(self):
+        return self.cache.get_or_load("shows", self.repository.list_shows)
+
+    def invalidate(self):
+        self.cache.invalidate("shows")
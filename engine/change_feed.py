@@ -0,0 +1,50 @@
+from collections import namedtuple
+
+Change = namedtuple("Change", "seq table_name row_id op show_id booking_id status")
+
+# Keep a day of history so a terminal that was asleep can still catch up
+RETENTION_SECONDS = 24 * 60 * 60
+READ_LIMIT = 5000
+
+
+class ChangeFeed:
+    # Reader over the trigger-maintained change_log table
+
+    def __init__(self, repository):
+        self.repository = repository
+
+    def latest_seq(self):
+        row = self.repository.fetchone("SELECT MAX(seq) FROM change_log")
+        return row[0] or 0
+
+    def data_version(self):
+        # Changes whenever another connection commits to the database
+        return self.repository.execute("PRAGMA data_version").fetchone()[0]
+
+    def changes_since(self, seq, limit=READ_LIMIT):
+        rows = self.repository.fetchall(
+            "SELECT seq, table_name, row_id, op, show_id, booking_id, status "
+            "FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+            (seq, limit),
+        )
+        return [Change(*row) for row in rows]
+
+    def prune(self, retention_seconds=RETENTION_SECONDS):
+        with self.repository.pool.transaction("IMMEDIATE") as conn:
+            return conn.execute(
+                "DELETE FROM change_log "
+                "WHERE changed_at < (julianday('now') - 2440587.5) * 86400.0 - ?",
+                (retention_seconds,),
+            ).rowcount
+
+
+def group_seat_changes(changes):
+    # {(show_id, status): [seat ids]} for the latest status of each seat
+    latest = {}
+    for change in changes:
+        if change.table_name == "seats" and change.op != "delete" and change.show_id is not None:
+            latest[change.row_id] = (change.show_id, change.status)
+    grouped = {}
+    for seat_id, key in latest.items():
+        grouped.setdefault(key, []).append(seat_id)
+    return grouped
@@ -0,0 +1,186 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Requests committed together at most
+MAX_BATCH = 64
+# How long the writer waits for more requests to join a batch; this bounds
+# the latency batching adds to any one request
+MAX_DELAY = 0.002
+LOCK_RETRIES = 5
+STATS_WINDOW = 1000
+
+
+def _is_lock_error(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class CommitQueue:
+    # Single writer for the process with group commit.
+    #
+    # Producers submit work(conn) callables and get a Future back. One writer
+    # thread runs a batch of them in a single BEGIN IMMEDIATE transaction,
+    # each inside its own savepoint so a conflict only undoes that request,
+    # and commits once for the whole batch. Futures resolve after the COMMIT,
+    # so nobody is told a booking succeeded before it is durable.
+
+    def __init__(self, pool, max_batch=MAX_BATCH, max_delay=MAX_DELAY):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+        self._batch_sizes = deque(maxlen=STATS_WINDOW)
+        self._latencies = deque(maxlen=STATS_WINDOW)
+        self._commit_times = deque(maxlen=STATS_WINDOW)
+        self._thread = threading.Thread(target=self._run, name="commit-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, work):
+        future = Future()
+        # Checked and enqueued under one lock so nothing lands behind the stop marker
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Commit queue is closed")
+            self.submitted += 1
+            self._queue.put((work, future, time.perf_counter()))
+        return future
+
+    def run(self, work, timeout=None):
+        if threading.current_thread() is self._thread:
+            # Work submitted from an on_commit callback would wait on itself
+            with self.pool.transaction("IMMEDIATE") as conn:
+                return work(conn)
+        return self.submit(work).result(timeout)
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is None:
+            return None, True
+        batch = [item]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._commit(batch)
+        finally:
+            self.pool.release()
+
+    def _execute(self, batch):
+        outcomes = []
+        with self.pool.transaction("IMMEDIATE"):
+            for work, future, _ in batch:
+                try:
+                    with self.pool.savepoint() as conn:
+                        outcomes.append((future, True, work(conn)))
+                except Exception as e:
+                    outcomes.append((future, False, e))
+        return outcomes
+
+    def _commit(self, batch):
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        depth = self._queue.qsize()
+        started = time.perf_counter()
+        for attempt in range(LOCK_RETRIES):
+            try:
+                outcomes = self._execute(batch)
+                break
+            except sqlite3.OperationalError as e:
+                # Another process holds the write lock past busy_timeout
+                if not _is_lock_error(e) or attempt == LOCK_RETRIES - 1:
+                    outcomes = [(future, False, e) for _, future, _ in batch]
+                    break
+                time.sleep(0.01 * (2 ** attempt))
+        finished = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.max_depth = max(self.max_depth, depth + len(batch))
+            self._batch_sizes.append(len(batch))
+            self._commit_times.append(finished - started)
+            for _, _, enqueued in batch:
+                self._latencies.append(finished - enqueued)
+            for _, ok, _ in outcomes:
+                if ok:
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stats(self):
+        with self._lock:
+            sizes = list(self._batch_sizes)
+            latencies = list(self._latencies)
+            commit_times = list(self._commit_times)
+            return {
+                "depth": self._queue.qsize(),
+                "max_depth": self.max_depth,
+                "submitted": self.submitted,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "batches": self.batches,
+                "avg_batch": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+                "max_batch": max(sizes, default=0),
+                "p50_latency_ms": round(_percentile(latencies, 0.5) * 1000, 2),
+                "p99_latency_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+                "avg_commit_ms": round(sum(commit_times) / len(commit_times) * 1000, 2)
+                if commit_times else 0.0,
+            }
+
+    def close(self, timeout=5):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+        # A writer stuck past the timeout never reaches what is still queued;
+        # fail it rather than leave callers waiting on it forever
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            leftover.append(item)
+        for _, future, _ in leftover:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Commit queue is closed"))
@@ -0,0 +1,351 @@
+import argparse
+import json
+import re
+import time
+import unicodedata
+from collections import defaultdict, namedtuple
+from difflib import SequenceMatcher
+
+from database.connection import ConnectionPool
+from database.repository import Repository
+
+# Local numbers are 8 digits; anything before that is a country or trunk prefix
+PHONE_KEY_DIGITS = 8
+# Blocks bigger than this are sorted by name and only compared with their neighbours
+BLOCK_WINDOW = 8
+NAME_WEIGHT = 0.55
+PHONE_WEIGHT = 0.45
+TYPE_MISMATCH_PENALTY = 0.05
+MATCH_THRESHOLD = 0.9
+FETCH_SIZE = 10000
+MERGE_BATCH = 500
+
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+DuplicateGroup = namedtuple("DuplicateGroup", "keep_id duplicate_ids score")
+_Record = namedtuple("_Record", "customer_id name phone type")
+
+
+def fold(text):
+    # Lower case, accents stripped (Mägi -> magi), whitespace collapsed
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
+
+
+def normalize_phone(phone):
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-PHONE_KEY_DIGITS:]
+
+
+def soundex(word):
+    if not word:
+        return ""
+    code = word[0].upper()
+    previous = SOUNDEX_CODES.get(word[0], "")
+    for ch in word[1:]:
+        digit = SOUNDEX_CODES.get(ch, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code, vowels do
+        if ch not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def name_key(name):
+    # Phonetic key of the first and last word, so Jon/John Smyth/Smith share a block
+    words = re.findall(r"[a-z]+", fold(name))
+    if not words:
+        return ""
+    return soundex(words[0]) + (soundex(words[-1]) if len(words) > 1 else "")
+
+
+def blocking_keys(record):
+    keys = []
+    if len(record.phone) >= PHONE_KEY_DIGITS - 1:
+        keys.append(f"phone:{record.phone}")
+    key = name_key(record.name)
+    if key:
+        keys.append(f"name:{key}")
+    return keys
+
+
+def phone_similarity(a, b):
+    if not a or not b:
+        return 0.0
+    if len(a) == len(b):
+        return 1 - sum(x != y for x, y in zip(a, b)) / len(a)
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def score(a, b, threshold=MATCH_THRESHOLD):
+    # Weighted name and phone similarity. The cheap phone part runs first and
+    # the name comparison is skipped when the pair cannot reach threshold.
+    phone = phone_similarity(a.phone, b.phone)
+    penalty = TYPE_MISMATCH_PENALTY if a.type and b.type and a.type != b.type else 0.0
+    if NAME_WEIGHT + PHONE_WEIGHT * phone - penalty < threshold:
+        return 0.0
+    name = 1.0 if a.name == b.name else SequenceMatcher(None, a.name, b.name).ratio()
+    return NAME_WEIGHT * name + PHONE_WEIGHT * phone - penalty
+
+
+def _block_pairs(members, window):
+    if len(members) <= window + 1:
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                yield a, b
+        return
+    # Sorted neighbourhood: near-identical names end up next to each other
+    members = sorted(members, key=lambda record: (record.name, record.phone))
+    for i, a in enumerate(members):
+        for b in members[i + 1:i + 1 + window]:
+            yield a, b
+
+
+class _DisjointSet:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            # The oldest record survives
+            self.parent[max(a, b)] = min(a, b)
+
+
+class DuplicateFinder:
+    # Finds likely duplicate customers without comparing every pair.
+    #
+    # Each customer lands in a few blocks (normalized phone, phonetic name)
+    # and is only scored against others in the same block, so the work grows
+    # with the number of customers rather than its square.
+
+    def __init__(self, repository, threshold=MATCH_THRESHOLD, window=BLOCK_WINDOW):
+        self.repository = repository
+        self.threshold = threshold
+        self.window = window
+        self.compared = 0
+
+    def records(self):
+        cursor = self.repository.execute("SELECT customers_id, name, phone, type FROM customers")
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            for customer_id, name, phone, customer_type in rows:
+                yield _Record(customer_id, fold(name), normalize_phone(phone), customer_type)
+
+    def find(self, records=None):
+        blocks = defaultdict(list)
+        for record in self.records() if records is None else records:
+            for key in blocking_keys(record):
+                blocks[key].append(record)
+        groups = _DisjointSet()
+        scores = {}
+        self.compared = 0
+        for members in blocks.values():
+            if len(members) < 2:
+                continue
+            for a, b in _block_pairs(members, self.window):
+                if groups.find(a.customer_id) == groups.find(b.customer_id):
+                    continue
+                self.compared += 1
+                pair_score = score(a, b, self.threshold)
+                if pair_score >= self.threshold:
+                    groups.union(a.customer_id, b.customer_id)
+                    scores[(a.customer_id, b.customer_id)] = pair_score
+        members_of = defaultdict(list)
+        for customer_id in groups.parent:
+            members_of[groups.find(customer_id)].append(customer_id)
+        lowest = defaultdict(lambda: 1.0)
+        for (a, _), pair_score in scores.items():
+            root = groups.find(a)
+            lowest[root] = min(lowest[root], pair_score)
+        return [
+            DuplicateGroup(root, sorted(set(ids) - {root}), round(lowest[root], 3))
+            for root, ids in sorted(members_of.items())
+            if len(ids) > 1
+        ]
+
+    def merge(self, duplicate_groups):
+        # Re-point bookings to the surviving customer and delete the duplicates,
+        # all in one transaction so no booking is ever left without a customer.
+        # Only pass groups someone has reviewed; customer_merges keeps what is
+        # needed to undo() each one.
+        mapping = [
+            (duplicate_id, group.keep_id)
+            for group in duplicate_groups
+            for duplicate_id in group.duplicate_ids
+        ]
+        if not mapping:
+            return 0, 0
+        keep_ids = {group.keep_id for group in duplicate_groups}
+        if keep_ids & {duplicate_id for duplicate_id, _ in mapping}:
+            raise ValueError("A customer is both kept and merged away; fix the groups first")
+        pool = self.repository.pool
+        with pool.transaction("IMMEDIATE") as conn:
+            conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS merge_map "
+                "(duplicate_id INTEGER PRIMARY KEY, keep_id INTEGER NOT NULL)"
+            )
+            conn.execute("DELETE FROM temp.merge_map")
+            for start in range(0, len(mapping), MERGE_BATCH):
+                conn.executemany(
+                    "INSERT INTO temp.merge_map VALUES (?, ?)", mapping[start:start + MERGE_BATCH]
+                )
+            missing = conn.execute(
+                "SELECT COUNT(*) FROM temp.merge_map m WHERE NOT EXISTS "
+                "(SELECT 1 FROM customers WHERE customers_id = m.duplicate_id) OR NOT EXISTS "
+                "(SELECT 1 FROM customers WHERE customers_id = m.keep_id)"
+            ).fetchone()[0]
+            if missing:
+                raise ValueError(f"{missing} customers in the merge list no longer exist")
+            archived = (
+                "(SELECT json_group_array(bookings_id) FROM archive.bookings "
+                "WHERE customer_id = m.duplicate_id)"
+                if self.repository.archive_attached else "'[]'"
+            )
+            conn.execute(
+                f"INSERT OR REPLACE INTO customer_merges "
+                f"(duplicate_id, keep_id, name, phone, type, booking_ids, archived_booking_ids) "
+                f"SELECT m.duplicate_id, m.keep_id, c.name, c.phone, c.type, "
+                f"(SELECT json_group_array(bookings_id) FROM main.bookings "
+                f"WHERE customer_id = m.duplicate_id), {archived} "
+                f"FROM temp.merge_map m JOIN customers c ON c.customers_id = m.duplicate_id"
+            )
+            tables = self._booking_tables()
+            moved = 0
+            for table in tables:
+                moved += conn.execute(
+                    f"UPDATE {table} SET customer_id = "
+                    f"(SELECT keep_id FROM temp.merge_map WHERE duplicate_id = customer_id) "
+                    f"WHERE customer_id IN (SELECT duplicate_id FROM temp.merge_map)"
+                ).rowcount
+            removed = conn.execute(
+                "DELETE FROM customers WHERE customers_id IN (SELECT duplicate_id FROM temp.merge_map)"
+            ).rowcount
+            conn.execute("DELETE FROM temp.merge_map")
+        return removed, moved
+
+    def _booking_tables(self):
+        tables = ["main.bookings"]
+        if self.repository.archive_attached:
+            # Archived bookings first: if we stop between the two files the
+            # duplicates still exist, so nothing points at a missing customer
+            tables.insert(0, "archive.bookings")
+        return tables
+
+    def undo(self, duplicate_ids):
+        # Bring merged customers back and return their bookings to them
+        pool = self.repository.pool
+        restored = 0
+        with pool.transaction("IMMEDIATE") as conn:
+            for duplicate_id in duplicate_ids:
+                row = conn.execute(
+                    "SELECT name, phone, type, booking_ids, archived_booking_ids "
+                    "FROM customer_merges WHERE duplicate_id = ?",
+                    (duplicate_id,),
+                ).fetchone()
+                if row is None:
+                    continue
+                name, phone, customer_type, booking_ids, archived_ids = row
+                conn.execute(
+                    "INSERT INTO customers (customers_id, name, phone, type) VALUES (?, ?, ?, ?)",
+                    (duplicate_id, name, phone, customer_type),
+                )
+                for table in self._booking_tables():
+                    ids = archived_ids if table.startswith("archive.") else booking_ids
+                    conn.execute(
+                        f"UPDATE {table} SET customer_id = ? "
+                        f"WHERE bookings_id IN (SELECT value FROM json_each(?))",
+                        (duplicate_id, ids),
+                    )
+                conn.execute("DELETE FROM customer_merges WHERE duplicate_id = ?", (duplicate_id,))
+                restored += 1
+        return restored
+
+
+def write_groups(path, groups):
+    # The review file: delete false matches from it, then pass it to --merge-file
+    with open(path, "w") as f:
+        json.dump([group._asdict() for group in groups], f, indent=2)
+
+
+def read_groups(path):
+    with open(path) as f:
+        return [
+            DuplicateGroup(int(group["keep_id"]), [int(i) for i in group["duplicate_ids"]],
+                           group.get("score"))
+            for group in json.load(f)
+        ]
+
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(prog="main.py dedup",
+                                     description="Find, review and merge duplicate customers")
+    parser.add_argument("--database", help="Path to the database (default: system.db)")
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD)
+    parser.add_argument("--window", type=int, default=BLOCK_WINDOW)
+    parser.add_argument("--show", type=int, default=20, help="Number of groups to print")
+    parser.add_argument("--write", metavar="FILE", help="Write the groups found to FILE for review")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--merge-file", metavar="FILE",
+                        help="Merge exactly the groups in a reviewed FILE from --write")
+    action.add_argument("--merge-groups", metavar="KEEP_ID", type=int, nargs="+",
+                        help="Merge only the printed groups with these keep ids")
+    action.add_argument("--undo", metavar="CUSTOMER_ID", type=int, nargs="+",
+                        help="Restore merged customers and their bookings")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.database) if args.database else ConnectionPool()
+    repository = Repository(pool)
+    repository.attach_archive()
+    finder = DuplicateFinder(repository, args.threshold, args.window)
+    try:
+        if args.undo:
+            print(f"Restored {finder.undo(args.undo)} customers")
+            return 0
+        if args.merge_file:
+            groups = read_groups(args.merge_file)
+        else:
+            started = time.perf_counter()
+            groups = finder.find()
+            print(f"{len(groups)} duplicate groups ({finder.compared} comparisons) "
+                  f"in {time.perf_counter() - started:.1f}s")
+            for group in groups[:args.show]:
+                ids = ", ".join(str(i) for i in group.duplicate_ids)
+                print(f"  keep {group.keep_id} <- {ids} (score {group.score})")
+            if args.write:
+                write_groups(args.write, groups)
+                print(f"Wrote {len(groups)} groups to {args.write}")
+            if args.merge_groups:
+                wanted = set(args.merge_groups)
+                groups = [group for group in groups if group.keep_id in wanted]
+                unknown = wanted - {group.keep_id for group in groups}
+                if unknown:
+                    print(f"No group keeps customer(s) {sorted(unknown)}; nothing merged")
+                    return 1
+            else:
+                return 0
+        removed, moved = finder.merge(groups)
+        print(f"Merged {removed} customers, re-pointed {moved} bookings "
+              f"(undo with --undo and the merged customer ids)")
+    finally:
+        pool.close_all()
+    return 0
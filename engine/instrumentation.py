@@ -0,0 +1,97 @@
+import re
+import threading
+import time
+from collections import deque, namedtuple
+
+RING_SIZE = 2000
+
+QueryEvent = namedtuple("QueryEvent", "at fingerprint sql params rows seconds thread")
+StallEvent = namedtuple("StallEvent", "at screen seconds")
+FetchEvent = namedtuple("FetchEvent", "at model rows seconds")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    # Same statement shape -> same fingerprint, whatever the literals or IN-list length
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class Metrics:
+    # Fixed-size ring buffers of recent events. Appending to a bounded deque
+    # is cheap and thread safe, so recording stays on for production use.
+
+    def __init__(self, size=RING_SIZE):
+        self.enabled = True
+        # Bound values are customer names and phone numbers; by default only
+        # their number is kept, as NULLs, which is all EXPLAIN needs
+        self.capture_params = False
+        self.queries = deque(maxlen=size)
+        self.stalls = deque(maxlen=size)
+        self.fetches = deque(maxlen=size)
+        self._fingerprints = {}
+
+    def _fingerprint(self, sql):
+        value = self._fingerprints.get(sql)
+        if value is None:
+            if len(self._fingerprints) > 10000:
+                self._fingerprints.clear()
+            value = self._fingerprints[sql] = fingerprint(sql)
+        return value
+
+    def record_query(self, sql, params, rows, seconds):
+        if self.enabled:
+            params = tuple(params) if self.capture_params else (None,) * len(params)
+            self.queries.append(QueryEvent(
+                time.time(), self._fingerprint(sql), sql, params, rows, seconds,
+                threading.current_thread().name,
+            ))
+
+    def record_stall(self, screen, seconds):
+        if self.enabled:
+            self.stalls.append(StallEvent(time.time(), screen, seconds))
+
+    def record_fetch(self, model, rows, seconds):
+        if self.enabled:
+            self.fetches.append(FetchEvent(time.time(), model, rows, seconds))
+
+    def query_summary(self):
+        # Per fingerprint: count, total/avg/max time, rows and the slowest sample
+        summary = {}
+        for event in list(self.queries):
+            entry = summary.get(event.fingerprint)
+            if entry is None:
+                entry = summary[event.fingerprint] = {
+                    "fingerprint": event.fingerprint, "count": 0, "total": 0.0,
+                    "max": 0.0, "rows": 0, "slowest": event,
+                }
+            entry["count"] += 1
+            entry["total"] += event.seconds
+            entry["rows"] += event.rows
+            if event.seconds >= entry["max"]:
+                entry["max"] = event.seconds
+                entry["slowest"] = event
+        for entry in summary.values():
+            entry["avg"] = entry["total"] / entry["count"]
+        return sorted(summary.values(), key=lambda entry: entry["total"], reverse=True)
+
+    def slowest_queries(self, limit=5):
+        return sorted(self.queries, key=lambda event: event.seconds, reverse=True)[:limit]
+
+    def clear(self):
+        self.queries.clear()
+        self.stalls.clear()
+        self.fetches.clear()
+
+
+def explain(conn, sql, params=()):
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+metrics = Metrics()
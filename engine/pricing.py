@@ -0,0 +1,192 @@
+import argparse
+import json
+import threading
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.seat_map import parse_seat_number
+
+try:
+    import numpy
+except ImportError:
+    # The array fallback gives the same prices, just without SIMD
+    numpy = None
+
+# Prices are rounded to this step after surge and discounts
+PRICE_STEP = 0.5
+# Shows without a tier of their own use the show_id 0 tiers
+DEFAULT_TIER_SHOW = 0
+
+Quote = namedtuple("Quote", "seat_count subtotal discount total")
+
+
+def round_price(value, step=PRICE_STEP):
+    return round(round(value / step) * step, 2)
+
+
+class PricingEngine:
+    # Applies the rule tables from migration 10: a base price per seat row
+    # (price_tiers), a demand multiplier from the show's occupancy
+    # (demand_surge) and a discount per customer type (customer_discounts).
+    #
+    # Rules are read once and kept; call reload() after editing them.
+
+    def __init__(self, repository, seat_maps=None):
+        self.repository = repository
+        self.pool = repository.pool
+        self.seat_maps = seat_maps
+        self._lock = threading.Lock()
+        self._rules = None
+
+    def reload(self):
+        with self._lock:
+            self._rules = None
+
+    def _load_rules(self):
+        with self._lock:
+            if self._rules is None:
+                tiers = {}
+                for show_id, seat_row, base_price in self.repository.fetchall(
+                    "SELECT show_id, seat_row, base_price FROM price_tiers"
+                ):
+                    tiers.setdefault(show_id, {})[seat_row.upper()] = float(base_price)
+                surge = self.repository.fetchall(
+                    "SELECT min_occupancy, multiplier FROM demand_surge ORDER BY min_occupancy"
+                )
+                discounts = dict(self.repository.fetchall(
+                    "SELECT type, discount FROM customer_discounts"
+                ))
+                self._rules = (
+                    tiers,
+                    [row[0] for row in surge],
+                    [float(row[1]) for row in surge],
+                    discounts,
+                )
+            return self._rules
+
+    def surge_multiplier(self, occupancy):
+        _, thresholds, multipliers, _ = self._load_rules()
+        step = bisect_right(thresholds, occupancy) - 1
+        return multipliers[step] if step >= 0 else 1.0
+
+    def occupancy(self, show_id):
+        _, _, booked, available, _ = self.repository.show_sales(show_id)
+        capacity = booked + available
+        return booked / capacity if capacity else 0.0
+
+    def discount(self, customer_type):
+        return float(self._load_rules()[3].get(customer_type, 0.0))
+
+    def compute_prices(self, show_id, seat_rows, base_prices, multiplier):
+        # seat_rows: row letter per seat; base_prices: the seat's own base.
+        # Returns the new prices in the same order, as an array('d').
+        tiers, _, _, _ = self._load_rules()
+        row_tiers = {**tiers.get(DEFAULT_TIER_SHOW, {}), **tiers.get(show_id, {})}
+        # Rows become small integer codes so the tier lookup is one gather
+        codes = {row: code for code, row in enumerate(sorted(set(seat_rows)))}
+        tier_of_code = array("d", (row_tiers.get(row, -1.0) for row in sorted(codes)))
+        row_codes = array("q", (codes[row] for row in seat_rows))
+        bases = array("d", base_prices)
+        if numpy is not None:
+            tier = numpy.frombuffer(tier_of_code)[numpy.frombuffer(row_codes, dtype=numpy.int64)]
+            base = numpy.where(tier >= 0, tier, numpy.frombuffer(bases))
+            prices = numpy.round(numpy.round(base * multiplier / PRICE_STEP) * PRICE_STEP, 2)
+            return array("d", prices.tobytes())
+        return array("d", (
+            round_price((tier_of_code[code] if tier_of_code[code] >= 0 else base) * multiplier)
+            for code, base in zip(row_codes, bases)
+        ))
+
+    def reprice_show(self, show_id):
+        # One read, one pricing pass, one UPDATE. Booked seats keep the price
+        # they sold for and held seats keep the price they were quoted.
+        with self.pool.transaction("IMMEDIATE") as conn:
+            seats = conn.execute(
+                "SELECT seats_id, seat_number, COALESCE(base_price, price, 0), price FROM seats "
+                "WHERE show_id = ? AND status = 'Available' AND hold_token IS NULL",
+                (show_id,),
+            ).fetchall()
+            if not seats:
+                return 0
+            multiplier = self.surge_multiplier(self.occupancy(show_id))
+            prices = self.compute_prices(
+                show_id,
+                [parse_seat_number(seat[1])[0] for seat in seats],
+                [float(seat[2]) for seat in seats],
+                multiplier,
+            )
+            changed = [
+                [seat[0], price] for seat, price in zip(seats, prices)
+                if seat[3] is None or float(seat[3]) != price
+            ]
+            if changed:
+                conn.execute(
+                    "UPDATE seats SET price = new.price FROM ("
+                    "SELECT json_extract(value, '$[0]') AS seats_id, "
+                    "json_extract(value, '$[1]') AS price FROM json_each(?)"
+                    ") AS new WHERE seats.seats_id = new.seats_id",
+                    (json.dumps(changed),),
+                )
+        if changed and self.seat_maps is not None:
+            self.seat_maps.invalidate(show_id)
+        return len(changed)
+
+    def reprice_all(self, log=None):
+        total = 0
+        for (show_id,) in self.repository.fetchall(
+            "SELECT shows_id FROM shows WHERE archived_at IS NULL ORDER BY shows_id"
+        ):
+            changed = self.reprice_show(show_id)
+            total += changed
+            if log and changed:
+                log(f"Show {show_id}: repriced {changed} seats")
+        return total
+
+    def total_for(self, prices_sum, customer_type):
+        # (total to pay, discount given), both in cents so subtotal - discount == total.
+        # PRICE_STEP only applies to seat prices, never to what a booking costs.
+        subtotal = round(prices_sum, 2)
+        discount = round(subtotal * self.discount(customer_type), 2)
+        return round(subtotal - discount, 2), discount
+
+    def quote(self, show_id, seat_ids, customer_type=None):
+        # A single aggregate query however many seats are asked for
+        seat_ids = list(seat_ids)
+        if not seat_ids:
+            return Quote(0, 0.0, 0.0, 0.0)
+        count, subtotal = self.repository.fetchone(
+            f"SELECT COUNT(*), TOTAL(price) FROM seats "
+            f"WHERE show_id = ? AND seats_id IN ({', '.join('?' * len(seat_ids))})",
+            (show_id, *seat_ids),
+        )
+        total, discount = self.total_for(subtotal, customer_type)
+        return Quote(count, round(subtotal, 2), discount, total)
+
+    def booking_total(self, conn, customer_id, prices):
+        # Used inside the booking transaction with the seat prices it already read
+        row = conn.execute(
+            "SELECT type FROM customers WHERE customers_id = ?", (customer_id,)
+        ).fetchone()
+        return self.total_for(sum(float(price or 0) for price in prices), row and row[0])[0]
+
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(prog="main.py reprice",
+                                     description="Recompute seat prices from the pricing rules")
+    parser.add_argument("--database", help="Path to the database (default: system.db)")
+    parser.add_argument("--show", type=int, help="Only this show (default: every current show)")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.database) if args.database else ConnectionPool()
+    engine = PricingEngine(Repository(pool))
+    try:
+        if args.show is not None:
+            print(f"Show {args.show}: repriced {engine.reprice_show(args.show)} seats")
+        else:
+            print(f"Repriced {engine.reprice_all(log=print)} seats")
+    finally:
+        pool.close_all()
+    return 0
@@ -0,0 +1,621 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+from database.connection import DB_PATH, ConnectionPool
+from database.migrations import migrate
+from engine.reservations import ReservationService
+from engine.seat_map import AVAILABLE
+
+# A booking sold on a replica has id LOCAL_ID_BASE + its outbox id until the
+# primary assigns the real one
+LOCAL_ID_BASE = 1 << 60
+SYNC_INTERVAL = 5
+# change_log rows read per pull round, and ids per IN (...) lookup
+PULL_BATCH = 5000
+FETCH_CHUNK = 500
+DEFAULT_REPLICA_PATH = os.path.join(os.path.expanduser("~"), "ticket_replica.db")
+
+# Upserts run in this order so references resolve; deletes run in reverse
+SYNCED_TABLES = [
+    ("customers", "customers_id"),
+    ("shows", "shows_id"),
+    ("bookings", "bookings_id"),
+    ("seats", "seats_id"),
+]
+
+NOW_SQL = "((julianday('now') - 2440587.5) * 86400.0)"
+
+# Rows a pulled delete must not remove while a local sale still needs them
+DELETE_GUARDS = {
+    "customers": f"customers_id NOT IN (SELECT customer_id FROM bookings WHERE bookings_id >= {LOCAL_ID_BASE})",
+    "shows": f"shows_id NOT IN (SELECT show_id FROM bookings WHERE bookings_id >= {LOCAL_ID_BASE})",
+    "seats": f"(booking_id IS NULL OR booking_id < {LOCAL_ID_BASE})",
+}
+
+REPLICA_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value) WITHOUT ROWID",
+    # Sales made on this terminal that the primary has not seen yet
+    """CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        booking_id INTEGER NOT NULL,
+        payload TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT
+    )""",
+]
+
+# local_booking_id: the provisional id; booking_id: the primary's id, None if every seat was lost
+SyncOutcome = namedtuple("SyncOutcome", "local_booking_id booking_id won lost")
+
+
+def _placeholders(values):
+    return ", ".join("?" * len(values))
+
+
+def _chunks(values, size=FETCH_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class _ResyncNeeded(Exception):
+    pass
+
+
+class _PrimaryPool(ConnectionPool):
+    # sqlite3 would create an empty database where the share used to be
+    def _open(self):
+        if not os.path.exists(self.path):
+            raise sqlite3.OperationalError(f"Primary database not reachable: {self.path}")
+        return super()._open()
+
+
+class Replica:
+    # A local copy of the shared database for one box-office terminal.
+    #
+    # The GUI reads and sells against the replica only, so a slow or missing
+    # network share never blocks a screen. Sales are written locally under
+    # provisional ids and queued in the outbox. sync() pushes the outbox and
+    # then pulls the primary's change_log after the last seq it applied,
+    # fetching only the rows those entries name.
+    #
+    # Seat conflicts are settled on the primary, which always wins: a seat
+    # already booked there, or held by a live hold, stays with its owner and
+    # the offline sale that arrives later loses it. A terminal's clock never
+    # decides who keeps a seat.
+
+    def __init__(self, primary_path=DB_PATH, path=DEFAULT_REPLICA_PATH):
+        self.primary_path = primary_path
+        self.path = path
+        self.local = ConnectionPool(path)
+        self.primary = _PrimaryPool(primary_path)
+        self._columns = {}
+        self._primary_ready = False
+        self._lock = threading.Lock()
+        # Held by every local sale and by resync, so no sale commits while
+        # the replica is being replaced
+        self.write_lock = threading.RLock()
+        self.online = False
+        self.last_sync = None
+        self.last_error = None
+        self.pushed = 0
+        self.pulled = 0
+        self.resyncs = 0
+        self.lost_sales = deque()
+        self.wake = threading.Event()
+
+    def exists(self):
+        if not os.path.exists(self.path):
+            return False
+        row = self.local.connection().execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sync_state'"
+        ).fetchone()
+        return row is not None
+
+    def ensure(self):
+        # The first start needs the primary once, to take the initial copy
+        if not self.exists():
+            self.resync()
+        self._prepare_local()
+        return self
+
+    def _prepare_local(self):
+        conn = self.local.connection()
+        migrate(conn)
+        for statement in REPLICA_SCHEMA:
+            conn.execute(statement)
+        if self.state("terminal_id") is None:
+            self.set_state("terminal_id", f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}")
+
+    def _primary(self):
+        conn = self.primary.connection()
+        if not self._primary_ready:
+            migrate(conn)
+            self._primary_ready = True
+        return conn
+
+    def state(self, key, default=None):
+        conn = self.local.connection()
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sync_state'").fetchone() is None:
+            return default
+        row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key, value, conn=None):
+        (conn or self.local.connection()).execute(
+            "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    @property
+    def terminal_id(self):
+        return self.state("terminal_id")
+
+    def columns(self, table):
+        if table not in self._columns:
+            self._columns[table] = [
+                row[1] for row in self.local.connection().execute(f"PRAGMA table_info({table})")
+            ]
+        return self._columns[table]
+
+    def resync(self):
+        # Replace the replica with a fresh copy of the primary. The terminal
+        # id, every outbox entry with the local booking it stands for, and this
+        # terminal's live holds are carried over.
+        with self.write_lock:
+            source = self._primary()
+            keep = {"terminal_id": self.state("terminal_id")}
+            carried = self._local_work() if self.exists() else None
+            conn = self.local.connection()
+            source.backup(conn)
+            self._columns.clear()
+            for statement in REPLICA_SCHEMA:
+                conn.execute(statement)
+            with self.local.transaction("IMMEDIATE") as conn:
+                conn.execute("DELETE FROM sync_state")
+                conn.execute("DELETE FROM outbox")
+                if carried:
+                    self._restore_local_work(conn, carried)
+                for key, value in keep.items():
+                    if value is not None:
+                        self.set_state(key, value, conn)
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+                self.set_state("last_seq", row[0] if row else 0, conn)
+                row = conn.execute("SELECT MAX(id) FROM sync_conflicts").fetchone()
+                self.set_state("last_conflict", row[0] or 0, conn)
+        with self._lock:
+            self.resyncs += 1
+
+    def _local_work(self):
+        # Everything on the replica the primary does not have yet
+        with self.local.transaction() as conn:
+            outbox = conn.execute(
+                "SELECT id, booking_id, payload, created_at, attempts, error FROM outbox"
+            ).fetchall()
+            # Outbox ids name pushed sales on the primary, so they must never repeat
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'outbox'").fetchone()
+            bookings = conn.execute(
+                f"SELECT {', '.join(self.columns('bookings'))} FROM bookings WHERE bookings_id >= ?",
+                (LOCAL_ID_BASE,),
+            ).fetchall()
+            seats = conn.execute(
+                f"SELECT {', '.join(self.columns('seats'))} FROM seats WHERE booking_id >= ?",
+                (LOCAL_ID_BASE,),
+            ).fetchall()
+            holds = conn.execute(
+                "SELECT seats_id, hold_token, hold_expires FROM seats "
+                "WHERE hold_token IS NOT NULL AND booking_id IS NULL AND hold_expires >= ?",
+                (time.time(),),
+            ).fetchall()
+            columns = self.columns("bookings")
+            return {
+                "outbox": outbox,
+                "outbox_seq": row[0] if row else 0,
+                # Kept from deletion on the replica while a local sale used them
+                "customers": self._fetch(conn, "customers", "customers_id",
+                                         {row[columns.index("customer_id")] for row in bookings}),
+                "shows": self._fetch(conn, "shows", "shows_id",
+                                     {row[columns.index("show_id")] for row in bookings}),
+                "bookings": bookings,
+                "seats": seats,
+                "holds": holds,
+            }
+
+    def _restore_local_work(self, conn, carried):
+        conn.execute("PRAGMA defer_foreign_keys = ON")
+        conn.executemany("INSERT INTO outbox VALUES (?, ?, ?, ?, ?, ?)", carried["outbox"])
+        # The inserts above already wrote a sequence row; replace it, never add a second
+        seq = max([carried["outbox_seq"], *(row[0] for row in carried["outbox"])])
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'outbox'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('outbox', ?)", (seq,))
+        for table in ("customers", "shows"):
+            columns = self.columns(table)
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({_placeholders(columns)})",
+                carried[table],
+            )
+        # Local sales keep their seats until push settles them, as before the copy
+        for table, key in (("bookings", "bookings_id"), ("seats", "seats_id")):
+            if carried[table]:
+                conn.executemany(self._upsert_sql(table, key), carried[table])
+        conn.executemany(
+            "UPDATE seats SET hold_token = ?, hold_expires = ? WHERE seats_id = ? "
+            "AND status = 'Available' AND booking_id IS NULL AND hold_token IS NULL",
+            [(token, expires, seat_id) for seat_id, token, expires in carried["holds"]],
+        )
+
+    def queue_sale(self, conn, booking_id):
+        # Called inside the local booking transaction
+        show_id, customer_id, booking_date, total = conn.execute(
+            "SELECT show_id, customer_id, booking_date, total_price FROM bookings WHERE bookings_id = ?",
+            (booking_id,),
+        ).fetchone()
+        seats = conn.execute(
+            "SELECT seats_id, price FROM seats WHERE booking_id = ? ORDER BY seats_id", (booking_id,)
+        ).fetchall()
+        payload = {
+            "show_id": show_id,
+            "customer_id": customer_id,
+            "booking_date": booking_date,
+            "total": float(total or 0),
+            "seats": [[seat_id, float(price or 0)] for seat_id, price in seats],
+        }
+        conn.execute(
+            "INSERT INTO outbox (id, booking_id, payload, created_at) VALUES (?, ?, ?, ?)",
+            (booking_id - LOCAL_ID_BASE, booking_id, json.dumps(payload), time.time()),
+        )
+
+    def pending(self):
+        return self.local.connection().execute(
+            "SELECT id, booking_id, payload FROM outbox WHERE error IS NULL ORDER BY id"
+        ).fetchall()
+
+    def push(self):
+        outcomes = []
+        terminal_id = self.terminal_id
+        for outbox_id, local_id, payload in self.pending():
+            sale = json.loads(payload)
+            try:
+                with self.primary.transaction("IMMEDIATE") as conn:
+                    outcome = self._apply_sale(conn, f"{terminal_id}:{outbox_id}", local_id, sale)
+                    rows = self._settled_rows(conn, [seat_id for seat_id, _ in sale["seats"]],
+                                              [outcome.booking_id])
+            except sqlite3.IntegrityError as e:
+                # e.g. the customer was merged away; kept for staff to look at
+                self.local.connection().execute(
+                    "UPDATE outbox SET attempts = attempts + 1, error = ? WHERE id = ?", (str(e), outbox_id)
+                )
+                continue
+            self._settle(outbox_id, local_id, rows)
+            outcomes.append(outcome)
+        with self._lock:
+            self.pushed += len(outcomes)
+        return outcomes
+
+    def _apply_sale(self, conn, origin, local_id, sale):
+        claimed = {seat_id: price for seat_id, price in sale["seats"]}
+        seat_ids = sorted(claimed)
+        existing = conn.execute("SELECT bookings_id FROM bookings WHERE origin = ?", (origin,)).fetchone()
+        if existing:
+            # Pushed before, but the replica never heard back
+            won = [row[0] for row in conn.execute(
+                "SELECT seats_id FROM seats WHERE booking_id = ? ORDER BY seats_id", existing
+            )]
+            return SyncOutcome(local_id, existing[0], won, sorted(set(seat_ids) - set(won)))
+        rows = conn.execute(
+            f"SELECT seats_id, status, booking_id, hold_token IS NOT NULL AND hold_expires >= ? "
+            f"FROM seats WHERE show_id = ? AND seats_id IN ({_placeholders(seat_ids)})",
+            (time.time(), sale["show_id"], *seat_ids),
+        ).fetchall()
+        won, lost, winners = [], [], {}
+        for seat_id, status, owner_id, held in rows:
+            if status == AVAILABLE and not held:
+                won.append(seat_id)
+            else:
+                # Booked, blocked or being sold at another terminal right now
+                lost.append(seat_id)
+                winners[seat_id] = owner_id
+        lost.extend(sorted(set(seat_ids) - {row[0] for row in rows}))
+        booking_id = None
+        if won:
+            claimed_total = sum(claimed.values())
+            if len(won) == len(seat_ids):
+                total = sale["total"]
+            elif claimed_total:
+                total = round(sale["total"] * sum(claimed[s] for s in won) / claimed_total, 2)
+            else:
+                total = round(sale["total"] * len(won) / len(seat_ids), 2)
+            booking_id = conn.execute(
+                "INSERT INTO bookings (customer_id, show_id, booking_date, total_price, origin) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sale["customer_id"], sale["show_id"], sale["booking_date"], total, origin),
+            ).lastrowid
+            conn.execute(
+                f"UPDATE seats SET status = 'Booked', booking_id = ?, hold_token = NULL, "
+                f"hold_expires = NULL WHERE seats_id IN ({_placeholders(won)})",
+                (booking_id, *won),
+            )
+        conflicts = [
+            (seat_id, sale["show_id"], winners.get(seat_id), booking_id, origin)
+            for seat_id in lost
+        ]
+        if conflicts:
+            conn.executemany(
+                "INSERT INTO sync_conflicts (seat_id, show_id, winner_booking_id, loser_booking_id, "
+                "loser_origin) VALUES (?, ?, ?, ?, ?)",
+                conflicts,
+            )
+        return SyncOutcome(local_id, booking_id, sorted(won), sorted(lost))
+
+    def _settled_rows(self, conn, seat_ids, booking_ids):
+        # The claimed seats as the primary now has them, plus every booking,
+        # customer and show they refer to that the replica may not have yet
+        seats = self._fetch(conn, "seats", "seats_id", seat_ids)
+        booking_column = self.columns("seats").index("booking_id")
+        bookings = self._fetch(conn, "bookings", "bookings_id",
+                               {*booking_ids, *(row[booking_column] for row in seats)})
+        columns = self.columns("bookings")
+        return {
+            "customers": self._fetch(conn, "customers", "customers_id",
+                                     {row[columns.index("customer_id")] for row in bookings}),
+            "shows": self._fetch(conn, "shows", "shows_id",
+                                 {row[columns.index("show_id")] for row in bookings}),
+            "bookings": bookings,
+            "seats": seats,
+        }
+
+    def _settle(self, outbox_id, local_id, rows):
+        # Swap the provisional booking for what the primary decided
+        with self.local.transaction("IMMEDIATE") as conn:
+            conn.execute("PRAGMA defer_foreign_keys = ON")
+            conn.execute(
+                "UPDATE seats SET status = 'Available', booking_id = NULL WHERE booking_id = ?", (local_id,)
+            )
+            conn.execute("DELETE FROM bookings WHERE bookings_id = ?", (local_id,))
+            for table, key in SYNCED_TABLES:
+                if rows.get(table):
+                    conn.executemany(self._upsert_sql(table, key), rows[table])
+            conn.execute("DELETE FROM outbox WHERE id = ?", (outbox_id,))
+
+    def _fetch(self, conn, table, key, ids):
+        columns = ", ".join(self.columns(table))
+        rows = []
+        for chunk in _chunks(i for i in ids if i is not None):
+            rows.extend(conn.execute(
+                f"SELECT {columns} FROM {table} WHERE {key} IN ({_placeholders(chunk)})", chunk
+            ))
+        return rows
+
+    def _upsert_sql(self, table, key):
+        columns = self.columns(table)
+        assignments = [f"{column} = excluded.{column}" for column in columns if column != key]
+        where = ""
+        if table == "seats":
+            # Keep this terminal's own live holds on seats the primary still has free
+            keep_hold = f"excluded.hold_token IS NULL AND excluded.status = 'Available' " \
+                        f"AND seats.hold_expires >= {NOW_SQL}"
+            assignments = [
+                f"hold_token = CASE WHEN {keep_hold} THEN seats.hold_token ELSE excluded.hold_token END"
+                if column == "hold_token" else
+                f"hold_expires = CASE WHEN {keep_hold} THEN seats.hold_expires ELSE excluded.hold_expires END"
+                if column == "hold_expires" else
+                f"{column} = excluded.{column}"
+                for column in columns if column != key
+            ]
+            # Seats in a local sale are refreshed when that sale is pushed
+            where = f" WHERE seats.booking_id IS NULL OR seats.booking_id < {LOCAL_ID_BASE}"
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({_placeholders(columns)}) "
+            f"ON CONFLICT({key}) DO UPDATE SET {', '.join(assignments)}{where}"
+        )
+
+    def _has_gap(self, conn, last_seq):
+        # Entries after last_seq were pruned, or a bulk load skipped the log
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+        newest = row[0] if row else 0
+        if last_seq >= newest:
+            return False
+        oldest = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+        return oldest is None or oldest > last_seq + 1
+
+    def pull(self, batch=PULL_BATCH):
+        pulled = 0
+        while True:
+            last_seq = self.state("last_seq", 0)
+            # One read transaction, so the rows match the change_log entries
+            with self.primary.transaction() as conn:
+                if self._has_gap(conn, last_seq):
+                    raise _ResyncNeeded()
+                changes = conn.execute(
+                    "SELECT seq, table_name, row_id FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (last_seq, batch),
+                ).fetchall()
+                if not changes:
+                    break
+                changed = {}
+                for _, table, row_id in changes:
+                    changed.setdefault(table, set()).add(row_id)
+                rows = {
+                    table: self._fetch(conn, table, key, changed.get(table, ()))
+                    for table, key in SYNCED_TABLES
+                }
+            self._apply(changed, rows, changes[-1][0])
+            pulled += len(changes)
+        self._collect_conflicts()
+        with self._lock:
+            self.pulled += pulled
+        return pulled
+
+    def _collect_conflicts(self):
+        # Seats this terminal's sales lost when they were pushed
+        last_conflict = self.state("last_conflict", 0)
+        rows = self.primary.connection().execute(
+            "SELECT id, loser_origin, loser_booking_id, seat_id FROM sync_conflicts "
+            "WHERE id > ? AND loser_origin LIKE ? ORDER BY id",
+            (last_conflict, f"{self.terminal_id}:%"),
+        ).fetchall()
+        if not rows:
+            return
+        lost = {}
+        for _, origin, booking_id, seat_id in rows:
+            local_id = LOCAL_ID_BASE + int(origin.rsplit(":", 1)[1])
+            lost.setdefault((local_id, booking_id), []).append(seat_id)
+        self.lost_sales.extend(
+            SyncOutcome(local_id, booking_id, [], sorted(seat_ids))
+            for (local_id, booking_id), seat_ids in lost.items()
+        )
+        self.set_state("last_conflict", rows[-1][0])
+
+    def _apply(self, changed, rows, seq):
+        with self.local.transaction("IMMEDIATE") as conn:
+            conn.execute("PRAGMA defer_foreign_keys = ON")
+            for table, key in SYNCED_TABLES:
+                if rows[table]:
+                    conn.executemany(self._upsert_sql(table, key), rows[table])
+            for table, key in reversed(SYNCED_TABLES):
+                # Rows the primary no longer has were deleted there
+                gone = changed.get(table, set()) - {row[0] for row in rows[table]}
+                guard = f" AND {DELETE_GUARDS[table]}" if table in DELETE_GUARDS else ""
+                for chunk in _chunks(gone):
+                    conn.execute(f"DELETE FROM {table} WHERE {key} IN ({_placeholders(chunk)}){guard}", chunk)
+            self.set_state("last_seq", seq, conn)
+
+    def sync(self):
+        try:
+            pushed = self.push()
+            try:
+                pulled = self.pull()
+            except _ResyncNeeded:
+                # Sales made since the push above go first, with new ones held off
+                with self.write_lock:
+                    pushed += self.push()
+                    self.resync()
+                pulled = 0
+        except (sqlite3.Error, OSError) as e:
+            # Unreachable or too slow; keep selling from the replica
+            self.primary.release()
+            with self._lock:
+                self.online = False
+                self.last_error = str(e)
+            return None
+        with self._lock:
+            self.online = True
+            self.last_error = None
+            self.last_sync = time.time()
+        return pushed, pulled
+
+    def take_lost_sales(self):
+        taken = []
+        while self.lost_sales:
+            taken.append(self.lost_sales.popleft())
+        return taken
+
+    def status(self):
+        waiting, refused = self.local.connection().execute(
+            "SELECT COUNT(*) FILTER (WHERE error IS NULL), COUNT(*) FILTER (WHERE error IS NOT NULL) "
+            "FROM outbox"
+        ).fetchone()
+        with self._lock:
+            return {
+                "terminal": self.terminal_id,
+                "online": self.online,
+                "last_sync": self.last_sync,
+                "last_error": self.last_error,
+                "last_seq": self.state("last_seq", 0),
+                "outbox": waiting,
+                "refused": refused,
+                "pushed": self.pushed,
+                "pulled": self.pulled,
+                "resyncs": self.resyncs,
+            }
+
+    def close(self):
+        self.local.close_all()
+        self.primary.close_all()
+
+
+class ReplicaReservationService(ReservationService):
+    # Sells against the replica. Each booking gets a provisional id and an
+    # outbox entry in the same local transaction.
+
+    def __init__(self, replica, repository, *args, **kwargs):
+        super().__init__(repository, *args, **kwargs)
+        self.replica = replica
+
+    def _write(self, work):
+        with self.replica.write_lock:
+            return super()._write(work)
+
+    def _insert_booking(self, conn, customer_id, show_id, booking_date, total):
+        # The outbox entry queue_sale adds in this transaction gets the next id
+        newest = conn.execute("SELECT MAX(seq) FROM sqlite_sequence WHERE name = 'outbox'").fetchone()[0]
+        booking_id = LOCAL_ID_BASE + (newest or 0) + 1
+        conn.execute(
+            "INSERT INTO bookings (bookings_id, customer_id, show_id, booking_date, total_price) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (booking_id, customer_id, show_id, booking_date, total),
+        )
+        return booking_id
+
+    def _book_held(self, conn, token, customer_id, booking_date, now):
+        booking_id = super()._book_held(conn, token, customer_id, booking_date, now)
+        self.replica.queue_sale(conn, booking_id)
+        # Push straight away if the primary is there
+        self.pool.on_commit(self.replica.wake.set)
+        return booking_id
+
+
+class SyncWorker(threading.Thread):
+    def __init__(self, replica, interval=SYNC_INTERVAL):
+        super().__init__(name="replica-sync", daemon=True)
+        self.replica = replica
+        self.interval = interval
+        self._stopping = False
+
+    def run(self):
+        try:
+            while not self._stopping:
+                self.replica.sync()
+                self.replica.wake.wait(self.interval)
+                self.replica.wake.clear()
+        finally:
+            self.replica.local.release()
+            self.replica.primary.release()
+
+    def stop(self):
+        self._stopping = True
+        self.replica.wake.set()
+
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(prog="main.py replica",
+                                     description="Sync this terminal's local replica once")
+    parser.add_argument("--database", help="Path to the shared database (default: system.db)")
+    parser.add_argument("--replica", default=DEFAULT_REPLICA_PATH)
+    parser.add_argument("--resync", action="store_true", help="Take a fresh copy of the database")
+    args = parser.parse_args(argv)
+
+    replica = Replica(args.database or DB_PATH, args.replica)
+    try:
+        replica.ensure()
+        if args.resync:
+            replica.push()
+            replica.resync()
+        result = replica.sync()
+        if result is None:
+            print(f"Primary unreachable: {replica.last_error}")
+        else:
+            print(f"Pushed {len(result[0])} sales, pulled {result[1]} changes")
+        for outcome in replica.take_lost_sales():
+            print(f"  booking {outcome.local_booking_id} lost seats {outcome.lost}")
+        print(json.dumps(replica.status(), indent=2))
+    finally:
+        replica.close()
+    return 0 if replica.online else 1
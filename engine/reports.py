@@ -0,0 +1,194 @@
+import argparse
+import hashlib
+import html
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from string import Template
+
+from database.connection import ConnectionPool, DB_PATH
+
+# Bump when the templates change so cached reports are not reused
+TEMPLATE_VERSION = "1"
+BATCH_CHUNK = 200
+
+# Templates are parsed once at import time and reused for every report
+PAGE_TEMPLATE = Template("""<html>
+<head><meta charset="utf-8"><title>Booking $booking_id</title></head>
+<body>
+<h1>Booking $booking_id</h1>
+<table>
+<tr><th align="left">Customer</th><td>$customer_name ($customer_type), #$customer_id</td></tr>
+<tr><th align="left">Phone</th><td>$customer_phone</td></tr>
+<tr><th align="left">Show</th><td>$show_title</td></tr>
+<tr><th align="left">Date</th><td>$show_date</td></tr>
+<tr><th align="left">Venue</th><td>$show_venue</td></tr>
+<tr><th align="left">Booked on</th><td>$booking_date</td></tr>
+</table>
+<h2>Seats</h2>
+<table border="1" cellspacing="0" cellpadding="4">
+<tr><th>Seat</th><th>Price</th><th>Status</th></tr>
+$seat_rows
+</table>
+<p><b>Total: $total_price</b></p>
+</body>
+</html>
+""")
+SEAT_ROW_TEMPLATE = Template("<tr><td>$seat_number</td><td>$price</td><td>$status</td></tr>")
+
+
+def report_cache_dir(db_path):
+    # Kept beside the database the reports are rendered from
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "report_cache")
+
+
+def _text(value):
+    return html.escape("" if value is None else str(value))
+
+
+def _money(value):
+    return f"{float(value or 0):.2f}"
+
+
+def render_html(report_data):
+    booking, seats = report_data
+    (booking_id, booking_date, total_price, _, customer_id, customer_name, customer_phone,
+     customer_type, _, show_title, show_date, show_venue) = booking
+    seat_rows = "\n".join(
+        SEAT_ROW_TEMPLATE.substitute(
+            seat_number=_text(seat_number), price=_money(price), status=_text(status)
+        )
+        for seat_number, price, status in seats
+    )
+    return PAGE_TEMPLATE.substitute(
+        booking_id=_text(booking_id),
+        booking_date=_text(booking_date),
+        total_price=_money(total_price),
+        customer_id=_text(customer_id),
+        customer_name=_text(customer_name),
+        customer_phone=_text(customer_phone),
+        customer_type=_text(customer_type),
+        show_title=_text(show_title),
+        show_date=_text(show_date),
+        show_venue=_text(show_venue),
+        seat_rows=seat_rows,
+    )
+
+
+def write_pdf(html_text, path):
+    # Qt's rich text engine handles the small subset of HTML the template uses
+    from PyQt5 import QtGui, QtPrintSupport, QtWidgets
+
+    if QtWidgets.QApplication.instance() is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        write_pdf.app = QtWidgets.QApplication(["reports"])
+    document = QtGui.QTextDocument()
+    document.setHtml(html_text)
+    printer = QtPrintSupport.QPrinter(QtPrintSupport.QPrinter.HighResolution)
+    printer.setOutputFormat(QtPrintSupport.QPrinter.PdfFormat)
+    printer.setOutputFileName(path)
+    document.print_(printer)
+
+
+class ReportGenerator:
+    # Booking reports cached on disk under a key derived from the booking id
+    # and the stamps of the booking, customer and show rows it prints, so a
+    # reprint of an unchanged booking is a single primary key lookup.
+
+    def __init__(self, repository, cache_dir=None):
+        self.repository = repository
+        self.cache_dir = cache_dir or report_cache_dir(repository.pool.path)
+        self.hits = 0
+        self.misses = 0
+
+    def cache_path(self, booking_id, stamp, fmt):
+        key = hashlib.sha256(f"{TEMPLATE_VERSION}|{booking_id}|{stamp!r}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.{fmt}")
+
+    def report(self, booking_id, fmt="html"):
+        if fmt not in ("html", "pdf"):
+            raise ValueError(f"Unknown report format {fmt!r}")
+        stamp = self.repository.booking_stamp(booking_id)
+        path = self.cache_path(booking_id, stamp, fmt)
+        if stamp is not None and os.path.exists(path):
+            self.hits += 1
+            return path
+        data = self.repository.booking_report_data(booking_id)
+        if data is None:
+            raise KeyError(f"Booking {booking_id} does not exist")
+        self.misses += 1
+        os.makedirs(self.cache_dir, exist_ok=True)
+        html_text = render_html(data)
+        # Write to a temporary name first so a half-written file is never served
+        partial = f"{path}.{os.getpid()}.tmp"
+        if fmt == "pdf":
+            write_pdf(html_text, partial)
+        else:
+            with open(partial, "w", encoding="utf-8") as f:
+                f.write(html_text)
+        os.replace(partial, path)
+        return path
+
+
+def _render_chunk(db_path, cache_dir, booking_ids, fmt):
+    from database.repository import Repository
+
+    repository = Repository(ConnectionPool(db_path), auto_migrate=False)
+    # As in the GUI, so bookings of archived shows are found too
+    repository.attach_archive()
+    generator = ReportGenerator(repository, cache_dir)
+    results = {}
+    for booking_id in booking_ids:
+        try:
+            results[booking_id] = generator.report(booking_id, fmt)
+        except KeyError:
+            results[booking_id] = None
+    repository.pool.close_all()
+    return results
+
+
+def render_batch(booking_ids, fmt="pdf", db_path=DB_PATH, cache_dir=None,
+                 workers=None, chunk_size=BATCH_CHUNK):
+    # Renders many reports across a process pool, e.g. for a mailing run.
+    # Spawned workers keep Qt state from a running GUI out of the children.
+    booking_ids = list(booking_ids)
+    cache_dir = cache_dir or report_cache_dir(db_path)
+    chunks = [booking_ids[i:i + chunk_size] for i in range(0, len(booking_ids), chunk_size)]
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [
+            executor.submit(_render_chunk, db_path, cache_dir, chunk, fmt) for chunk in chunks
+        ]
+        for future in futures:
+            results.update(future.result())
+    return results
+
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(prog="main.py report", description="Render booking reports")
+    parser.add_argument("booking_ids", nargs="*", type=int)
+    parser.add_argument("--all", action="store_true", help="Render every booking")
+    parser.add_argument("--format", choices=["html", "pdf"], default="pdf")
+    parser.add_argument("--database", default=DB_PATH)
+    parser.add_argument("--cache-dir", help="Default: report_cache beside the database")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    booking_ids = args.booking_ids
+    if args.all:
+        from database.repository import Repository
+
+        repository = Repository(ConnectionPool(args.database), auto_migrate=False)
+        repository.attach_archive()
+        booking_ids = repository.booking_ids()
+        repository.pool.close_all()
+    if not booking_ids:
+        parser.error("give booking ids or --all")
+    cache_dir = args.cache_dir or report_cache_dir(args.database)
+    results = render_batch(booking_ids, args.format, args.database, cache_dir, args.workers)
+    missing = [booking_id for booking_id, path in results.items() if path is None]
+    print(f"Rendered {len(results) - len(missing)} reports into {cache_dir}")
+    if missing:
+        print(f"Unknown bookings: {missing}")
+    return 0
@@ -0,0 +1,221 @@
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from engine.seat_map import AVAILABLE, BOOKED, HELD
+
+HOLD_SECONDS = 300
+SWEEP_INTERVAL = 5
+SWEEP_BATCH = 500
+LOCK_RETRIES = 5
+
+
+class ReservationError(Exception):
+    pass
+
+
+class SeatUnavailable(ReservationError):
+    def __init__(self, seat_ids):
+        super().__init__(f"Seats no longer available: {sorted(seat_ids)}")
+        self.seat_ids = seat_ids
+
+
+class UnknownSeats(ReservationError):
+    def __init__(self, show_id, seat_ids):
+        super().__init__(f"Show {show_id} has no seats {sorted(seat_ids)}")
+        self.show_id = show_id
+        self.seat_ids = seat_ids
+
+
+class HoldExpired(ReservationError):
+    pass
+
+
+def _placeholders(values):
+    return ", ".join("?" * len(values))
+
+
+def _is_lock_error(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class ReservationService:
+    # Atomic seat holds and bookings.
+    #
+    # Every state change is one BEGIN IMMEDIATE transaction whose UPDATE only
+    # matches seats still in the expected state, so two terminals racing for
+    # the same seat cannot both win: the loser sees fewer rows changed and
+    # rolls back.
+
+    def __init__(self, repository, seat_maps=None, hold_seconds=HOLD_SECONDS, pricing=None,
+                 commit_queue=None):
+        self.repository = repository
+        self.pool = repository.pool
+        self.seat_maps = seat_maps
+        self.pricing = pricing
+        # With a CommitQueue, writes from every thread are group committed
+        self.commit_queue = commit_queue
+        self.hold_seconds = hold_seconds
+
+    def _write(self, work):
+        if self.commit_queue is not None:
+            return self.commit_queue.run(work)
+        # Retry the whole transaction if another writer kept the lock past busy_timeout
+        for attempt in range(LOCK_RETRIES):
+            try:
+                with self.pool.transaction("IMMEDIATE") as conn:
+                    return work(conn)
+            except sqlite3.OperationalError as e:
+                if not _is_lock_error(e) or attempt == LOCK_RETRIES - 1:
+                    raise
+                time.sleep(0.01 * (2 ** attempt))
+
+    def _seats_changed(self, show_id, seat_ids, status):
+        # Called inside the transaction; caches only hear about it once it commits
+        if not seat_ids:
+            return
+        if self.seat_maps is not None:
+            self.pool.on_commit(lambda: self.seat_maps.set_status(show_id, seat_ids, status))
+
+    def _take_hold(self, conn, show_id, seat_ids, token, now, hold_seconds):
+        cursor = conn.execute(
+            f"UPDATE seats SET hold_token = ?, hold_expires = ? "
+            f"WHERE show_id = ? AND seats_id IN ({_placeholders(seat_ids)}) "
+            f"AND status = 'Available' AND (hold_token IS NULL OR hold_expires < ?)",
+            (token, now + hold_seconds, show_id, *seat_ids, now),
+        )
+        if cursor.rowcount != len(seat_ids):
+            # Ids of another show, or of no seat at all, are a bad request, not a lost race
+            rows = conn.execute(
+                f"SELECT seats_id, hold_token IS ? FROM seats "
+                f"WHERE show_id = ? AND seats_id IN ({_placeholders(seat_ids)})",
+                (token, show_id, *seat_ids),
+            ).fetchall()
+            unknown = set(seat_ids) - {row[0] for row in rows}
+            if unknown:
+                raise UnknownSeats(show_id, unknown)
+            raise SeatUnavailable({seat_id for seat_id, ours in rows if not ours})
+        self._seats_changed(show_id, seat_ids, HELD)
+
+    def hold(self, show_id, seat_ids, hold_seconds=None):
+        seat_ids = sorted(set(seat_ids))
+        if not seat_ids:
+            raise ValueError("No seats to hold")
+        token = uuid.uuid4().hex
+        hold_seconds = self.hold_seconds if hold_seconds is None else hold_seconds
+        self._write(lambda conn: self._take_hold(conn, show_id, seat_ids, token, time.time(), hold_seconds))
+        return token
+
+    def _insert_booking(self, conn, customer_id, show_id, booking_date, total):
+        return conn.execute(
+            "INSERT INTO bookings (customer_id, show_id, booking_date, total_price) "
+            "VALUES (?, ?, ?, ?)",
+            (customer_id, show_id, booking_date, total),
+        ).lastrowid
+
+    def _book_held(self, conn, token, customer_id, booking_date, now):
+        held = conn.execute(
+            "SELECT seats_id, show_id, price FROM seats "
+            "WHERE hold_token = ? AND hold_expires >= ? AND status = 'Available'",
+            (token, now),
+        ).fetchall()
+        if not held:
+            raise HoldExpired(f"Hold {token} has expired or was released")
+        show_id = held[0][1]
+        seat_ids = [row[0] for row in held]
+        if self.pricing is not None:
+            total = self.pricing.booking_total(conn, customer_id, [row[2] for row in held])
+        else:
+            total = round(sum(float(row[2] or 0) for row in held), 2)
+        booking_id = self._insert_booking(conn, customer_id, show_id, booking_date, total)
+        cursor = conn.execute(
+            "UPDATE seats SET status = 'Booked', booking_id = ?, hold_token = NULL, hold_expires = NULL "
+            "WHERE hold_token = ? AND hold_expires >= ? AND status = 'Available'",
+            (booking_id, token, now),
+        )
+        if cursor.rowcount != len(seat_ids):
+            raise HoldExpired(f"Hold {token} changed while booking")
+        self._seats_changed(show_id, seat_ids, BOOKED)
+        return booking_id
+
+    def confirm(self, token, customer_id, booking_date=None):
+        booking_date = booking_date or datetime.now().isoformat(sep=" ", timespec="seconds")
+        return self._write(
+            lambda conn: self._book_held(conn, token, customer_id, booking_date, time.time())
+        )
+
+    def reserve(self, show_id, seat_ids, customer_id, booking_date=None):
+        # Hold and book in a single transaction, for sales that need no hold
+        seat_ids = sorted(set(seat_ids))
+        if not seat_ids:
+            raise ValueError("No seats to reserve")
+        token = uuid.uuid4().hex
+        booking_date = booking_date or datetime.now().isoformat(sep=" ", timespec="seconds")
+
+        def work(conn):
+            now = time.time()
+            self._take_hold(conn, show_id, seat_ids, token, now, self.hold_seconds)
+            return self._book_held(conn, token, customer_id, booking_date, now)
+
+        return self._write(work)
+
+    def _release_where(self, conn, where, params):
+        rows = conn.execute(
+            f"UPDATE seats SET hold_token = NULL, hold_expires = NULL WHERE {where} "
+            f"RETURNING seats_id, show_id",
+            params,
+        ).fetchall()
+        by_show = {}
+        for seat_id, show_id in rows:
+            by_show.setdefault(show_id, []).append(seat_id)
+        for show_id, seat_ids in by_show.items():
+            self._seats_changed(show_id, seat_ids, AVAILABLE)
+        return len(rows)
+
+    def release(self, token):
+        return self._write(lambda conn: self._release_where(
+            conn, "hold_token = ? AND status = 'Available'", (token,)
+        ))
+
+    def sweep_expired(self, batch_size=SWEEP_BATCH):
+        # Short transactions so sweeping never holds the write lock for long
+        released = 0
+        while True:
+            count = self._write(lambda conn: self._release_where(
+                conn,
+                "seats_id IN (SELECT seats_id FROM seats "
+                "WHERE hold_token IS NOT NULL AND hold_expires < ? LIMIT ?)",
+                (time.time(), batch_size),
+            ))
+            released += count
+            if count < batch_size:
+                return released
+
+
+class HoldSweeper(threading.Thread):
+    def __init__(self, service, interval=SWEEP_INTERVAL, batch_size=SWEEP_BATCH):
+        super().__init__(name="hold-sweeper", daemon=True)
+        self.service = service
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.wait(self.interval):
+                try:
+                    self.service.sweep_expired(self.batch_size)
+                except sqlite3.Error as e:
+                    print(f"Hold sweep failed: {e}")
+                except RuntimeError:
+                    # The commit queue closed under a sweep still running at shutdown
+                    if not self._stop_event.is_set():
+                        raise
+        finally:
+            self.service.pool.release()
+
+    def stop(self):
+        self._stop_event.set()
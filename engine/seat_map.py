@@ -0,0 +1,208 @@
+import re
+import sys
+import threading
+from array import array
+
+from engine.cache import LRUCache
+
+BOOKED = "Booked"
+AVAILABLE = "Available"
+BLOCKED = "Blocked"
+HELD = "Held"
+STATUSES = (BOOKED, AVAILABLE, BLOCKED, HELD)
+
+# Seat maps are kept current by set_status, the TTL only bounds drift from
+# writes made by other processes
+SEAT_MAP_CACHE_SIZE = 64
+SEAT_MAP_TTL = 300
+
+SEAT_NUMBER = re.compile(r"^\s*([A-Za-z]*)\s*-?\s*(\d+)\s*$")
+
+
+def parse_seat_number(seat_number):
+    # "A12" -> ("A", 12). Anything else sorts after numbered seats in row ""
+    match = SEAT_NUMBER.match(seat_number or "")
+    if not match:
+        return "", None
+    return match.group(1).upper(), int(match.group(2))
+
+
+def row_order(row):
+    # Front to back: A..Z, then AA, BB, ... as the generated venues label them
+    return (len(row), row)
+
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def run_starts(mask, length):
+    # Bit i of the result is set when bits i .. i+length-1 are all set in mask
+    result = mask
+    covered = 1
+    while covered < length and result:
+        step = min(covered, length - covered)
+        result &= result >> step
+        covered += step
+    return result
+
+
+class SeatMap:
+    # Seat availability for one show held as bit planes (one per status).
+    #
+    # Seats are laid out row by row in seat-number order, so bit i is the
+    # i-th seat of the venue and neighbours in a row are neighbouring bits.
+    # Python ints act as arbitrary-width bitsets, which makes counting and
+    # run searches a handful of word operations per 64 seats.
+
+    def __init__(self, show_id, seats):
+        # seats: iterable of (seats_id, seat_number, status, price)
+        self.show_id = show_id
+        ordered = sorted(seats, key=lambda seat: self._sort_key(seat[1]))
+        self.seat_ids = array("q", (seat[0] for seat in ordered))
+        self.seat_numbers = [sys.intern(seat[1] or "") for seat in ordered]
+        self.prices = array("d", (float(seat[3] or 0) for seat in ordered))
+        self.position_by_id = {seat_id: i for i, seat_id in enumerate(self.seat_ids)}
+        self.planes = {status: 0 for status in STATUSES}
+        self.row_masks = {}
+        self.row_of = []
+        self.number_of = []
+        # Segments are runs of consecutively numbered seats within a row;
+        # a party can only sit together inside one segment
+        self.segment_masks = []
+        self._span_masks = {}
+        self.lock = threading.RLock()
+        previous = None
+        for position, seat in enumerate(ordered):
+            row, number = parse_seat_number(seat[1])
+            self.row_of.append(sys.intern(row))
+            self.number_of.append(number)
+            bit = 1 << position
+            self.row_masks[row] = self.row_masks.get(row, 0) | bit
+            status = seat[2] if seat[2] in self.planes else BLOCKED
+            self.planes[status] |= bit
+            if (previous is not None and number is not None and previous[0] == row
+                    and previous[1] is not None and previous[1] + 1 == number):
+                self.segment_masks[-1] |= bit
+            else:
+                self.segment_masks.append(bit)
+            previous = (row, number)
+
+    @staticmethod
+    def _sort_key(seat_number):
+        row, number = parse_seat_number(seat_number)
+        return (row == "" and number is None, row_order(row), number if number is not None else 0,
+                seat_number or "")
+
+    def __len__(self):
+        return len(self.seat_ids)
+
+    @property
+    def rows(self):
+        return list(self.row_masks)
+
+    def count(self, status=AVAILABLE, row=None):
+        mask = self.planes[status]
+        if row is not None:
+            mask &= self.row_masks.get(row, 0)
+        return mask.bit_count()
+
+    def counts(self):
+        return {status: plane.bit_count() for status, plane in self.planes.items()}
+
+    def status_of(self, seat_id):
+        bit = 1 << self.position_by_id[seat_id]
+        for status, plane in self.planes.items():
+            if plane & bit:
+                return status
+        return None
+
+    def snapshot(self):
+        # (seats_id, seat_number, status, price) for every seat in layout order
+        statuses = [None] * len(self.seat_ids)
+        with self.lock:
+            for status, plane in self.planes.items():
+                for position in iter_bits(plane):
+                    statuses[position] = status
+        return [
+            (self.seat_ids[i], self.seat_numbers[i], statuses[i], self.prices[i])
+            for i in range(len(self.seat_ids))
+        ]
+
+    def free_in_row(self, row):
+        mask = self.planes[AVAILABLE] & self.row_masks.get(row, 0)
+        return [self.seat_numbers[i] for i in iter_bits(mask)]
+
+    def span_mask(self, length):
+        # Positions where a block of `length` seats fits without leaving its segment
+        mask = self._span_masks.get(length)
+        if mask is None:
+            mask = 0
+            for segment in self.segment_masks:
+                mask |= run_starts(segment, length)
+            self._span_masks[length] = mask
+        return mask
+
+    def adjacent_free_starts(self, length, row=None):
+        with self.lock:
+            mask = run_starts(self.planes[AVAILABLE], length) & self.span_mask(length)
+        if row is not None:
+            mask &= self.row_masks.get(row, 0)
+        return mask
+
+    def find_adjacent(self, length, row=None):
+        # First block of `length` free seats side by side, as seat ids
+        starts = self.adjacent_free_starts(length, row)
+        if not starts:
+            return None
+        start = (starts & -starts).bit_length() - 1
+        return [self.seat_ids[i] for i in range(start, start + length)]
+
+    def mask_for(self, seat_ids):
+        mask = 0
+        for seat_id in seat_ids:
+            mask |= 1 << self.position_by_id[seat_id]
+        return mask
+
+    def set_status(self, seat_ids, status):
+        # Incremental update after a committed booking or release
+        mask = self.mask_for(seat_id for seat_id in seat_ids if seat_id in self.position_by_id)
+        with self.lock:
+            for name in self.planes:
+                self.planes[name] &= ~mask
+            self.planes[status] |= mask
+        return mask
+
+
+class SeatMapStore:
+    # Read-through LRU/TTL cache of seat maps, one entry per show. Committed
+    # seat changes are applied to the cached map in place via set_status; a
+    # change for a map still loading discards that load instead.
+
+    def __init__(self, repository, maxsize=SEAT_MAP_CACHE_SIZE, ttl=SEAT_MAP_TTL):
+        self.repository = repository
+        self.cache = LRUCache(maxsize, ttl)
+
+    def get(self, show_id):
+        return self.cache.get_or_load(
+            show_id, lambda: SeatMap(show_id, self.repository.show_seats(show_id))
+        )
+
+    def set_status(self, show_id, seat_ids, status):
+        seat_map = self.cache.peek(show_id)
+        if seat_map is not None:
+            seat_map.set_status(seat_ids, status)
+        else:
+            self.cache.invalidate(show_id)
+
+    def invalidate(self, show_id=None):
+        if show_id is None:
+            self.cache.clear()
+        else:
+            self.cache.invalidate(show_id)
+
+    def stats(self):
+        return self.cache.stats()
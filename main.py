@@ -1,49 +1,257 @@
-import sys
-from PyQt5 import QtWidgets
-from ui_files.main_window_ui import Ui_Dialog as MainWindowUI
-from ui_files.customer_search_ui import Ui_Dialog as CustomerSearchUI
-from ui_files.bookings_ui import Ui_Dialog as BookingsUI
-from ui_files.seat_manager_ui import Ui_Dialog as SeatManagerUI
+import time
+
+# Taken before the imports below, so startup timings include them
+STARTED = time.perf_counter()
+
+import json  # noqa: E402
+import sys  # noqa: E402
+from PyQt5 import QtCore, QtGui, QtWidgets  # noqa: E402
+from ui_files.main_window_ui import Ui_Dialog as MainWindowUI  # noqa: E402
+from database.repository import (  # noqa: E402
+    Repository,
+    customer_matches,
+    CUSTOMER_COLUMNS,
+    CUSTOMER_TYPES,
+    BOOKING_COLUMNS,
+    SEAT_COLUMNS,
+)
+from engine.seat_map import SeatMapStore  # noqa: E402
+from engine.reservations import ReservationService, HoldSweeper, ReservationError  # noqa: E402
+from engine.allocator import SeatAllocator  # noqa: E402
+from engine.pricing import PricingEngine  # noqa: E402
+from engine.commit_queue import CommitQueue  # noqa: E402
+from engine.reports import ReportGenerator  # noqa: E402
+from engine.cache import ShowListCache  # noqa: E402
+from engine.instrumentation import metrics  # noqa: E402
+from widgets.screen_manager import ScreenManager  # noqa: E402
+from widgets.change_watcher import ChangeWatcher  # noqa: E402
+from widgets.diagnostics import DiagnosticsDialog, StallMonitor  # noqa: E402
+from widgets.table_models import PagedTableModel  # noqa: E402
+from widgets.incremental_search import IncrementalSearch, prefetched_pages, query_filters  # noqa: E402
+
+# Date edits at this value mean "no date filter"
+ANY_DATE = QtCore.QDate(2000, 1, 1)
+
+# How often the GUI checks the replica for sales the primary turned down
+REPLICA_CHECK_MS = 2000
+
+
+def fill_show_combo(combo, shows):
+    # Refill keeping the selected show; returns True if that show is gone
+    selected = combo.currentData()
+    blocked = combo.blockSignals(True)
+    try:
+        combo.clear()
+        combo.addItem("All shows", None)
+        for show_id, title, date, venue in shows:
+            combo.addItem(f"{title} ({date})", show_id)
+        index = combo.findData(selected)
+        combo.setCurrentIndex(max(index, 0))
+    finally:
+        combo.blockSignals(blocked)
+    return index < 0
 
 
 class MainWindow(QtWidgets.QDialog):
-    def __init__(self):
+    def __init__(self, repository=None, replica=None):
         super().__init__()
         self.ui = MainWindowUI()
         self.ui.setupUi(self)
         self.setWindowTitle("Ticket Booking System")
+        # One repository (and connection pool) shared by every dialog
+        self.repository = repository or Repository()
+        self.repository.attach_archive()
+        self.seat_maps = SeatMapStore(self.repository)
+        self.shows = ShowListCache(self.repository)
+        self.pricing = PricingEngine(self.repository, self.seat_maps)
+        self.commit_queue = CommitQueue(self.repository.pool)
+        # With a replica, every read and sale stays on this terminal's local copy
+        self.replica = replica
+        self.replica_sync = None
+        if replica is not None:
+            from engine.replica import ReplicaReservationService, SyncWorker
+
+            self.reservations = ReplicaReservationService(
+                replica, self.repository, self.seat_maps, pricing=self.pricing,
+                commit_queue=self.commit_queue,
+            )
+            self.replica_sync = SyncWorker(replica)
+            self.replica_sync.start()
+        else:
+            self.reservations = ReservationService(
+                self.repository, self.seat_maps, pricing=self.pricing, commit_queue=self.commit_queue
+            )
+        self.allocator = SeatAllocator(self.seat_maps)
+        self.reports = ReportGenerator(self.repository)
+        # Returns seats from abandoned holds to sale in the background
+        self.hold_sweeper = HoldSweeper(self.reservations)
+        self.hold_sweeper.start()
+        # Screens are built on first use and reused afterwards
+        self.screens = ScreenManager(self)
+        self.screens.register("customer_search", CustomerSearch)
+        self.screens.register("bookings", Bookings)
+        self.screens.register("seat_manager", SeatManager)
+        # Pushes other terminals' seat and booking changes into open screens
+        self.change_watcher = ChangeWatcher(self.repository, self.seat_maps, parent=self)
+        self.change_watcher.changes.connect(self.apply_changes)
+        if replica is not None:
+            self._replica_resyncs = replica.resyncs
+            self.replica_timer = QtCore.QTimer(self)
+            self.replica_timer.setInterval(REPLICA_CHECK_MS)
+            self.replica_timer.timeout.connect(self.check_replica)
+            self.replica_timer.start()
+        self.stall_monitor = StallMonitor(self)
+        self.stall_monitor.start()
+        self.diagnostics = None
         self.setup_connections()
 
+    def apply_changes(self, changes):
+        if any(change.table_name == "shows" for change in changes):
+            self.shows.invalidate()
+        for screen in self.screens.screens.values():
+            if hasattr(screen, "apply_changes"):
+                screen.apply_changes(changes)
+
     def setup_connections(self):
         # Connect buttons to their respective functions
         self.ui.gotocustomers.clicked.connect(self.open_customer_search)
         self.ui.gotobookings.clicked.connect(self.open_bookings)
         self.ui.gotoseats.clicked.connect(self.open_seat_manager)
+        # Hidden diagnostics panel for support staff
+        shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+D"), self)
+        shortcut.activated.connect(self.open_diagnostics)
+
+    def open_diagnostics(self):
+        if self.diagnostics is None:
+            self.diagnostics = DiagnosticsDialog(self.repository, self.diagnostic_stats, self)
+        self.diagnostics.refresh()
+        self.diagnostics.show()
+        self.diagnostics.raise_()
+
+    def diagnostic_stats(self):
+        stats = {
+            "seat map cache": self.seat_maps.stats(),
+            "show list cache": self.shows.cache.stats(),
+            "commit queue": self.commit_queue.stats(),
+            "screens": self.screens.timings(),
+        }
+        if self.replica is not None:
+            stats["replica"] = self.replica.status()
+        return stats
+
+    def check_replica(self):
+        if self.replica.resyncs != self._replica_resyncs:
+            # The replica was replaced by a fresh copy; cached state is stale
+            self._replica_resyncs = self.replica.resyncs
+            self.seat_maps.invalidate()
+            self.shows.invalidate()
+            self.change_watcher.last_seq = self.change_watcher.feed.latest_seq()
+        lost = self.replica.take_lost_sales()
+        if lost:
+            lines = [
+                f"Booking {outcome.booking_id or outcome.local_booking_id}: "
+                f"seats {', '.join(str(seat_id) for seat_id in outcome.lost)} were already taken"
+                for outcome in lost
+            ]
+            QtWidgets.QMessageBox.warning(self, "Seats lost on sync", "\n".join(lines))
+
+    def shutdown(self):
+        # Everything that writes through the commit queue stops before it closes
+        self.hold_sweeper.stop()
+        self.hold_sweeper.join(5)
+        if self.replica_sync is not None:
+            self.replica_sync.stop()
+            self.replica_sync.join(5)
+        self.commit_queue.close()
 
     def open_customer_search(self):
-        self.customer_search = CustomerSearch(self)
-        self.hide()
-        self.customer_search.show()
+        self.customer_search = self.screens.open("customer_search")
 
     def open_bookings(self):
-        self.bookings = Bookings(self)
-        self.hide()
-        self.bookings.show()
+        self.bookings = self.screens.open("bookings")
 
     def open_seat_manager(self):
-        self.seat_manager = SeatManager(self)
-        self.hide()
-        self.seat_manager.show()
+        self.seat_manager = self.screens.open("seat_manager")
 
 
 class CustomerSearch(QtWidgets.QDialog):
     def __init__(self, main_window):
         super().__init__()
+        # Imported here so startup only pays for the screens actually opened
+        from ui_files.customer_search_ui import Ui_Dialog as CustomerSearchUI
+
         self.ui = CustomerSearchUI()
         self.ui.setupUi(self)
         self.setWindowTitle("Customer Search")
         self.main_window = main_window
+        self.repository = main_window.repository
         self.ui.backtomenu.clicked.connect(self.back_to_menu)
+        self.model = PagedTableModel(CUSTOMER_COLUMNS, parent=self, name="customers")
+        self.ui.tableofresults.setModel(self.model)
+        self.live_search = IncrementalSearch(
+            lambda filters, limit: self.repository.search_customers(
+                limit=limit, **query_filters(filters)
+            ),
+            customer_matches,
+            self.repository.pool,
+            parent=self,
+        )
+        self.live_search.results_ready.connect(self.show_results)
+        self.live_search.search_failed.connect(self.show_search_error)
+        self.type_buttons = {
+            "Child": self.ui.childonly,
+            "Adult": self.ui.adultonly,
+            "Senior": self.ui.senioronly,
+            "VIP": self.ui.viponly,
+        }
+        for button in self.type_buttons.values():
+            button.setCheckable(True)
+        self.live_search.watch(
+            (self.ui.firstname, self.ui.lastname, self.ui.customerID, self.ui.phonenumber,
+             *self.type_buttons.values()),
+            self.current_filters,
+        )
+        self.search()
+
+    def current_filters(self):
+        return dict(
+            first_name=self.ui.firstname.text().strip(),
+            last_name=self.ui.lastname.text().strip(),
+            customer_id=self.ui.customerID.text().strip(),
+            phone=self.ui.phonenumber.text().strip(),
+            types=tuple(
+                customer_type for customer_type in CUSTOMER_TYPES
+                if self.type_buttons[customer_type].isChecked()
+            ),
+            _exact=("customer_id",),
+        )
+
+    def update_type_counts(self):
+        counts = self.repository.customer_type_counts()
+        for customer_type, button in self.type_buttons.items():
+            button.setText(f"{customer_type} ({counts.get(customer_type, 0)})")
+
+    def search(self):
+        self.live_search.run_now()
+
+    def show_results(self, filters, rows, complete):
+        self.update_type_counts()
+        self.model.set_query(
+            prefetched_pages(
+                rows,
+                complete,
+                lambda after_id, limit: self.repository.search_customers(
+                    after_id=after_id, limit=limit, **query_filters(filters)
+                ),
+            )
+        )
+
+    def show_search_error(self, message):
+        QtWidgets.QMessageBox.warning(self, "Customer Search", f"Search failed: {message}")
+
+    def closeEvent(self, event):
+        self.live_search.shutdown()
+        super().closeEvent(event)
 
     def back_to_menu(self):
         self.close()
@@ -53,11 +261,100 @@ class CustomerSearch(QtWidgets.QDialog):
 class Bookings(QtWidgets.QDialog):
     def __init__(self, main_window):
         super().__init__()
+        from ui_files.bookings_ui import Ui_Dialog as BookingsUI
+
         self.ui = BookingsUI()
         self.ui.setupUi(self)
         self.setWindowTitle("Bookings")
         self.main_window = main_window
+        self.repository = main_window.repository
         self.ui.backtomenu.clicked.connect(self.back_to_menu)
+        # Newest first, paged on (booking_date, booking id)
+        self.model = PagedTableModel(
+            BOOKING_COLUMNS, parent=self, name="bookings", page_key=lambda row: (row[3], row[0])
+        )
+        self.ui.tableofresults.setModel(self.model)
+        self.ui.tableofresults.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.ui.reportofselectedresult.clicked.connect(self.create_report)
+        for field in (self.ui.firstname, self.ui.lastname, self.ui.bookingid):
+            field.returnPressed.connect(self.search)
+        fill_show_combo(self.ui.comboBox, self.main_window.shows.get())
+        self.ui.comboBox.currentIndexChanged.connect(self.update_summary)
+        self.ui.comboBox.currentIndexChanged.connect(self.search)
+        # A date edit left at its minimum shows "Any" and does not filter
+        for date_edit in (self.ui.bookingdate, self.ui.bookingdateto):
+            date_edit.setCalendarPopup(True)
+            date_edit.setMinimumDate(ANY_DATE)
+            date_edit.setSpecialValueText("Any")
+            date_edit.setDate(ANY_DATE)
+            date_edit.dateChanged.connect(self.search)
+        self.ui.includearchive.setEnabled(self.repository.archive_attached)
+        self.ui.includearchive.toggled.connect(self.search)
+        self.search()
+        self.update_summary()
+
+    def selected_date(self, date_edit):
+        if date_edit.date() == date_edit.minimumDate():
+            return None
+        return date_edit.date().toString(QtCore.Qt.ISODate)
+
+    def update_summary(self):
+        # Read from the trigger-maintained summaries, never from bookings/seats
+        show_id = self.ui.comboBox.currentData()
+        today = QtCore.QDate.currentDate().toString(QtCore.Qt.ISODate)
+        if show_id is None:
+            shows, bookings, revenue, booked, available, blocked = self.repository.sales_totals()
+            scope = f"{shows:.0f} shows"
+        else:
+            bookings, revenue, booked, available, blocked = self.repository.show_sales(show_id)
+            scope = self.ui.comboBox.currentText()
+        today_bookings, today_revenue = self.repository.daily_sales(today, show_id)
+        capacity = booked + available
+        occupancy = f"{booked / capacity:.0%}" if capacity else "n/a"
+        self.ui.salessummary.setText(
+            f"{scope}: {bookings:.0f} bookings, revenue {revenue:.2f}, "
+            f"{booked:.0f}/{capacity:.0f} seats sold ({occupancy}), {blocked:.0f} blocked. "
+            f"Today: {today_bookings:.0f} bookings, {today_revenue:.2f}"
+        )
+
+    def search(self):
+        filters = dict(
+            first_name=self.ui.firstname.text().strip(),
+            last_name=self.ui.lastname.text().strip(),
+            booking_id=self.ui.bookingid.text().strip(),
+            show_id=self.ui.comboBox.currentData(),
+            date_from=self.selected_date(self.ui.bookingdate),
+            date_to=self.selected_date(self.ui.bookingdateto),
+            include_archive=self.ui.includearchive.isChecked(),
+        )
+        self.model.set_query(
+            lambda after, limit: self.repository.search_bookings(
+                after=after, limit=limit, **filters
+            )
+        )
+
+    def apply_changes(self, changes):
+        if any(c.table_name == "shows" for c in changes):
+            if fill_show_combo(self.ui.comboBox, self.main_window.shows.get()):
+                self.search()
+        changed = {c.row_id for c in changes if c.table_name == "bookings" and c.op == "update"}
+        changed &= set(self.model.cached_keys())
+        if changed:
+            self.model.update_rows(self.repository.bookings_by_ids(changed))
+        self.update_summary()
+
+    def create_report(self):
+        selected = self.ui.tableofresults.selectionModel().selectedRows()
+        row = self.model.row(selected[0].row()) if selected else None
+        if row is None:
+            QtWidgets.QMessageBox.information(self, "Bookings", "Select a booking first.")
+            return
+        try:
+            path = self.main_window.reports.report(row[0], "pdf")
+        except KeyError as e:
+            QtWidgets.QMessageBox.warning(self, "Bookings", str(e))
+            return
+        QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(path))
 
     def back_to_menu(self):
         self.close()
@@ -67,19 +364,191 @@ class Bookings(QtWidgets.QDialog):
 class SeatManager(QtWidgets.QDialog):
     def __init__(self, main_window):
         super().__init__()
+        from ui_files.seat_manager_ui import Ui_Dialog as SeatManagerUI
+
         self.ui = SeatManagerUI()
         self.ui.setupUi(self)
         self.setWindowTitle("Seat Manager")
         self.main_window = main_window
+        self.repository = main_window.repository
         self.ui.backtomenu.clicked.connect(self.back_to_menu)
+        self.model = PagedTableModel(SEAT_COLUMNS, parent=self, name="seats")
+        self.ui.tablewithallseats.setModel(self.model)
+        for field in (self.ui.firstname, self.ui.lastname, self.ui.bookingid):
+            field.returnPressed.connect(self.search)
+        fill_show_combo(self.ui.showselect, self.main_window.shows.get())
+        self.ui.showselect.currentIndexChanged.connect(self.search)
+        self.ui.findbestseats.clicked.connect(self.find_best_seats)
+        self.search()
+
+    def selected_show(self):
+        return self.ui.showselect.currentData()
+
+    def search(self):
+        filters = dict(
+            first_name=self.ui.firstname.text().strip(),
+            last_name=self.ui.lastname.text().strip(),
+            booking_id=self.ui.bookingid.text().strip(),
+            show_id=self.selected_show(),
+        )
+        self.model.set_query(
+            lambda after_id, limit: self.repository.search_seats(
+                after_id=after_id, limit=limit, **filters
+            )
+        )
+        self.update_summary()
+
+    def update_summary(self):
+        show_id = self.selected_show()
+        if show_id is None:
+            self.ui.seatsummary.setText("")
+            return
+        counts = self.main_window.seat_maps.get(show_id).counts()
+        self.ui.seatsummary.setText(
+            ", ".join(f"{status}: {count}" for status, count in counts.items())
+        )
+
+    def apply_changes(self, changes):
+        if any(c.table_name == "shows" for c in changes):
+            if fill_show_combo(self.ui.showselect, self.main_window.shows.get()):
+                self.search()
+        changed = {c.row_id for c in changes if c.table_name == "seats" and c.op == "update"}
+        changed &= set(self.model.cached_keys())
+        if changed:
+            self.model.update_rows(self.repository.seats_by_ids(changed))
+        if any(c.show_id == self.selected_show() for c in changes):
+            self.update_summary()
+
+    def find_best_seats(self):
+        show_id = self.selected_show()
+        if show_id is None:
+            QtWidgets.QMessageBox.information(self, "Seat Manager", "Select a show first.")
+            return
+        party_size = self.ui.partysize.value()
+        allocation = self.main_window.allocator.best_available(show_id, party_size)
+        if allocation is None:
+            QtWidgets.QMessageBox.information(
+                self, "Seat Manager", f"No block of {party_size} seats together is available."
+            )
+            return
+        answer = QtWidgets.QMessageBox.question(
+            self,
+            "Seat Manager",
+            f"Best available: {', '.join(allocation.seat_numbers)} "
+            f"({allocation.total_price:.2f}). Hold these seats?",
+        )
+        if answer != QtWidgets.QMessageBox.Yes:
+            return
+        reservations = self.main_window.reservations
+        try:
+            token = reservations.hold(show_id, allocation.seat_ids)
+        except ReservationError as e:
+            QtWidgets.QMessageBox.warning(self, "Seat Manager", str(e))
+            self.search()
+            return
+        self.search()
+        # The seats stay held while the customer is looked up; book or let go
+        try:
+            booking_id = self.confirm_hold(token, allocation)
+        except ReservationError as e:
+            QtWidgets.QMessageBox.warning(self, "Seat Manager", str(e))
+            booking_id = None
+        if booking_id is None:
+            reservations.release(token)
+        else:
+            QtWidgets.QMessageBox.information(
+                self, "Seat Manager",
+                f"Booked {', '.join(allocation.seat_numbers)} as booking {booking_id}.",
+            )
+        self.search()
+
+    def confirm_hold(self, token, allocation):
+        # Returns the new booking id, or None if the sale was abandoned
+        while True:
+            customer_id, ok = QtWidgets.QInputDialog.getInt(
+                self, "Seat Manager",
+                f"Seats {', '.join(allocation.seat_numbers)} are held.\n"
+                f"Customer ID to book them for (Cancel releases them):",
+                min=1, max=2**31 - 1,
+            )
+            if not ok:
+                return None
+            if self.repository.customer_exists(customer_id):
+                return self.main_window.reservations.confirm(token, customer_id)
+            QtWidgets.QMessageBox.warning(self, "Seat Manager", f"Customer {customer_id} not found.")
 
     def back_to_menu(self):
         self.close()
         self.main_window.show()
 
 
+def run_migrations():
+    from database.connection import ConnectionPool
+    from database.migrations import migrate, current_version
+
+    pool = ConnectionPool()
+    conn = pool.connection()
+    print(f"Database {pool.path} is at version {current_version(conn)}")
+    applied = migrate(conn, log=print)
+    if not applied:
+        print("Already up to date.")
+    else:
+        print(f"Migrated to version {current_version(conn)}")
+    pool.close_all()
+
+
 if __name__ == "__main__":
+    if "--migrate" in sys.argv[1:]:
+        run_migrations()
+        sys.exit(0)
+    if sys.argv[1:2] in (["import"], ["export"]):
+        from database.bulk import run_cli
+
+        sys.exit(run_cli(sys.argv[1:]))
+    if sys.argv[1:2] == ["serve"]:
+        from api.server import run_cli
+
+        sys.exit(run_cli(sys.argv[2:]))
+    if sys.argv[1:2] == ["dedup"]:
+        from engine.dedup import run_cli
+
+        sys.exit(run_cli(sys.argv[2:]))
+    if sys.argv[1:2] == ["reprice"]:
+        from engine.pricing import run_cli
+
+        sys.exit(run_cli(sys.argv[2:]))
+    if sys.argv[1:2] == ["archive"]:
+        from database.archive import run_cli
+
+        sys.exit(run_cli(sys.argv[2:]))
+    if sys.argv[1:2] == ["report"]:
+        from engine.reports import run_cli
+
+        sys.exit(run_cli(sys.argv[2:]))
+    if sys.argv[1:2] == ["replica"]:
+        from engine.replica import run_cli
+
+        sys.exit(run_cli(sys.argv[2:]))
+    if "--capture-query-params" in sys.argv[1:]:
+        # Support only: keeps search terms in the diagnostics panel
+        metrics.capture_params = True
     app = QtWidgets.QApplication(sys.argv)
-    window = MainWindow()
+    replica = None
+    if "--replica" in sys.argv[1:]:
+        # Offline-capable terminal: python main.py --replica [PATH]
+        from engine.replica import Replica, DEFAULT_REPLICA_PATH
+
+        position = sys.argv.index("--replica") + 1
+        path = sys.argv[position] if position < len(sys.argv) and not sys.argv[position].startswith("--") \
+            else DEFAULT_REPLICA_PATH
+        replica = Replica(path=path).ensure()
+        window = MainWindow(Repository(replica.local), replica=replica)
+    else:
+        window = MainWindow()
     window.show()
-    sys.exit(app.exec_())
+    window.screens.record_startup(time.perf_counter() - STARTED)
+    exit_code = app.exec_()
+    window.shutdown()
+    if "--timings" in sys.argv[1:]:
+        print(json.dumps(window.screens.timings(), indent=2))
+    sys.exit(exit_code)
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from api.server import ServiceAPI
+from database.connection import ConnectionPool
+from database.repository import Repository
+
+
+class ServiceAPITest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmp.name, "api.db"))
+        conn = Repository(self.pool).pool.connection()
+        conn.execute("INSERT INTO shows (shows_id, title, date, venue) VALUES (1, 'Show', '2030-01-01 19:00', 'Hall')")
+        conn.execute("INSERT INTO customers (customers_id, name, phone, type) VALUES (1, 'Ann', '555', 'Adult')")
+        conn.executemany(
+            "INSERT INTO seats (seats_id, seat_number, price, status, show_id) VALUES (?, ?, 10, 'Available', 1)",
+            [(i, f"A{i}") for i in range(1, 4)],
+        )
+        self.api = ServiceAPI(Repository(self.pool), workers=2)
+
+    def tearDown(self):
+        self.api.close()
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def call(self, method, target, data=None):
+        body = json.dumps(data).encode() if data is not None else b""
+        return asyncio.run(self.api.handle(method, target, body))
+
+    def test_unknown_customer_is_not_found(self):
+        status, payload = self.call("POST", "/reservations", {"show_id": 1, "seat_ids": [1], "customer_id": 99})
+        self.assertEqual((status, payload), (404, {"error": "Customer 99 not found"}))
+        status, payload = self.call("POST", "/reservations", {"show_id": 1, "seat_ids": [1], "customer_id": 1})
+        self.assertEqual(status, 201)
+
+    def test_unexpected_errors_still_get_a_response(self):
+        def broken(data):
+            raise RuntimeError("secret detail")
+
+        self.api.reserve = broken
+        status, payload = self.call("POST", "/reservations", {})
+        self.assertEqual((status, payload), (500, {"error": "Internal server error"}))
+
+        sent = []
+
+        async def receive():
+            return {"body": b"{}", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.api.asgi({"type": "http", "method": "POST", "path": "/reservations"}, receive, send))
+        self.assertEqual(sent[0]["status"], 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
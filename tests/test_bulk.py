@@ -0,0 +1,80 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from database import bulk
+from database.connection import ConnectionPool
+from database.migrations import migrate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BulkLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.db")
+        self.pool = ConnectionPool(self.path)
+        migrate(self.pool.connection())
+        self.schema = self.customer_schema()
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def customer_schema(self):
+        return self.pool.connection().execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE tbl_name = 'customers' "
+            "AND type IN ('index', 'trigger') AND sql IS NOT NULL ORDER BY name"
+        ).fetchall()
+
+    def test_load_killed_midway_is_repaired_by_migrate(self):
+        script = textwrap.dedent(f"""
+            import os
+            from database import bulk
+            from database.connection import ConnectionPool
+
+            def rows():
+                for i in range(1, 3001):
+                    if i == 2500:
+                        os._exit(1)
+                    yield i, f"Customer {{i}}", "555", "Adult"
+
+            bulk.load_rows(ConnectionPool({self.path!r}), "customers", rows(), chunk_size=100, commit_every=1000)
+        """)
+        self.assertEqual(subprocess.run([sys.executable, "-c", script], cwd=ROOT).returncode, 1)
+        self.assertEqual(self.customer_schema(), [])
+
+        migrate(self.pool.connection())
+        conn = self.pool.connection()
+        self.assertEqual(self.customer_schema(), self.schema)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM pending_rebuild").fetchone()[0], 0)
+        self.assertEqual(conn.execute("SELECT count FROM customer_type_counts WHERE type = 'Adult'").fetchone()[0],
+                         2000)
+        self.assertEqual(conn.execute(
+            "SELECT COUNT(*) FROM customers_fts WHERE customers_fts MATCH 'Customer 1999'").fetchone()[0], 1)
+
+    def test_foreign_key_error_names_the_row(self):
+        path = os.path.join(self.tmp.name, "bookings.csv")
+        with open(path, "w") as f:
+            f.write("bookings_id,customer_id,show_id,booking_date,total_price\n")
+            f.write("1,1,7,2030-01-01,10\n")
+        self.pool.close_all()
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = bulk.run_cli(["import", "bookings", path, "--database", self.path])
+        self.assertEqual(status, 1)
+        self.assertIn("bookings row 1", stderr.getvalue())
+        self.assertIn("FOREIGN KEY", stderr.getvalue())
+        conn = self.pool.connection()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0], 0)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM pending_rebuild").fetchone()[0], 0)
+        self.assertEqual(self.customer_schema(), self.schema)
+
+
+if __name__ == "__main__":
+    unittest.main()
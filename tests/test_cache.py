@@ -0,0 +1,80 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.cache import LRUCache
+from engine.reservations import ReservationService
+from engine.seat_map import BOOKED, HELD, SeatMapStore
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_load_invalidated_midway_is_returned_but_not_cached(self):
+        cache = LRUCache()
+        loading, release = threading.Event(), threading.Event()
+        results = []
+
+        def slow_loader():
+            loading.set()
+            release.wait(5)
+            return "stale"
+
+        thread = threading.Thread(target=lambda: results.append(cache.get_or_load(1, slow_loader)))
+        thread.start()
+        self.assertTrue(loading.wait(5))
+        cache.invalidate(1)
+        release.set()
+        thread.join(5)
+        self.assertEqual(results, ["stale"])
+        self.assertIsNone(cache.peek(1))
+        self.assertEqual(cache.get_or_load(1, lambda: "fresh"), "fresh")
+        self.assertEqual(cache.peek(1), "fresh")
+
+
+class SeatMapStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmp.name, "test.db"))
+        self.repository = Repository(self.pool)
+        conn = self.pool.connection()
+        conn.execute("INSERT INTO shows (shows_id, title, date, venue) VALUES (1, 'Show', '2030-01-01 19:00', 'Hall')")
+        conn.execute("INSERT INTO customers (customers_id, name, phone, type) VALUES (1, 'Ann', '555', 'Adult')")
+        conn.executemany(
+            "INSERT INTO seats (seats_id, seat_number, price, status, show_id) VALUES (?, ?, 10, 'Available', 1)",
+            [(i, f"A{i}") for i in range(1, 5)],
+        )
+        self.seat_maps = SeatMapStore(self.repository)
+        self.service = ReservationService(self.repository, self.seat_maps)
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def test_committed_writes_update_the_cached_map(self):
+        seat_map = self.seat_maps.get(1)
+        token = self.service.hold(1, [1, 2])
+        self.assertEqual(seat_map.counts()[HELD], 2)
+        self.service.confirm(token, 1)
+        self.assertIs(self.seat_maps.get(1), seat_map)
+        self.assertEqual(seat_map.counts()[BOOKED], 2)
+        self.assertEqual(seat_map.counts()[HELD], 0)
+
+    def test_write_during_a_load_is_not_lost(self):
+        show_seats = self.repository.show_seats
+
+        def read_then_sell(show_id):
+            # The load reads, then a sale commits before it is cached
+            rows = show_seats(show_id)
+            self.service.reserve(1, [3], 1)
+            return rows
+
+        self.repository.show_seats = read_then_sell
+        self.assertEqual(self.seat_maps.get(1).counts()[BOOKED], 0)
+        self.repository.show_seats = show_seats
+        self.assertEqual(self.seat_maps.get(1).counts()[BOOKED], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
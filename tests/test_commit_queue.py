@@ -0,0 +1,73 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.commit_queue import CommitQueue
+from engine.reservations import HoldSweeper, ReservationService
+
+
+class CommitQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmp.name, "test.db"))
+        self.repository = Repository(self.pool)
+        self.pool.connection().execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+        self.queue = CommitQueue(self.pool, max_delay=0.05)
+
+    def tearDown(self):
+        self.queue.close()
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def test_requests_share_a_commit_and_fail_alone(self):
+        futures = [
+            self.queue.submit(lambda conn, i=i: conn.execute("INSERT INTO items VALUES (?)", (i,)).lastrowid)
+            for i in (1, 2, 1, 3)
+        ]
+        self.assertEqual([f.exception(5) is None for f in futures], [True, True, False, True])
+        self.assertEqual(self.repository.fetchall("SELECT id FROM items ORDER BY id"), [(1,), (2,), (3,)])
+        stats = self.queue.stats()
+        self.assertLess(stats["batches"], stats["submitted"])
+        self.assertEqual((stats["succeeded"], stats["failed"]), (3, 1))
+
+    def test_close_fails_what_the_writer_never_reached(self):
+        started, gate = threading.Event(), threading.Event()
+        first = self.queue.submit(lambda conn: started.set() or gate.wait(5))
+        # The writer is inside the first batch, so the next request stays queued
+        self.assertTrue(started.wait(5))
+        second = self.queue.submit(lambda conn: 2)
+        self.queue.close(timeout=0.1)
+        self.assertIsInstance(second.exception(1), RuntimeError)
+        with self.assertRaises(RuntimeError):
+            self.queue.submit(lambda conn: 3)
+        gate.set()
+        self.assertTrue(first.result(5))
+
+    def test_sweeper_stopped_first_ends_quietly(self):
+        errors = []
+        hook, threading.excepthook = threading.excepthook, errors.append
+        self.addCleanup(setattr, threading, "excepthook", hook)
+        service = ReservationService(self.repository, commit_queue=self.queue)
+        sweeper = HoldSweeper(service, interval=0.01)
+        sweeping = threading.Event()
+        sweep = service.sweep_expired
+
+        def slow_sweep(batch_size):
+            sweeping.set()
+            sweeper.stop()
+            self.queue.close()
+            return sweep(batch_size)
+
+        service.sweep_expired = slow_sweep
+        sweeper.start()
+        self.assertTrue(sweeping.wait(5))
+        sweeper.join(5)
+        self.assertFalse(sweeper.is_alive())
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
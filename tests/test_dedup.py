@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.dedup import DuplicateFinder, DuplicateGroup, read_groups, write_groups
+
+
+class DedupMergeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmp.name, "test.db"))
+        self.repository = Repository(self.pool)
+        conn = self.pool.connection()
+        conn.execute("INSERT INTO shows (shows_id, title, date, venue) VALUES (1, 'Show', '2030-01-01 19:00', 'Hall')")
+        conn.executemany("INSERT INTO customers (customers_id, name, phone, type) VALUES (?, ?, ?, ?)", [
+            (1, "Margaret Jones", "07700 900123", "Adult"),
+            (2, "Margret Jones", "07700900123", "Adult"),
+            (3, "Peter Smith", "01632 960001", "Senior"),
+        ])
+        conn.executemany(
+            "INSERT INTO bookings (bookings_id, customer_id, show_id, booking_date, total_price) "
+            "VALUES (?, ?, 1, '2030-01-01', 10)",
+            [(10, 1), (11, 2), (12, 2), (13, 3)],
+        )
+        self.finder = DuplicateFinder(self.repository)
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def owners(self):
+        return dict(self.repository.fetchall("SELECT bookings_id, customer_id FROM bookings"))
+
+    def test_reviewed_groups_merge_and_undo(self):
+        groups = self.finder.find()
+        self.assertEqual([(g.keep_id, g.duplicate_ids) for g in groups], [(1, [2])])
+        path = os.path.join(self.tmp.name, "groups.json")
+        write_groups(path, groups)
+
+        self.assertEqual(self.finder.merge(read_groups(path)), (1, 2))
+        self.assertEqual(self.owners(), {10: 1, 11: 1, 12: 1, 13: 3})
+        self.assertIsNone(self.repository.fetchone("SELECT 1 FROM customers WHERE customers_id = 2"))
+        self.assertEqual(self.repository.fetchone(
+            "SELECT keep_id, booking_ids FROM customer_merges WHERE duplicate_id = 2"), (1, "[11,12]"))
+
+        self.assertEqual(self.finder.undo([2]), 1)
+        self.assertEqual(self.owners(), {10: 1, 11: 2, 12: 2, 13: 3})
+        self.assertEqual(self.repository.fetchone(
+            "SELECT name, phone FROM customers WHERE customers_id = 2"), ("Margret Jones", "07700900123"))
+        self.assertIsNone(self.repository.fetchone("SELECT 1 FROM customer_merges"))
+
+    def test_inconsistent_groups_change_nothing(self):
+        with self.assertRaises(ValueError):
+            self.finder.merge([DuplicateGroup(1, [2], None), DuplicateGroup(2, [3], None)])
+        with self.assertRaises(ValueError):
+            self.finder.merge([DuplicateGroup(1, [99], None)])
+        self.assertEqual(self.owners(), {10: 1, 11: 2, 12: 2, 13: 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
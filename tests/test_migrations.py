@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from database.connection import ConnectionPool
+from database.migrations import LATEST_VERSION, current_version, migrate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATE = (
+    "import sys\n"
+    "from database.connection import ConnectionPool\n"
+    "from database.migrations import migrate\n"
+    "migrate(ConnectionPool(sys.argv[1]).connection())\n"
+)
+
+
+def schema(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+    finally:
+        conn.close()
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_terminals_migrating_together_all_succeed(self):
+        reference = os.path.join(self.tmp.name, "reference.db")
+        pool = ConnectionPool(reference)
+        migrate(pool.connection())
+        pool.close_all()
+        for attempt in range(3):
+            path = os.path.join(self.tmp.name, f"shared{attempt}.db")
+            pool = ConnectionPool(path)
+            migrate(pool.connection(), target=1)
+            pool.close_all()
+            processes = [
+                subprocess.Popen([sys.executable, "-c", MIGRATE, path], cwd=ROOT, stderr=subprocess.PIPE)
+                for _ in range(4)
+            ]
+            for process in processes:
+                _, stderr = process.communicate(timeout=60)
+                self.assertEqual(process.returncode, 0, stderr.decode())
+            self.assertEqual(schema(path), schema(reference))
+            conn = sqlite3.connect(path)
+            self.assertEqual(current_version(conn), LATEST_VERSION)
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
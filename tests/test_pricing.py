@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.pricing import PricingEngine
+from engine.reservations import ReservationService
+
+
+class PricingTotalsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmp.name, "test.db"))
+        self.repository = Repository(self.pool)
+        conn = self.pool.connection()
+        conn.execute("INSERT INTO shows (shows_id, title, date, venue) VALUES (1, 'Show', '2030-01-01 19:00', 'Hall')")
+        conn.executemany("INSERT INTO customers (customers_id, name, phone, type) VALUES (?, ?, '555', ?)",
+                         [(1, "Ann", "Adult"), (2, "Bo", "Child"), (3, "Cy", "Senior")])
+        conn.executemany(
+            "INSERT INTO seats (seats_id, seat_number, price, status, show_id) VALUES (?, ?, ?, 'Available', 1)",
+            [(1, "A1", 12.30), (2, "A2", 12.30), (3, "A3", 12.35), (4, "A4", 64)],
+        )
+        self.pricing = PricingEngine(self.repository)
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def test_totals_are_in_cents_not_price_steps(self):
+        self.assertEqual(self.pricing.total_for(12.30 + 12.30, "Adult"), (24.6, 0.0))
+        self.assertEqual(self.pricing.total_for(192, "Child"), (115.2, 76.8))
+
+    def test_quote_adds_up(self):
+        for customer_type in ("Adult", "Child", "Senior", "VIP"):
+            quote = self.pricing.quote(1, [1, 2, 3], customer_type)
+            self.assertEqual(quote.subtotal, 36.95)
+            self.assertEqual(round(quote.subtotal - quote.discount, 2), quote.total)
+
+    def test_booking_stores_the_quoted_total(self):
+        service = ReservationService(self.repository, pricing=self.pricing)
+        quote = self.pricing.quote(1, [3, 4], "Senior")
+        booking_id = service.reserve(1, [3, 4], 3)
+        self.assertEqual(self.repository.fetchone(
+            "SELECT total_price FROM bookings WHERE bookings_id = ?", (booking_id,))[0], quote.total)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+from database.bulk import FORCE_REPLICA_RESYNC
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.replica import LOCAL_ID_BASE, Replica, ReplicaReservationService
+from engine.reservations import ReservationService
+
+
+class ReplicaSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmp.name, "primary.db"))
+        self.primary = Repository(self.pool)
+        conn = self.pool.connection()
+        conn.execute("INSERT INTO shows (shows_id, title, date, venue) VALUES (1, 'Show', '2030-01-01 19:00', 'Hall')")
+        conn.executemany("INSERT INTO customers (customers_id, name, phone, type) VALUES (?, ?, '555', 'Adult')",
+                         [(1, "Kept"), (2, "Removed")])
+        conn.executemany(
+            "INSERT INTO seats (seats_id, seat_number, price, status, show_id) VALUES (?, ?, 10, 'Available', 1)",
+            [(i, f"A{i}") for i in range(1, 6)],
+        )
+        self.replica = Replica(self.pool.path, os.path.join(self.tmp.name, "replica.db")).ensure()
+        self.sales = ReplicaReservationService(self.replica, Repository(self.replica.local))
+
+    def tearDown(self):
+        self.replica.close()
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def seat(self, seat_id):
+        return self.primary.fetchone(
+            "SELECT s.status, b.origin FROM seats s LEFT JOIN bookings b ON b.bookings_id = s.booking_id "
+            "WHERE s.seats_id = ?", (seat_id,)
+        )
+
+    def test_outbox_ids_are_not_reused_after_resync(self):
+        refused = self.sales.reserve(1, [1], 2)
+        self.pool.connection().execute("DELETE FROM customers WHERE customers_id = 2")
+        pushed = self.sales.reserve(1, [2], 1)
+        self.assertIsNotNone(self.replica.sync())
+        self.assertEqual(self.replica.status()["refused"], 1)
+        self.assertEqual(self.seat(2), ("Booked", f"{self.replica.terminal_id}:{pushed - LOCAL_ID_BASE}"))
+
+        self.replica.resync()
+        later = self.sales.reserve(1, [3], 1)
+        self.assertGreater(later, max(refused, pushed))
+        outcomes, _ = self.replica.sync()
+        self.assertEqual([(o.won, o.lost) for o in outcomes], [([3], [])])
+        self.assertEqual(self.seat(3), ("Booked", f"{self.replica.terminal_id}:{later - LOCAL_ID_BASE}"))
+        self.assertEqual(self.seat(2)[0], "Booked")
+
+    def test_online_sale_keeps_its_seats(self):
+        self.sales.reserve(1, [4, 5], 1, booking_date="2000-01-01 00:00:00")
+        online = ReservationService(self.primary).reserve(1, [4], 1)
+        total = self.primary.fetchone("SELECT total_price FROM bookings WHERE bookings_id = ?", (online,))[0]
+
+        outcomes, _ = self.replica.sync()
+        self.assertEqual([(o.won, o.lost) for o in outcomes], [([5], [4])])
+        self.assertEqual(self.primary.fetchone(
+            "SELECT booking_id FROM seats WHERE seats_id = 4")[0], online)
+        self.assertEqual(self.primary.fetchone(
+            "SELECT total_price FROM bookings WHERE bookings_id = ?", (online,))[0], total)
+        self.assertEqual([o.lost for o in self.replica.take_lost_sales()], [[4]])
+
+    def force_gap(self):
+        # What a bulk load does to the change log
+        with self.pool.transaction("IMMEDIATE") as conn:
+            for statement in FORCE_REPLICA_RESYNC:
+                conn.execute(statement)
+
+    def test_sale_between_push_and_resync_is_kept(self):
+        push = self.replica.push
+        sold = []
+
+        def push_then_sell():
+            outcomes = push()
+            if not sold:
+                sold.append(self.sales.reserve(1, [2], 1))
+            return outcomes
+
+        self.replica.push = push_then_sell
+        self.force_gap()
+        self.assertIsNotNone(self.replica.sync())
+        self.assertEqual(self.replica.status()["resyncs"], 2)
+        self.assertEqual(self.seat(2), ("Booked", f"{self.replica.terminal_id}:{sold[0] - LOCAL_ID_BASE}"))
+        self.assertEqual(self.replica.local.connection().execute(
+            "SELECT status FROM seats WHERE seats_id = 2").fetchone()[0], "Booked")
+
+    def test_resync_carries_unpushed_sales_and_holds(self):
+        local = self.sales.reserve(1, [2], 1)
+        token = self.sales.hold(1, [3])
+        self.force_gap()
+        self.replica.resync()
+
+        conn = self.replica.local.connection()
+        self.assertEqual(conn.execute(
+            "SELECT status, booking_id FROM seats WHERE seats_id = 2").fetchone(), ("Booked", local))
+        self.assertEqual(conn.execute(
+            "SELECT hold_token FROM seats WHERE seats_id = 3").fetchone()[0], token)
+        self.assertEqual(self.replica.status()["outbox"], 1)
+        self.assertEqual(self.seat(2)[0], "Available")
+
+        self.replica.sync()
+        self.assertEqual(self.seat(2), ("Booked", f"{self.replica.terminal_id}:{local - LOCAL_ID_BASE}"))
+        self.assertEqual(self.replica.status()["outbox"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
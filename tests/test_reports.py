@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from database.archive import Archiver
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.reports import ReportGenerator, render_batch
+
+
+class ReportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.db")
+        self.pool = ConnectionPool(self.path)
+        self.repository = Repository(self.pool)
+        conn = self.pool.connection()
+        conn.executemany("INSERT INTO shows (shows_id, title, date, venue) VALUES (?, ?, ?, 'Hall')",
+                         [(1, "Past", "2000-01-01 19:00"), (2, "Next", "2099-01-01 19:00")])
+        conn.execute("INSERT INTO customers (customers_id, name, phone, type) VALUES (1, 'Ann', '555', 'Adult')")
+        conn.executemany(
+            "INSERT INTO bookings (bookings_id, customer_id, show_id, booking_date, total_price) "
+            "VALUES (?, 1, ?, '2000-01-01 10:00', 10)",
+            [(1, 1), (2, 2)],
+        )
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def test_cache_follows_customer_changes(self):
+        generator = ReportGenerator(self.repository)
+        self.assertEqual(generator.cache_dir, os.path.join(self.tmp.name, "report_cache"))
+        first = generator.report(2)
+        self.assertEqual(generator.report(2), first)
+        self.pool.connection().execute("UPDATE customers SET name = 'Bea' WHERE customers_id = 1")
+        renamed = generator.report(2)
+        self.assertNotEqual(renamed, first)
+        with open(renamed, encoding="utf-8") as f:
+            self.assertIn("Bea", f.read())
+
+    def test_batch_finds_archived_bookings(self):
+        archiver = Archiver(self.pool)
+        archiver.open()
+        archiver.archive_show(1)
+        self.assertIsNone(self.repository.fetchone("SELECT 1 FROM bookings WHERE bookings_id = 1"))
+        results = render_batch([1, 2, 3], "html", self.path, workers=1)
+        self.assertIsNotNone(results[1])
+        self.assertIsNotNone(results[2])
+        self.assertIsNone(results[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
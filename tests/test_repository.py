@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.instrumentation import metrics
+
+
+class RepositoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmp.name, "test.db"))
+        self.repository = Repository(self.pool)
+        conn = self.pool.connection()
+        conn.execute("INSERT INTO shows (shows_id, title, date, venue) VALUES (1, 'Show', '2030-01-01 19:00', 'Hall')")
+        conn.execute("INSERT INTO customers (customers_id, name, phone, type) VALUES (1, 'Ann', '555', 'Adult')")
+        dates = ["2030-01-02 10:00", None, "2030-01-01 10:00", None, "2030-01-02 10:00", None, "2029-12-31 09:00"]
+        conn.executemany(
+            "INSERT INTO bookings (bookings_id, customer_id, show_id, booking_date, total_price) VALUES (?, 1, 1, ?, 10)",
+            list(enumerate(dates, 1)),
+        )
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def test_pages_reach_undated_bookings(self):
+        for show_id in (None, 1):
+            seen, after = [], None
+            while True:
+                rows = self.repository.search_bookings(show_id=show_id, after=after, limit=2)
+                if not rows:
+                    break
+                seen += [row[0] for row in rows]
+                after = (rows[-1][3], rows[-1][0])
+            self.assertEqual(seen, [5, 1, 3, 7, 6, 4, 2])
+
+    def test_recorded_queries_keep_no_search_terms(self):
+        self.repository.search_customers(last_name="Smith", phone="555")
+        event = metrics.queries[-1]
+        self.assertNotIn("Smith", repr(event))
+        self.assertTrue(event.params)
+        self.assertEqual(set(event.params), {None})
+        metrics.capture_params = True
+        try:
+            self.repository.search_customers(last_name="Smith")
+            self.assertIn("Smith", repr(metrics.queries[-1].params))
+        finally:
+            metrics.capture_params = False
+
+
+if __name__ == "__main__":
+    unittest.main()
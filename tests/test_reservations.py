@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from database.connection import ConnectionPool
+from database.repository import Repository
+from engine.reservations import HoldExpired, ReservationService, SeatUnavailable, UnknownSeats
+
+
+class ReservationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmp.name, "test.db"))
+        self.repository = Repository(self.pool)
+        conn = self.pool.connection()
+        conn.executemany("INSERT INTO shows (shows_id, title, date, venue) VALUES (?, 'Show', '2030-01-01 19:00', 'Hall')",
+                         [(1,), (2,)])
+        conn.execute("INSERT INTO customers (customers_id, name, phone, type) VALUES (1, 'Ann', '555', 'Adult')")
+        conn.executemany(
+            "INSERT INTO seats (seats_id, seat_number, price, status, show_id) VALUES (?, ?, 10, 'Available', ?)",
+            [(i, f"A{i}", 1 if i <= 4 else 2) for i in range(1, 7)],
+        )
+        self.service = ReservationService(self.repository)
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def test_unknown_and_foreign_seats_are_rejected(self):
+        with self.assertRaises(UnknownSeats) as caught:
+            self.service.hold(1, [1, 5, 99])
+        self.assertEqual(caught.exception.seat_ids, {5, 99})
+        # Nothing was held by the failed request
+        self.assertEqual(self.pool.connection().execute(
+            "SELECT COUNT(*) FROM seats WHERE hold_token IS NOT NULL").fetchone()[0], 0)
+
+    def test_only_seats_taken_by_others_are_reported(self):
+        self.service.hold(1, [2])
+        with self.assertRaises(SeatUnavailable) as caught:
+            self.service.hold(1, [1, 2, 3])
+        self.assertEqual(caught.exception.seat_ids, {2})
+
+    def seats(self, *seat_ids):
+        return self.pool.connection().execute(
+            f"SELECT status, booking_id, hold_token FROM seats WHERE seats_id IN ({', '.join('?' * len(seat_ids))}) "
+            "ORDER BY seats_id", seat_ids
+        ).fetchall()
+
+    def test_hold_then_confirm_books_the_held_seats(self):
+        token = self.service.hold(1, [1, 2])
+        self.assertEqual([row[2] for row in self.seats(1, 2)], [token, token])
+        with self.assertRaises(SeatUnavailable):
+            self.service.reserve(1, [2], 1)
+        booking_id = self.service.confirm(token, 1)
+        self.assertEqual(self.seats(1, 2), [("Booked", booking_id, None)] * 2)
+        self.assertEqual(self.pool.connection().execute(
+            "SELECT total_price FROM bookings WHERE bookings_id = ?", (booking_id,)).fetchone()[0], 20)
+        with self.assertRaises(HoldExpired):
+            self.service.confirm(token, 1)
+
+    def test_expired_hold_cannot_be_confirmed_and_is_swept(self):
+        token = self.service.hold(1, [3], hold_seconds=-1)
+        with self.assertRaises(HoldExpired):
+            self.service.confirm(token, 1)
+        # An expired hold does not block anyone else
+        other = self.service.hold(1, [3])
+        self.service.release(other)
+        self.service.hold(1, [4], hold_seconds=-1)
+        self.assertEqual(self.service.sweep_expired(), 1)
+        self.assertEqual(self.seats(3, 4), [("Available", None, None)] * 2)
+
+    def test_release_frees_only_that_hold(self):
+        first = self.service.hold(1, [1])
+        self.service.hold(1, [2])
+        self.assertEqual(self.service.release(first), 1)
+        self.assertEqual([row[2] is None for row in self.seats(1, 2)], [True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+# ui-source-sha256: da9086dc55fd3f3d8fb53de41f32652b9fe1000420cd245ef3e1576527054ffb
 # -*- coding: utf-8 -*-
 
 # Form implementation generated from reading ui file '/Users/kaarel/Downloads/Ticket-Booking-System/ui_design_files/bookings.ui'
@@ -102,12 +103,27 @@ class Ui_Dialog(object):
         self.bookingdate.setSizePolicy(sizePolicy)
         self.bookingdate.setObjectName("bookingdate")
         self.horizontalLayout_3.addWidget(self.bookingdate)
+        self.label_6 = QtWidgets.QLabel(self.layoutWidget)
+        font = QtGui.QFont()
+        font.setPointSize(12)
+        self.label_6.setFont(font)
+        self.label_6.setObjectName("label_6")
+        self.horizontalLayout_3.addWidget(self.label_6)
+        self.bookingdateto = QtWidgets.QDateEdit(self.layoutWidget)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.MinimumExpanding, QtWidgets.QSizePolicy.Preferred)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.bookingdateto.sizePolicy().hasHeightForWidth())
+        self.bookingdateto.setSizePolicy(sizePolicy)
+        self.bookingdateto.setObjectName("bookingdateto")
+        self.horizontalLayout_3.addWidget(self.bookingdateto)
+        self.includearchive = QtWidgets.QCheckBox(self.layoutWidget)
+        self.includearchive.setObjectName("includearchive")
+        self.horizontalLayout_3.addWidget(self.includearchive)
         self.verticalLayout.addLayout(self.horizontalLayout_3)
         self.verticalLayout_2.addLayout(self.verticalLayout)
-        self.tableofresults = QtWidgets.QTableWidget(self.layoutWidget)
+        self.tableofresults = QtWidgets.QTableView(self.layoutWidget)
         self.tableofresults.setObjectName("tableofresults")
-        self.tableofresults.setColumnCount(0)
-        self.tableofresults.setRowCount(0)
         self.verticalLayout_2.addWidget(self.tableofresults)
         self.reportofselectedresult = QtWidgets.QPushButton(self.layoutWidget)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Maximum)
@@ -127,6 +143,10 @@ class Ui_Dialog(object):
         self.backtomenu.setFlat(False)
         self.backtomenu.setObjectName("backtomenu")
         self.verticalLayout_2.addWidget(self.backtomenu)
+        self.salessummary = QtWidgets.QLabel(Dialog)
+        self.salessummary.setGeometry(QtCore.QRect(10, 10, 831, 31))
+        self.salessummary.setText("")
+        self.salessummary.setObjectName("salessummary")
         self.widget = QtWidgets.QWidget(Dialog)
         self.widget.setGeometry(QtCore.QRect(850, 10, 191, 31))
         self.widget.setObjectName("widget")
@@ -160,6 +180,8 @@ class Ui_Dialog(object):
         self.label_2.setText(_translate("Dialog", "Last Name"))
         self.label_5.setText(_translate("Dialog", "BookingID"))
         self.label_4.setText(_translate("Dialog", "Booking Date"))
+        self.label_6.setText(_translate("Dialog", "to"))
+        self.includearchive.setText(_translate("Dialog", "Include archived shows"))
         self.reportofselectedresult.setText(_translate("Dialog", "Create report of selected customer booking"))
         self.backtomenu.setText(_translate("Dialog", "Back to Menu"))
         self.label_3.setText(_translate("Dialog", "Show"))
@@ -1,3 +1,4 @@
+# ui-source-sha256: 42600654909c820e00c4ba914a8e47838bc0dfdeedbe5253cd829a8106128405
 # -*- coding: utf-8 -*-
 
 # Form implementation generated from reading ui file '/Users/kaarel/Downloads/Ticket-Booking-System/ui_design_files/customer_search.ui'
@@ -131,15 +132,13 @@ class Ui_Dialog(object):
         self.verticalLayout_2.addLayout(self.verticalLayout)
         spacerItem3 = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Minimum)
         self.verticalLayout_2.addItem(spacerItem3)
-        self.tableofresults = QtWidgets.QTableWidget(self.layoutWidget)
+        self.tableofresults = QtWidgets.QTableView(self.layoutWidget)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
         sizePolicy.setHorizontalStretch(0)
         sizePolicy.setVerticalStretch(0)
         sizePolicy.setHeightForWidth(self.tableofresults.sizePolicy().hasHeightForWidth())
         self.tableofresults.setSizePolicy(sizePolicy)
         self.tableofresults.setObjectName("tableofresults")
-        self.tableofresults.setColumnCount(0)
-        self.tableofresults.setRowCount(0)
         self.verticalLayout_2.addWidget(self.tableofresults)
         self.verticalLayout_3.addLayout(self.verticalLayout_2)
         spacerItem4 = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Minimum)
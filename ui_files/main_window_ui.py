@@ -1,3 +1,4 @@
+# ui-source-sha256: 4c5a71240f0e10794753ac895c594fb7d9b9f0caff084048a6ee0916ac826383
 # -*- coding: utf-8 -*-
 
 # Form implementation generated from reading ui file '/Users/kaarel/Downloads/Ticket-Booking-System/ui_design_files/main_window.ui'
@@ -1,3 +1,4 @@
+# ui-source-sha256: a6eb87e3b09381582df5031ce947f97db0ab4a9f1bc1f68c1bc60c1edb0af6cd
 # -*- coding: utf-8 -*-
 
 # Form implementation generated from reading ui file '/Users/kaarel/Downloads/Ticket-Booking-System/ui_design_files/seat_manager.ui'
@@ -87,12 +88,51 @@ class Ui_Dialog(object):
         self.horizontalLayout_7.addWidget(self.bookingid)
         self.horizontalLayout.addLayout(self.horizontalLayout_7)
         self.verticalLayout_2.addLayout(self.horizontalLayout)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.label = QtWidgets.QLabel(self.layoutWidget)
+        font = QtGui.QFont()
+        font.setPointSize(12)
+        self.label.setFont(font)
+        self.label.setObjectName("label")
+        self.horizontalLayout_2.addWidget(self.label)
+        self.showselect = QtWidgets.QComboBox(self.layoutWidget)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.showselect.sizePolicy().hasHeightForWidth())
+        self.showselect.setSizePolicy(sizePolicy)
+        self.showselect.setObjectName("showselect")
+        self.horizontalLayout_2.addWidget(self.showselect)
+        self.label_2 = QtWidgets.QLabel(self.layoutWidget)
+        font = QtGui.QFont()
+        font.setPointSize(12)
+        self.label_2.setFont(font)
+        self.label_2.setObjectName("label_2")
+        self.horizontalLayout_2.addWidget(self.label_2)
+        self.partysize = QtWidgets.QSpinBox(self.layoutWidget)
+        self.partysize.setMinimum(1)
+        self.partysize.setMaximum(20)
+        self.partysize.setProperty("value", 2)
+        self.partysize.setObjectName("partysize")
+        self.horizontalLayout_2.addWidget(self.partysize)
+        self.findbestseats = QtWidgets.QPushButton(self.layoutWidget)
+        self.findbestseats.setObjectName("findbestseats")
+        self.horizontalLayout_2.addWidget(self.findbestseats)
+        self.seatsummary = QtWidgets.QLabel(self.layoutWidget)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Preferred)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.seatsummary.sizePolicy().hasHeightForWidth())
+        self.seatsummary.setSizePolicy(sizePolicy)
+        self.seatsummary.setText("")
+        self.seatsummary.setObjectName("seatsummary")
+        self.horizontalLayout_2.addWidget(self.seatsummary)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_2)
         self.verticalLayout = QtWidgets.QVBoxLayout()
         self.verticalLayout.setObjectName("verticalLayout")
-        self.tablewithallseats = QtWidgets.QTableWidget(self.layoutWidget)
+        self.tablewithallseats = QtWidgets.QTableView(self.layoutWidget)
         self.tablewithallseats.setObjectName("tablewithallseats")
-        self.tablewithallseats.setColumnCount(0)
-        self.tablewithallseats.setRowCount(0)
         self.verticalLayout.addWidget(self.tablewithallseats)
         self.backtomenu = QtWidgets.QPushButton(self.layoutWidget)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Maximum)
@@ -114,4 +154,7 @@ class Ui_Dialog(object):
         self.label_5.setText(_translate("Dialog", "First Name"))
         self.label_6.setText(_translate("Dialog", "Last Name"))
         self.label_7.setText(_translate("Dialog", "BookingID"))
+        self.label.setText(_translate("Dialog", "Show"))
+        self.label_2.setText(_translate("Dialog", "Party Size"))
+        self.findbestseats.setText(_translate("Dialog", "Find Best Available"))
         self.backtomenu.setText(_translate("Dialog", "Back to Menu"))
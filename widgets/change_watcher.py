@@ -0,0 +1,85 @@
+import os
+import sqlite3
+from PyQt5 import QtCore
+
+from engine.change_feed import ChangeFeed, group_seat_changes
+
+# Coalesce the burst of file events a single commit produces
+SETTLE_MS = 50
+# Fallback for file systems without change notifications (network shares)
+FALLBACK_POLL_MS = 2000
+PRUNE_INTERVAL_MS = 60 * 60 * 1000
+
+
+class ChangeWatcher(QtCore.QObject):
+    # Pushes change_log deltas to open screens.
+    #
+    # Wakes up on file-system notifications for the database and its WAL,
+    # checks PRAGMA data_version to see whether anything was committed and
+    # only then reads the change_log rows after the last seq it delivered.
+    changes = QtCore.pyqtSignal(object)
+
+    def __init__(self, repository, seat_maps=None, parent=None):
+        super().__init__(parent)
+        self.feed = ChangeFeed(repository)
+        self.seat_maps = seat_maps
+        self.last_seq = self.feed.latest_seq()
+        self._data_version = self.feed.data_version()
+        path = repository.pool.path
+        self.file_watcher = QtCore.QFileSystemWatcher(self)
+        for watched in (path, f"{path}-wal"):
+            if os.path.exists(watched):
+                self.file_watcher.addPath(watched)
+        self.file_watcher.fileChanged.connect(self.schedule)
+        self.settle_timer = QtCore.QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(SETTLE_MS)
+        self.settle_timer.timeout.connect(self.check)
+        self.poll_timer = QtCore.QTimer(self)
+        self.poll_timer.setInterval(FALLBACK_POLL_MS)
+        self.poll_timer.timeout.connect(self.check)
+        self.poll_timer.start()
+        self.prune_timer = QtCore.QTimer(self)
+        self.prune_timer.setInterval(PRUNE_INTERVAL_MS)
+        self.prune_timer.timeout.connect(self.prune)
+        self.prune_timer.start()
+        self._paths = (path, f"{path}-wal")
+
+    def schedule(self, path=None):
+        # Some editors and checkpoints replace the file, which drops the watch
+        for watched in self._paths:
+            if watched not in self.file_watcher.files() and os.path.exists(watched):
+                self.file_watcher.addPath(watched)
+        self.settle_timer.start()
+
+    def check(self):
+        try:
+            version = self.feed.data_version()
+            if version == self._data_version:
+                return
+            self._data_version = version
+            while True:
+                changes = self.feed.changes_since(self.last_seq)
+                if not changes:
+                    return
+                self.last_seq = changes[-1].seq
+                self._apply_to_seat_maps(changes)
+                self.changes.emit(changes)
+        except sqlite3.Error as e:
+            print(f"Change check failed: {e}")
+
+    def _apply_to_seat_maps(self, changes):
+        if self.seat_maps is None:
+            return
+        for change in changes:
+            if change.table_name == "seats" and change.op != "update":
+                # Seats added or removed: the layout itself changed
+                self.seat_maps.invalidate(change.show_id)
+        for (show_id, status), seat_ids in group_seat_changes(changes).items():
+            self.seat_maps.set_status(show_id, seat_ids, status)
+
+    def prune(self):
+        try:
+            self.feed.prune()
+        except sqlite3.Error as e:
+            print(f"Change log prune failed: {e}")
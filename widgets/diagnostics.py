@@ -0,0 +1,113 @@
+import sqlite3
+import time
+from PyQt5 import QtCore, QtWidgets
+
+from engine.instrumentation import explain, metrics
+
+HEARTBEAT_MS = 50
+# Event loop delays longer than this are recorded as stalls
+STALL_THRESHOLD = 0.1
+
+
+class StallMonitor(QtCore.QObject):
+    # A heartbeat timer on the GUI thread; if it fires late, the event loop
+    # was blocked and the delay is charged to the active window
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(HEARTBEAT_MS)
+        self.timer.timeout.connect(self._beat)
+        self._last = time.perf_counter()
+
+    def start(self):
+        self._last = time.perf_counter()
+        self.timer.start()
+
+    def _beat(self):
+        now = time.perf_counter()
+        late = now - self._last - HEARTBEAT_MS / 1000
+        self._last = now
+        if late > STALL_THRESHOLD:
+            window = QtWidgets.QApplication.activeWindow()
+            metrics.record_stall(window.windowTitle() if window else "(none)", late)
+
+
+def _fill(table, headers, rows):
+    table.setColumnCount(len(headers))
+    table.setHorizontalHeaderLabels(headers)
+    table.setRowCount(len(rows))
+    for row_index, row in enumerate(rows):
+        for column_index, value in enumerate(row):
+            table.setItem(row_index, column_index, QtWidgets.QTableWidgetItem(str(value)))
+    table.resizeColumnsToContents()
+
+
+class DiagnosticsDialog(QtWidgets.QDialog):
+    # Hidden profiler panel (Ctrl+Shift+D on the main window). The tables
+    # only ever hold a few hundred rows, so plain QTableWidgets are fine here.
+
+    def __init__(self, repository, extra_stats=None, parent=None):
+        super().__init__(parent)
+        self.repository = repository
+        self.extra_stats = extra_stats
+        self.setWindowTitle("Diagnostics")
+        self.resize(1000, 600)
+        layout = QtWidgets.QVBoxLayout(self)
+        self.tabs = QtWidgets.QTabWidget(self)
+        self.queries = QtWidgets.QTableWidget(self)
+        self.stalls = QtWidgets.QTableWidget(self)
+        self.fetches = QtWidgets.QTableWidget(self)
+        self.plans = QtWidgets.QPlainTextEdit(self)
+        self.plans.setReadOnly(True)
+        self.tabs.addTab(self.queries, "Queries")
+        self.tabs.addTab(self.stalls, "UI stalls")
+        self.tabs.addTab(self.fetches, "Model fetches")
+        self.tabs.addTab(self.plans, "Slow query plans")
+        layout.addWidget(self.tabs)
+        buttons = QtWidgets.QHBoxLayout()
+        self.refresh_button = QtWidgets.QPushButton("Refresh", self)
+        self.explain_button = QtWidgets.QPushButton("Explain slowest", self)
+        self.clear_button = QtWidgets.QPushButton("Clear", self)
+        for button in (self.refresh_button, self.explain_button, self.clear_button):
+            buttons.addWidget(button)
+        buttons.addStretch()
+        layout.addLayout(buttons)
+        self.refresh_button.clicked.connect(self.refresh)
+        self.explain_button.clicked.connect(self.explain_slowest)
+        self.clear_button.clicked.connect(self.clear)
+        self.refresh()
+
+    def refresh(self):
+        _fill(self.queries, ["Count", "Total ms", "Avg ms", "Max ms", "Rows", "Statement"], [
+            (e["count"], f"{e['total'] * 1000:.2f}", f"{e['avg'] * 1000:.3f}",
+             f"{e['max'] * 1000:.3f}", e["rows"], e["fingerprint"])
+            for e in metrics.query_summary()
+        ])
+        _fill(self.stalls, ["Time", "Screen", "Blocked ms"], [
+            (time.strftime("%H:%M:%S", time.localtime(e.at)), e.screen, f"{e.seconds * 1000:.0f}")
+            for e in reversed(metrics.stalls)
+        ])
+        _fill(self.fetches, ["Time", "Model", "Rows", "ms"], [
+            (time.strftime("%H:%M:%S", time.localtime(e.at)), e.model, e.rows,
+             f"{e.seconds * 1000:.2f}")
+            for e in reversed(metrics.fetches)
+        ])
+
+    def explain_slowest(self):
+        conn = self.repository.pool.connection()
+        sections = []
+        for event in metrics.slowest_queries():
+            try:
+                plan = "\n".join(f"  {line}" for line in explain(conn, event.sql, event.params))
+            except sqlite3.Error as e:
+                plan = f"  (could not explain: {e})"
+            sections.append(f"{event.seconds * 1000:.2f} ms, {event.rows} rows\n{event.sql}\n{plan}")
+        if self.extra_stats:
+            sections.append("\n".join(f"{name}: {value}" for name, value in self.extra_stats().items()))
+        self.plans.setPlainText("\n\n".join(sections) or "No queries recorded yet.")
+        self.tabs.setCurrentWidget(self.plans)
+
+    def clear(self):
+        metrics.clear()
+        self.refresh()
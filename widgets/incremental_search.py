@@ -0,0 +1,177 @@
+import sqlite3
+import threading
+from bisect import bisect_right
+from PyQt5 import QtCore, QtWidgets
+
+DEBOUNCE_MS = 250
+# Result sets up to this size are kept so narrower searches can be answered in memory
+REFINE_LIMIT = 2000
+# Number of SQLite VM steps between cancellation checks
+CANCEL_CHECK_STEPS = 1000
+
+
+def is_refinement(previous, current):
+    # Every text field either stayed the same or was extended. Exact match
+    # fields (listed in previous["_exact"]) must not change at all.
+    exact = previous.get("_exact", ())
+    for key, value in current.items():
+        if key.startswith("_"):
+            continue
+        old = previous.get(key, "")
+        if key in exact:
+            if value != old:
+                return False
+        elif isinstance(value, tuple):
+            # Facets: an empty choice means no restriction, so picking a
+            # subset of the previous choice narrows the results
+            if old and not set(value) <= set(old):
+                return False
+            if not value and old:
+                return False
+        elif not value.lower().startswith(old.lower()):
+            return False
+    return True
+
+
+def query_filters(filters):
+    # Drop the engine's bookkeeping keys before passing filters to a query
+    return {key: value for key, value in filters.items() if not key.startswith("_")}
+
+
+def prefetched_pages(rows, complete, fetch_after):
+    # Page function for PagedTableModel that serves rows already fetched by
+    # the search and only goes back to the database past the end of them
+    keys = [row[0] for row in rows]
+
+    def fetch_page(after_key, limit):
+        start = 0 if after_key is None else bisect_right(keys, after_key)
+        if start < len(rows):
+            return rows[start:start + limit]
+        if complete:
+            return []
+        return fetch_after(after_key, limit)
+
+    return fetch_page
+
+
+class _SearchSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(int, object, object, bool)
+    failed = QtCore.pyqtSignal(int, str)
+
+
+class _SearchTask(QtCore.QRunnable):
+    def __init__(self, generation, filters, search, pool, signals):
+        super().__init__()
+        self.generation = generation
+        self.filters = filters
+        self.search = search
+        self.pool = pool
+        self.signals = signals
+        self.cancelled = threading.Event()
+        self.setAutoDelete(True)
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        conn = self.pool.connection()
+        # A non-zero return aborts the running statement with "interrupted"
+        conn.set_progress_handler(self.cancelled.is_set, CANCEL_CHECK_STEPS)
+        try:
+            rows = self.search(self.filters, REFINE_LIMIT + 1)
+        except sqlite3.OperationalError as e:
+            if not self.cancelled.is_set():
+                self.signals.failed.emit(self.generation, str(e))
+            return
+        finally:
+            conn.set_progress_handler(None, 0)
+        if self.cancelled.is_set():
+            return
+        complete = len(rows) <= REFINE_LIMIT
+        self.signals.finished.emit(self.generation, self.filters, rows[:REFINE_LIMIT], complete)
+
+
+class IncrementalSearch(QtCore.QObject):
+    # Debounced search-as-you-type.
+    #
+    # search(filters, limit) runs on a worker thread; starting a new query
+    # cancels the one in flight. When the new filters only narrow the last
+    # complete result set, match(row, filters) refines it in memory instead.
+    results_ready = QtCore.pyqtSignal(object, object, bool)
+    search_failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, search, match, pool, debounce_ms=DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.search = search
+        self.match = match
+        self.pool = pool
+        self.thread_pool = QtCore.QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(2)
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self._run)
+        self.signals = _SearchSignals(self)
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+        self._filters_source = dict
+        self._generation = 0
+        self._running = None
+        self._last = None
+        self.refined_count = 0
+        self.queried_count = 0
+
+    def watch(self, fields, filters_source):
+        # fields: QLineEdits whose edits trigger a search, or checkable
+        # buttons whose toggles run one straight away
+        self._filters_source = filters_source
+        for field in fields:
+            if isinstance(field, QtWidgets.QAbstractButton):
+                field.toggled.connect(lambda checked: self.run_now())
+                continue
+            field.textChanged.connect(self.schedule)
+            field.returnPressed.connect(self.run_now)
+
+    def schedule(self, *args):
+        self.timer.start()
+
+    def run_now(self):
+        self.timer.stop()
+        self._run()
+
+    def _cancel_running(self):
+        if self._running is not None:
+            self._running.cancelled.set()
+            self._running = None
+
+    def _run(self):
+        filters = self._filters_source()
+        self._generation += 1
+        self._cancel_running()
+        last = self._last
+        if last is not None and last[2] and is_refinement(last[0], filters):
+            rows = [row for row in last[1] if self.match(row, filters)]
+            self.refined_count += 1
+            self._last = (filters, rows, True)
+            self.results_ready.emit(filters, rows, True)
+            return
+        self.queried_count += 1
+        task = _SearchTask(self._generation, filters, self.search, self.pool, self.signals)
+        self._running = task
+        self.thread_pool.start(task)
+
+    def _on_finished(self, generation, filters, rows, complete):
+        if generation != self._generation:
+            return
+        self._running = None
+        self._last = (filters, rows, complete)
+        self.results_ready.emit(filters, rows, complete)
+
+    def _on_failed(self, generation, message):
+        if generation == self._generation:
+            self._running = None
+            self.search_failed.emit(message)
+
+    def shutdown(self):
+        self.timer.stop()
+        self._cancel_running()
+        self.thread_pool.waitForDone()
@@ -0,0 +1,52 @@
+import time
+
+
+class ScreenManager:
+    # Builds each screen on first use and reuses it afterwards, so switching
+    # back to a screen keeps its search state and skips setupUi. Records how
+    # long the first build and every later switch took.
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+        self.factories = {}
+        self.screens = {}
+        self.cold_open = {}
+        self.switches = {}
+        self.startup = None
+
+    def register(self, name, factory):
+        self.factories[name] = factory
+
+    def get(self, name):
+        screen = self.screens.get(name)
+        if screen is None:
+            started = time.perf_counter()
+            screen = self.factories[name](self.main_window)
+            self.screens[name] = screen
+            self.cold_open[name] = time.perf_counter() - started
+        return screen
+
+    def open(self, name):
+        started = time.perf_counter()
+        cold = name not in self.screens
+        screen = self.get(name)
+        self.main_window.hide()
+        screen.show()
+        if not cold:
+            self.switches.setdefault(name, []).append(time.perf_counter() - started)
+        return screen
+
+    def record_startup(self, seconds):
+        self.startup = seconds
+
+    def timings(self):
+        report = {"startup": self.startup, "screens": {}}
+        for name in self.factories:
+            switches = self.switches.get(name, [])
+            report["screens"][name] = {
+                "cold_open": self.cold_open.get(name),
+                "switch_count": len(switches),
+                "switch_avg": sum(switches) / len(switches) if switches else None,
+                "switch_max": max(switches) if switches else None,
+            }
+        return report
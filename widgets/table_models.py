@@ -0,0 +1,136 @@
+import time
+from collections import OrderedDict
+from PyQt5 import QtCore
+
+from engine.instrumentation import metrics
+
+PAGE_SIZE = 200
+MAX_CACHED_PAGES = 10
+
+
+class PagedTableModel(QtCore.QAbstractTableModel):
+    # Read-only model over a keyset paginated query.
+    #
+    # fetch_page(after_key, limit) must return rows ordered by page_key(row),
+    # which defaults to the first column. Pages are pulled in as the view scrolls (canFetchMore/fetchMore)
+    # and only the most recently used pages are kept in memory. Evicted pages
+    # are re-read with a single index seek from the key they started after.
+
+    def __init__(self, headers, fetch_page=None, page_size=PAGE_SIZE,
+                 max_cached_pages=MAX_CACHED_PAGES, parent=None, name=None, page_key=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.name = name or self.headers[0]
+        self.page_key = page_key or (lambda row: row[0])
+        self.page_size = page_size
+        self.max_cached_pages = max_cached_pages
+        self._fetch_page = None
+        self._clear()
+        if fetch_page is not None:
+            self.set_query(fetch_page)
+
+    def _clear(self):
+        self._pages = OrderedDict()
+        self._page_start_keys = []
+        self._last_key = None
+        self._row_count = 0
+        self._exhausted = True
+
+    def set_query(self, fetch_page):
+        self.beginResetModel()
+        self._fetch_page = fetch_page
+        self._clear()
+        self._exhausted = fetch_page is None
+        self.endResetModel()
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Horizontal:
+            return self.headers[section] if section < len(self.headers) else None
+        return section + 1
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+        row = self.row(index.row())
+        if row is None or index.column() >= len(row):
+            return None
+        value = row[index.column()]
+        return "" if value is None else str(value)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        started = time.perf_counter()
+        rows = list(self._fetch_page(self._last_key, self.page_size))
+        metrics.record_fetch(self.name, len(rows), time.perf_counter() - started)
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            return
+        page = len(self._page_start_keys)
+        self._page_start_keys.append(self._last_key)
+        self._last_key = self.page_key(rows[-1])
+        self.beginInsertRows(QtCore.QModelIndex(), self._row_count, self._row_count + len(rows) - 1)
+        self._store_page(page, rows)
+        self._row_count += len(rows)
+        self.endInsertRows()
+
+    def _store_page(self, page, rows):
+        self._pages[page] = rows
+        self._pages.move_to_end(page)
+        while len(self._pages) > self.max_cached_pages:
+            self._pages.popitem(last=False)
+
+    def _page(self, page):
+        rows = self._pages.get(page)
+        if rows is not None:
+            self._pages.move_to_end(page)
+            return rows
+        started = time.perf_counter()
+        rows = list(self._fetch_page(self._page_start_keys[page], self.page_size))
+        metrics.record_fetch(f"{self.name} (reload)", len(rows), time.perf_counter() - started)
+        self._store_page(page, rows)
+        return rows
+
+    def row(self, row_number):
+        if row_number < 0 or row_number >= self._row_count:
+            return None
+        page, offset = divmod(row_number, self.page_size)
+        rows = self._page(page)
+        # Rows deleted since the page was first read can shorten it
+        return rows[offset] if offset < len(rows) else None
+
+    def update_rows(self, rows):
+        # Replace cached rows in place by key (first column). Rows on evicted
+        # pages need nothing: they are re-read fresh when scrolled back to.
+        by_key = {row[0]: row for row in rows}
+        if not by_key:
+            return 0
+        updated = 0
+        last_column = len(self.headers) - 1
+        for page, page_rows in self._pages.items():
+            for offset, row in enumerate(page_rows):
+                new_row = by_key.get(row[0])
+                if new_row is None or new_row == row:
+                    continue
+                page_rows[offset] = new_row
+                row_number = page * self.page_size + offset
+                self.dataChanged.emit(self.index(row_number, 0), self.index(row_number, last_column))
+                updated += 1
+        return updated
+
+    def cached_keys(self):
+        return [row[0] for page_rows in self._pages.values() for row in page_rows]